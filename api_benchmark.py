@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+API Benchmark Module
+
+This module load-tests the API server. By default the server runs in this
+process against a local executor that answers from an in-memory frame after
+a configurable delay, so the numbers measure the HTTP, threading and
+encoding overhead rather than the warehouse. ``--url`` targets a running
+server instead. Requests go out over keep-alive connections, and the report
+shows throughput, latency percentiles and status codes.
+"""
+
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import threading
+import logging
+from urllib.parse import urlparse
+from typing import Dict, Any, Optional, Tuple
+
+import yaml
+import pandas as pd
+
+from api_server import ApiServer, ARROW_STREAM
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ENDPOINTS = {
+    'ask': ('POST', '/ask', {'question': 'What is the total revenue by year?'}),
+    'execute': ('POST', '/execute', {'sql': 'SELECT * FROM ORDERS'}),
+    'preview': ('GET', '/preview?table=orders&limit=10', None),
+    'model': ('GET', '/model', None),
+    'health': ('GET', '/health', None)
+}
+
+class LocalExecutor:
+    """Stand-in for CortexAnalyst that answers every call from one in-memory frame."""
+
+    def __init__(self, rows: int = 100, latency: float = 0.0, batch_rows: int = 10000,
+                 semantic_model_path: str = 'semantic_model.yaml'):
+        """Initialize the executor; every call sleeps ``latency`` seconds like a warehouse round trip."""
+        self.latency = latency
+        self.batch_rows = batch_rows
+        self.session = True
+        with open(semantic_model_path, 'r') as file:
+            self.semantic_model = yaml.safe_load(file)
+        self.data = pd.DataFrame({
+            'order_year': [1992 + number % 7 for number in range(rows)],
+            'market_segment': [('BUILDING', 'MACHINERY', 'AUTOMOBILE')[number % 3] for number in range(rows)],
+            'total_revenue': [1000.5 * number for number in range(rows)]
+        })
+
+    def ask_question(self, question: str, role: Optional[str] = None,
+                     warehouse: Optional[str] = None) -> Dict[str, Any]:
+        """Answer any question with the whole frame."""
+        time.sleep(self.latency)
+        return {'success': True, 'sql': 'SELECT 1', 'params': [], 'data': self.data,
+                'question': question, 'query_id': 'local', 'source': 'local'}
+
+    def guard_query(self, sql_query: str, binds=None, role=None) -> Dict[str, Any]:
+        """Allow every statement."""
+        return {'action': 'allow', 'sql': sql_query, 'warehouse': None, 'reason': 'local'}
+
+    def stream_query(self, sql_query: str, **kwargs):
+        """Yield the frame in batches of ``batch_rows``."""
+        time.sleep(self.latency)
+        for start in range(0, len(self.data), self.batch_rows):
+            yield self.data.iloc[start:start + self.batch_rows]
+
+    def last_query_id(self, sql_query: str, role=None, params=None) -> str:
+        """Return a fixed query ID."""
+        return 'local'
+
+    def get_table_preview(self, table_name: str, limit: int = 10) -> pd.DataFrame:
+        """Return the first rows of the frame."""
+        time.sleep(self.latency)
+        return self.data.head(limit)
+
+    def cancel_queries(self, owner: str) -> int:
+        """Nothing runs remotely, so nothing is cancelled."""
+        return 0
+
+async def _request(reader, writer, method: str, path: str, host: str,
+                   body: Optional[bytes], headers: Dict[str, str]) -> Tuple[int, int]:
+    """Send one HTTP/1.1 request on a keep-alive connection; return (status, body bytes)."""
+    payload = body or b''
+    head = f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Length: {len(payload)}\r\n"
+    head += ''.join(f"{key}: {value}\r\n" for key, value in headers.items()) + "\r\n"
+    writer.write(head.encode('latin-1') + payload)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    response_headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        key, value = line.decode('latin-1').split(':', 1)
+        response_headers[key.strip().lower()] = value.strip()
+
+    size = 0
+    if 'content-length' in response_headers:
+        size = len(await reader.readexactly(int(response_headers['content-length'])))
+    elif response_headers.get('transfer-encoding') == 'chunked':
+        while True:
+            chunk = int((await reader.readline()).strip(), 16)
+            if not chunk:
+                await reader.readline()
+                break
+            size += len(await reader.readexactly(chunk))
+            await reader.readline()
+    return status, size
+
+async def run_load(url: str, endpoint: str, requests: int, concurrency: int,
+                   arrow: bool = False, api_key: Optional[str] = None) -> Dict[str, Any]:
+    """Send ``requests`` requests over ``concurrency`` connections and return the statistics."""
+    target = urlparse(url)
+    method, path, body = ENDPOINTS[endpoint]
+    payload = json.dumps(body).encode('utf-8') if body else None
+    headers = {'Content-Type': 'application/json'}
+    if arrow:
+        headers['Accept'] = ARROW_STREAM
+    if api_key:
+        headers['Authorization'] = f"Bearer {api_key}"
+
+    latencies, statuses = [], {}
+    remaining = [requests]
+    received = [0]
+
+    async def connection():
+        reader, writer = await asyncio.open_connection(target.hostname, target.port or 80)
+        try:
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                started = time.perf_counter()
+                status, size = await _request(reader, writer, method, path, target.netloc, payload, headers)
+                latencies.append(time.perf_counter() - started)
+                statuses[status] = statuses.get(status, 0) + 1
+                received[0] += size
+        finally:
+            writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*[connection() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    percentile = lambda share: latencies[min(int(len(latencies) * share), len(latencies) - 1)] * 1000
+    return {
+        'requests': len(latencies),
+        'seconds': elapsed,
+        'rps': len(latencies) / elapsed,
+        'p50_ms': percentile(0.5),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'statuses': statuses,
+        'mb_received': received[0] / 1024 / 1024
+    }
+
+def start_local_server(executor: LocalExecutor, concurrency: int, threads: int) -> Tuple[str, Any]:
+    """Serve the API on a free local port in a background thread; return (URL, uvicorn server)."""
+    import uvicorn
+
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+
+    app = ApiServer(executor, max_per_client=concurrency, threads=threads, connect=False)
+    server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=port,
+                                           log_level='warning', lifespan='on'))
+    threading.Thread(target=server.run, name='api-server', daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}", server
+
+def main():
+    """Run the load test and print the report."""
+    parser = argparse.ArgumentParser(description="Load-test the Cortex Analyst API server")
+    parser.add_argument("--endpoint", choices=sorted(ENDPOINTS), default='ask')
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64, help="Keep-alive connections")
+    parser.add_argument("--arrow", action="store_true", help="Ask for Arrow IPC instead of JSON")
+    parser.add_argument("--url", help="Test a running server instead of a local one")
+    parser.add_argument("--api-key", help="API key for --url servers with CORTEX_API_KEYS")
+    parser.add_argument("--rows", type=int, default=100, help="Rows per local answer")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per local executor call")
+    parser.add_argument("--threads", type=int, default=32, help="Local server's analyst threads")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if not url:
+        url, server = start_local_server(LocalExecutor(args.rows, args.latency),
+                                         args.concurrency, args.threads)
+        print(f"🧪 Local server at {url} ({args.rows} rows, {args.latency * 1000:g} ms per call)")
+
+    try:
+        stats = asyncio.run(run_load(url, args.endpoint, args.requests, args.concurrency,
+                                     arrow=args.arrow, api_key=args.api_key))
+    finally:
+        if server:
+            server.should_exit = True
+
+    print(f"📈 {args.endpoint}: {stats['requests']} requests in {stats['seconds']:.2f}s = "
+          f"{stats['rps']:.0f} req/s")
+    print(f"   latency p50 {stats['p50_ms']:.1f} ms, p95 {stats['p95_ms']:.1f} ms, "
+          f"p99 {stats['p99_ms']:.1f} ms; {stats['mb_received']:.1f} MB received")
+    print(f"   statuses: {', '.join(f'{status}: {count}' for status, count in sorted(stats['statuses'].items()))}")
+    if any(status >= 400 for status in stats['statuses']):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
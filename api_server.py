@@ -0,0 +1,516 @@
+#!/usr/bin/env python3
+"""
+API Server Module
+
+This module serves Cortex Analyst over HTTP for internal tools as a plain
+ASGI application (run it with uvicorn). Every request shares one analyst, so
+the session pool, result cache, single-flight and query guard are shared too.
+Blocking analyst calls run on a bounded thread pool and results are streamed
+as newline-delimited JSON or as an Arrow IPC stream
+(``Accept: application/vnd.apache.arrow.stream``).
+
+Endpoints:
+- POST /ask      {"question"}: answer with SQL and rows
+- POST /execute  {"sql", "params", "timeout"}: full result of one SELECT/WITH
+- GET  /preview?table=ORDERS&limit=10: rows of a semantic-model table
+- GET  /model: the semantic model
+- GET  /health
+
+Each API key is mapped to a role on the server (CORTEX_API_ROLES), and a
+client's queries run under that role; requests cannot choose a role or
+warehouse. Without API keys only loopback clients are served. Each client
+may have a limited number of requests in flight; more are answered with 429.
+When a client disconnects, the queries it started are cancelled unless
+another request shares them.
+"""
+
+import io
+import os
+import sys
+import json
+import hmac
+import uuid
+import hashlib
+import ipaddress
+import argparse
+import asyncio
+import functools
+import contextvars
+import logging
+from urllib.parse import parse_qs
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, Optional
+
+from query_registry import current_owner
+from query_guard import read_only_statement
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ARROW_STREAM = 'application/vnd.apache.arrow.stream'
+NDJSON = 'application/x-ndjson'
+
+ROUTES = {
+    ('POST', '/ask'): 'ask',
+    ('POST', '/execute'): 'execute',
+    ('GET', '/preview'): 'preview',
+    ('GET', '/model'): 'model',
+    ('GET', '/health'): 'health'
+}
+
+def parse_api_keys(spec: Optional[str]) -> Dict[str, str]:
+    """Parse 'client:value,...' into a value per client name (API keys or roles)."""
+    keys = {}
+    for item in (spec or '').split(','):
+        if item.strip():
+            client, key = item.strip().split(':', 1)
+            keys[client] = key
+    return keys
+
+def is_loopback(host: Optional[str]) -> bool:
+    """Return whether a host name or address is the local machine."""
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+class ClientDisconnected(Exception):
+    """Raised when the client went away while its request was being served."""
+
+class HttpError(Exception):
+    """Raised to answer a request with an error status and message."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+class ArrowEncoder:
+    """Encode pandas batches as one Arrow IPC stream, chunk by chunk."""
+
+    def __init__(self, metadata: Optional[Dict[str, Any]] = None):
+        """Initialize the encoder; ``metadata`` goes into the schema as JSON."""
+        self.metadata = {'cortex': json.dumps(metadata or {}, default=str)}
+        self.sink = io.BytesIO()
+        self.schema = None
+        self.writer = None
+
+    def encode(self, batch) -> bytes:
+        """Return the stream bytes for one batch (the schema precedes the first)."""
+        import pyarrow as pa
+
+        if self.writer is None:
+            self.schema = pa.Schema.from_pandas(batch, preserve_index=False).with_metadata(self.metadata)
+            self.writer = pa.ipc.new_stream(self.sink, self.schema)
+        self.writer.write_table(pa.Table.from_pandas(batch, schema=self.schema, preserve_index=False))
+        return self._drain()
+
+    def finish(self) -> bytes:
+        """Return the end of the stream (a bare schema if there were no batches)."""
+        import pyarrow as pa
+
+        if self.writer is None:
+            self.writer = pa.ipc.new_stream(self.sink, pa.schema([]).with_metadata(self.metadata))
+        self.writer.close()
+        return self._drain()
+
+    def _drain(self) -> bytes:
+        """Return and clear the bytes written so far."""
+        data = self.sink.getvalue()
+        self.sink.seek(0)
+        self.sink.truncate()
+        return data
+
+def ndjson(batch) -> bytes:
+    """Encode a pandas batch as newline-delimited JSON records."""
+    if batch.empty:
+        return b''
+    return (batch.to_json(orient='records', lines=True, date_format='iso',
+                          default_handler=str).rstrip('\n') + '\n').encode('utf-8')
+
+class Request:
+    """One HTTP request: its scope, body, client and disconnect state."""
+
+    def __init__(self, scope: Dict[str, Any], receive: Callable, send: Callable, client: str):
+        """Initialize the request from its ASGI scope and channels."""
+        self.scope = scope
+        self.receive = receive
+        self.send = send
+        self.client = client
+        # Queries started for this request are owned by it
+        self.owner = f"api:{client}:{uuid.uuid4().hex[:12]}"
+        self.headers = {key.decode('latin-1').lower(): value.decode('latin-1')
+                        for key, value in scope.get('headers', [])}
+        self.query = {key: values[-1] for key, values in
+                      parse_qs(scope.get('query_string', b'').decode('latin-1')).items()}
+        self.disconnected = asyncio.Event()
+        self.started = False
+        # The blocking call currently running for this request
+        self.pending = None
+        self._watcher = None
+
+    async def json(self) -> Dict[str, Any]:
+        """Read the request body as a JSON object, then start watching for a disconnect."""
+        chunks, more = [], True
+        while more:
+            message = await self.receive()
+            if message['type'] == 'http.disconnect':
+                raise ClientDisconnected()
+            chunks.append(message.get('body', b''))
+            more = message.get('more_body', False)
+        self.watch()
+        try:
+            body = json.loads(b''.join(chunks) or b'{}')
+        except ValueError:
+            raise HttpError(400, 'Request body is not valid JSON')
+        if not isinstance(body, dict):
+            raise HttpError(400, 'Request body must be a JSON object')
+        return body
+
+    def watch(self):
+        """Set ``disconnected`` once the client goes away."""
+        if self._watcher:
+            return
+
+        async def wait():
+            while True:
+                message = await self.receive()
+                if message['type'] == 'http.disconnect':
+                    self.disconnected.set()
+                    return
+        self._watcher = asyncio.ensure_future(wait())
+
+    def wants_arrow(self) -> bool:
+        """Return whether the client asked for an Arrow IPC stream."""
+        return ARROW_STREAM in self.headers.get('accept', '')
+
+    async def start(self, status: int, content_type: str, headers: Optional[Dict[str, str]] = None):
+        """Send the response status and headers."""
+        headers = {'content-type': content_type, **(headers or {})}
+        await self.send({'type': 'http.response.start', 'status': status,
+                         'headers': [(key.encode('latin-1'), str(value).encode('latin-1'))
+                                     for key, value in headers.items()]})
+        self.started = True
+
+    async def write(self, body: bytes, more: bool = True):
+        """Send part of the response body."""
+        await self.send({'type': 'http.response.body', 'body': body, 'more_body': more})
+
+    async def respond_json(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None):
+        """Send a complete JSON response."""
+        await self.start(status, 'application/json', headers)
+        await self.write(json.dumps(payload, default=str).encode('utf-8'), more=False)
+
+    def close(self):
+        """Stop watching for a disconnect."""
+        if self._watcher:
+            self._watcher.cancel()
+
+class ApiServer:
+    """ASGI application serving one shared Cortex Analyst."""
+
+    def __init__(self, analyst, max_per_client: int = 8, threads: int = 32,
+                 api_keys: Optional[Dict[str, str]] = None,
+                 roles: Optional[Dict[str, str]] = None, connect: bool = True):
+        """Initialize the server.
+
+        Blocking analyst calls run on ``threads`` threads. With ``api_keys``
+        (client name to key) requests need ``Authorization: Bearer <key>``,
+        limits apply per key, and a client's queries run under its role in
+        ``roles`` (client name to role), which every client must have.
+        Without keys only loopback clients are served, under the connection's
+        default role, and limits apply per address. ``connect`` connects the
+        analyst at startup and closes it at shutdown.
+        """
+        self.api_keys = api_keys or {}
+        self.roles = roles or {}
+        unmapped = sorted(set(self.api_keys) - set(self.roles))
+        if unmapped:
+            raise ValueError(f"No role configured for API clients: {', '.join(unmapped)}")
+
+        self.analyst = analyst
+        self.max_per_client = max_per_client
+        self.connect = connect
+        self.in_flight = {}
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='api')
+
+    @classmethod
+    def from_env(cls, analyst, connect: bool = True) -> 'ApiServer':
+        """Create a server configured from CORTEX_API_* environment variables."""
+        return cls(
+            analyst,
+            max_per_client=int(os.getenv('CORTEX_API_MAX_PER_CLIENT', '8')),
+            threads=int(os.getenv('CORTEX_API_THREADS', '32')),
+            api_keys=parse_api_keys(os.getenv('CORTEX_API_KEYS')),
+            roles=parse_api_keys(os.getenv('CORTEX_API_ROLES')),
+            connect=connect
+        )
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable):
+        """Serve one ASGI connection scope."""
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        request = Request(scope, receive, send, self._client(scope))
+        route = ROUTES.get((scope['method'], scope['path']))
+        try:
+            if route is None:
+                raise HttpError(404, f"Unknown endpoint {scope['method']} {scope['path']}")
+            if request.client is None:
+                raise HttpError(401, 'A valid API key is required')
+            if self.in_flight.get(request.client, 0) >= self.max_per_client:
+                await request.respond_json(429, {'error': 'Too many concurrent requests'},
+                                           {'retry-after': '1'})
+                return
+
+            self.in_flight[request.client] = self.in_flight.get(request.client, 0) + 1
+            try:
+                await getattr(self, route)(request)
+            finally:
+                self.in_flight[request.client] -= 1
+                if not self.in_flight[request.client]:
+                    del self.in_flight[request.client]
+
+        except ClientDisconnected:
+            logger.info(f"Client {request.client} disconnected from {scope['path']}")
+        except HttpError as e:
+            if not request.started:
+                await request.respond_json(e.status, {'error': str(e)})
+        except Exception as e:
+            logger.error(f"Error serving {scope['path']}: {str(e)}")
+            if not request.started:
+                await request.respond_json(500, {'error': str(e)})
+        finally:
+            request.close()
+
+    async def ask(self, request: Request):
+        """Answer a natural language question."""
+        body = await request.json()
+        if not body.get('question'):
+            raise HttpError(400, 'question is required')
+
+        result = await self._call(request, self.analyst.ask_question, body['question'],
+                                  role=self.roles.get(request.client))
+        meta = {key: result.get(key) for key in ('success', 'error', 'question', 'sql', 'params', 'query_id',
+                                                 'source', 'cached', 'stale', 'truncated', 'interpretation')}
+        status = 200 if result['success'] else 422
+        data = result.get('data')
+
+        if request.wants_arrow() and data is not None:
+            encoder = ArrowEncoder(meta)
+            await request.start(status, ARROW_STREAM)
+            await request.write(encoder.encode(data) + encoder.finish(), more=False)
+            return
+
+        rows = data.to_json(orient='records', date_format='iso', default_handler=str) \
+            if data is not None and not data.empty else '[]'
+        columns = [str(column) for column in data.columns] if data is not None else []
+        # The rows are spliced in as serialized, without a round trip through Python objects
+        payload = json.dumps({**meta, 'columns': columns}, default=str)[:-1] + f', "rows": {rows}}}'
+        await request.start(status, 'application/json')
+        await request.write(payload.encode('utf-8'), more=False)
+
+    async def execute(self, request: Request):
+        """Run one read-only statement (after the cost guard) and stream its full result."""
+        body = await request.json()
+        if not body.get('sql'):
+            raise HttpError(400, 'sql is required')
+        try:
+            sql = read_only_statement(body['sql'])
+        except ValueError as e:
+            raise HttpError(400, str(e))
+        params, role = body.get('params'), self.roles.get(request.client)
+
+        # The guard also rejects statements whose EXPLAIN fails
+        guard = await self._call(request, self.analyst.guard_query, sql, params, role)
+        if guard['action'] == 'reject':
+            raise HttpError(422, f"Query rejected by cost guard: {guard['reason']}")
+
+        batches = self.analyst.stream_query(
+            guard['sql'], warehouse=guard.get('warehouse'),
+            query_class='heavy' if guard['action'] == 'route' else 'aggregate',
+            role=role, params=params, timeout=body.get('timeout'))
+        headers = {'x-guard-action': guard['action']}
+        await self._stream(request, batches, {'sql': guard['sql'], 'guard': guard['action']}, headers,
+                           query_id=lambda: self.analyst.last_query_id(guard['sql'], role, params))
+
+    async def preview(self, request: Request):
+        """Return the first rows of a semantic-model table."""
+        request.watch()
+        table = request.query.get('table')
+        if not table:
+            raise HttpError(400, 'table is required')
+        try:
+            limit = min(int(request.query.get('limit', '10')), 1000)
+        except ValueError:
+            raise HttpError(400, 'limit must be an integer')
+
+        try:
+            data = await self._call(request, self.analyst.get_table_preview, table, limit)
+        except ValueError as e:
+            raise HttpError(404, str(e))
+        await self._stream(request, iter([data]), {'table': table})
+
+    async def model(self, request: Request):
+        """Return the semantic model, with an ETag for conditional requests."""
+        body = json.dumps(self.analyst.semantic_model or {}, default=str).encode('utf-8')
+        etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+        if request.headers.get('if-none-match') == etag:
+            await request.start(304, 'application/json', {'etag': etag})
+            await request.write(b'', more=False)
+            return
+        await request.start(200, 'application/json', {'etag': etag})
+        await request.write(body, more=False)
+
+    async def health(self, request: Request):
+        """Report whether the analyst is connected and how busy the server is."""
+        await request.respond_json(200, {
+            'status': 'ok' if self.analyst.session else 'connecting',
+            'in_flight': sum(self.in_flight.values()),
+            'clients': len(self.in_flight)
+        })
+
+    async def _stream(self, request: Request, batches, meta: Dict[str, Any],
+                      headers: Optional[Dict[str, str]] = None,
+                      query_id: Optional[Callable[[], Optional[str]]] = None):
+        """Send result batches as they are produced, as NDJSON or an Arrow IPC stream.
+
+        The first batch is fetched before the headers go out, so a failing
+        query still gets a proper error status.
+        """
+        sentinel = object()
+        try:
+            try:
+                batch = await self._call(request, next, batches, sentinel)
+            except TimeoutError as e:
+                raise HttpError(504, str(e))
+            except (ClientDisconnected, HttpError):
+                raise
+            except Exception as e:
+                raise HttpError(422, f"Query failed: {str(e)}")
+
+            headers = dict(headers or {})
+            if query_id:
+                meta['query_id'] = headers['x-query-id'] = query_id() or ''
+            encoder = ArrowEncoder(meta) if request.wants_arrow() else None
+            await request.start(200, ARROW_STREAM if encoder else NDJSON, headers)
+
+            try:
+                while batch is not sentinel:
+                    await request.write(encoder.encode(batch) if encoder else ndjson(batch))
+                    batch = await self._call(request, next, batches, sentinel)
+            except ClientDisconnected:
+                raise
+            except Exception as e:
+                # Headers are gone: end NDJSON with an error line; an Arrow stream is left unterminated
+                logger.error(f"Result stream failed: {str(e)}")
+                if encoder:
+                    return
+                await request.write(json.dumps({'error': str(e)}).encode('utf-8') + b'\n', more=False)
+                return
+            await request.write(encoder.finish() if encoder else b'', more=False)
+
+        finally:
+            # Release the pooled session if the stream stopped early, once no fetch is running
+            close = getattr(batches, 'close', None)
+            if close:
+                if request.pending is not None and not request.pending.done():
+                    await asyncio.wait({request.pending})
+                await asyncio.get_running_loop().run_in_executor(self.executor, close)
+
+    async def _call(self, request: Request, func: Callable, *args, **kwargs):
+        """Run a blocking analyst call on the thread pool, owned by the request.
+
+        If the client disconnects first, the request's queries are cancelled
+        and ClientDisconnected is raised.
+        """
+        if request.disconnected.is_set():
+            raise ClientDisconnected()
+
+        context = contextvars.copy_context()
+        context.run(current_owner.set, request.owner)
+        loop = asyncio.get_running_loop()
+        work = loop.run_in_executor(self.executor, functools.partial(context.run, func, *args, **kwargs))
+        request.pending = work
+        disconnected = asyncio.ensure_future(request.disconnected.wait())
+        try:
+            await asyncio.wait({work, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            disconnected.cancel()
+
+        if not work.done():
+            loop.run_in_executor(self.executor, self.analyst.cancel_queries, request.owner)
+            raise ClientDisconnected()
+        return work.result()
+
+    def _client(self, scope: Dict[str, Any]) -> Optional[str]:
+        """Return the client name of a request (None if it is not allowed in).
+
+        Without API keys that is the address of a loopback client.
+        """
+        if not self.api_keys:
+            address = (scope.get('client') or (None,))[0]
+            return address if is_loopback(address) else None
+
+        headers = dict(scope.get('headers', []))
+        authorization = headers.get(b'authorization', b'').decode('latin-1')
+        if not authorization.startswith('Bearer '):
+            return None
+        token = authorization[len('Bearer '):].strip()
+        return next((client for client, key in self.api_keys.items()
+                     if hmac.compare_digest(key.encode('utf-8'), token.encode('utf-8'))), None)
+
+    async def _lifespan(self, receive: Callable, send: Callable):
+        """Connect the analyst at startup and close it at shutdown."""
+        loop = asyncio.get_running_loop()
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                if self.connect and not await loop.run_in_executor(self.executor, self.analyst.connect):
+                    await send({'type': 'lifespan.startup.failed', 'message': 'Connection failed'})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.connect:
+                    await loop.run_in_executor(self.executor, self.analyst.close)
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+def create_app() -> ApiServer:
+    """Create the server around a new analyst (``uvicorn api_server:create_app --factory``)."""
+    from cortex_analyst import CortexAnalyst
+
+    return ApiServer.from_env(CortexAnalyst())
+
+def main():
+    """Serve the API with uvicorn."""
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve Cortex Analyst over HTTP")
+    parser.add_argument("--host", default='127.0.0.1',
+                        help="Address to listen on; other than loopback only with CORTEX_API_KEYS")
+    parser.add_argument("--port", type=int, default=int(os.getenv('CORTEX_API_PORT', '8000')))
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Server processes; each has its own analyst and session pool")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    if not is_loopback(args.host) and not parse_api_keys(os.getenv('CORTEX_API_KEYS')):
+        print(f"❌ Refusing to listen on {args.host} without CORTEX_API_KEYS")
+        sys.exit(1)
+
+    try:
+        uvicorn.run('api_server:create_app', factory=True, host=args.host, port=args.port,
+                    workers=args.workers, lifespan='on')
+    except KeyboardInterrupt:
+        sys.exit(0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Approximate Query Module
+
+This module rewrites an exact aggregate query into a fast approximate variant
+for approximate-first answers. The largest (first) table is read through a
+SAMPLE clause whose rate depends on the table's row count; SUM and COUNT are
+scaled back up and returned with 95% error bounds. COUNT(DISTINCT ...) and
+exact percentiles become APPROX_COUNT_DISTINCT and APPROX_PERCENTILE.
+"""
+
+import os
+import re
+import logging
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+from result_cache import ResultCache
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# z-score of the reported error bounds (95% confidence)
+CONFIDENCE_Z = 1.96
+
+# Sample percent by table size: (largest row count, percent); 100 means exact only
+DEFAULT_RATES = [(10_000_000, 100.0), (1_000_000_000, 1.0), (None, 0.1)]
+
+SAMPLE_METHODS = ('SYSTEM', 'BERNOULLI')
+
+KEYWORDS = r'(?:ON|WHERE|GROUP|ORDER|JOIN|INNER|LEFT|RIGHT|FULL|CROSS|LIMIT|SAMPLE|HAVING)'
+FACT_TABLE_PATTERN = re.compile(
+    rf'(\bFROM\s+([\w$.]+)(?:\s+(?:AS\s+)?(?!{KEYWORDS}\b)\w+)?)', re.IGNORECASE)
+# Arguments may hold one level of parentheses: SUM(price * (1 - discount))
+AGGREGATE_PATTERN = re.compile(
+    r'\b(SUM|COUNT|AVG)\(\s*((?!DISTINCT\b)(?:[^()]|\([^()]*\))*?)\s*\)\s+AS\s+(\w+)', re.IGNORECASE)
+# Aggregates a sample understates; every one must be scaled back up
+SCALED_PATTERN = re.compile(r'\b(?:SUM|COUNT)\s*\(', re.IGNORECASE)
+# Top-N results: a sample changes which rows make the cut, not just their values
+# The row count may be a bind variable: LIMIT ?, TOP :n
+LIMIT_PATTERN = re.compile(
+    r'\b(?:LIMIT|TOP)\s+(?:\d+\b|\?|:\w+)|\bFETCH\s+(?:FIRST|NEXT)\b',
+    re.IGNORECASE)
+DISTINCT_PATTERN = re.compile(r'\bCOUNT\(\s*DISTINCT\s+([^()]*?)\s*\)', re.IGNORECASE)
+MEDIAN_PATTERN = re.compile(r'\bMEDIAN\(\s*([^()]*?)\s*\)', re.IGNORECASE)
+PERCENTILE_PATTERN = re.compile(
+    r'\bPERCENTILE_CONT\(\s*([\d.]+)\s*\)\s+WITHIN\s+GROUP\s*\(\s*ORDER\s+BY\s+([^()]*?)\s*\)',
+    re.IGNORECASE)
+
+def nesting_depth(sql: str, position: int) -> int:
+    """Return how many parentheses are open at a position of a statement."""
+    return sql.count('(', 0, position) - sql.count(')', 0, position)
+
+def parse_rates(spec: Optional[str]) -> List[Tuple[Optional[int], float]]:
+    """Parse 'rows:percent,...' (the last rows may be '*') into sorted rate tiers."""
+    if not spec:
+        return list(DEFAULT_RATES)
+    rates = []
+    for item in spec.split(','):
+        rows, percent = item.strip().split(':')
+        rates.append((None if rows.strip() == '*' else int(float(rows)), float(percent)))
+    rates.sort(key=lambda rate: float('inf') if rate[0] is None else rate[0])
+    return rates
+
+class ApproximateQuery:
+    """Class to build sampled or approximate variants of aggregate queries."""
+
+    def __init__(self, row_count: Callable[[str], Optional[int]],
+                 rates: Optional[List[Tuple[Optional[int], float]]] = None,
+                 method: str = 'SYSTEM', cache_ttl: int = 3600):
+        """Initialize the rewriter.
+
+        ``row_count(table)`` returns a table's row count (or None if unknown);
+        counts are cached for ``cache_ttl`` seconds. ``method`` is the SAMPLE
+        method: SYSTEM reads whole blocks (fastest at scale), BERNOULLI rows.
+        The error bounds assume row-level sampling, so under SYSTEM they are
+        a lower bound when values cluster by block.
+        """
+        if method.upper() not in SAMPLE_METHODS:
+            raise ValueError(f"Unknown sample method: {method}")
+
+        self.row_count = row_count
+        self.rates = rates or list(DEFAULT_RATES)
+        self.method = method.upper()
+        self.row_counts = ResultCache(ttl=cache_ttl)
+
+    @classmethod
+    def from_env(cls, row_count: Callable[[str], Optional[int]]) -> 'ApproximateQuery':
+        """Create a rewriter configured from CORTEX_APPROX_* environment variables."""
+        return cls(
+            row_count,
+            rates=parse_rates(os.getenv('CORTEX_APPROX_RATES')),
+            method=os.getenv('CORTEX_APPROX_METHOD', 'SYSTEM')
+        )
+
+    def rate_for(self, table: str) -> float:
+        """Return the sample percent for a table from its (cached) row count."""
+        rows = self.row_counts.get(table.upper())
+        if rows is None:
+            try:
+                rows = self.row_count(table)
+            except Exception as e:
+                logger.warning(f"Row count of {table} unavailable: {str(e)}")
+            if rows is None:
+                return 100.0
+            self.row_counts.set(table.upper(), rows)
+
+        for limit, percent in self.rates:
+            if limit is None or rows <= limit:
+                return percent
+        return 100.0
+
+    def rewrite(self, sql: str, percent: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Return the approximate variant of a query, or None if only exact makes sense.
+
+        ``percent`` overrides the rate chosen from the table size. The result
+        has the rewritten ``sql``, the sampled ``table``, ``percent``,
+        ``method`` and ``errors`` mapping result columns to their error
+        bound columns. Only the outer query is sampled: None is returned
+        when its table is read in a subquery or CTE, or when a SUM or COUNT
+        could not be scaled.
+        """
+        match = FACT_TABLE_PATTERN.search(sql)
+        if not match or nesting_depth(sql, match.start()) > 0:
+            return None
+        table = match.group(2)
+
+        approximated = DISTINCT_PATTERN.sub(r'APPROX_COUNT_DISTINCT(\1)', sql)
+        approximated = MEDIAN_PATTERN.sub(r'APPROX_PERCENTILE(\1, 0.5)', approximated)
+        approximated = PERCENTILE_PATTERN.sub(r'APPROX_PERCENTILE(\2, \1)', approximated)
+        uses_approx_functions = approximated != sql
+
+        percent = self.rate_for(table) if percent is None else float(percent)
+        # A sample cannot be scaled to a distinct count or a top-N; use the sketch on all rows
+        if percent >= 100 or DISTINCT_PATTERN.search(sql) or LIMIT_PATTERN.search(sql):
+            if not uses_approx_functions:
+                return None
+            return {'sql': approximated, 'table': table, 'percent': 100.0,
+                    'method': None, 'errors': {}}
+
+        aggregates = list(AGGREGATE_PATTERN.finditer(approximated))
+        if any(nesting_depth(approximated, aggregate.start()) > 0 for aggregate in aggregates):
+            return None
+        scaled_count = sum(1 for aggregate in aggregates if aggregate.group(1).upper() != 'AVG')
+        if scaled_count != len(SCALED_PATTERN.findall(approximated)):
+            logger.info("Not approximating: a SUM or COUNT cannot be scaled")
+            return None
+
+        fraction = percent / 100
+        scale = 1 / fraction
+        errors = {}
+
+        def scaled(aggregate):
+            function, expr, alias = aggregate.group(1).upper(), aggregate.group(2), aggregate.group(3)
+            error = f"{alias}_error"
+            errors[alias] = error
+            if function == 'SUM':
+                return (f"SUM({expr}) * {scale:g} AS {alias}, "
+                        f"SQRT(SUM(({expr}) * ({expr})) * {1 - fraction:g}) / {fraction:g} * {CONFIDENCE_Z} AS {error}")
+            if function == 'COUNT':
+                return (f"ROUND(COUNT({expr}) * {scale:g}) AS {alias}, "
+                        f"SQRT(COUNT({expr}) * {1 - fraction:g}) / {fraction:g} * {CONFIDENCE_Z} AS {error}")
+            return (f"AVG({expr}) AS {alias}, "
+                    f"COALESCE(STDDEV({expr}) / SQRT(COUNT({expr})), 0) * {CONFIDENCE_Z} AS {error}")
+
+        approximated = AGGREGATE_PATTERN.sub(scaled, approximated)
+        approximated = FACT_TABLE_PATTERN.sub(rf'\1 SAMPLE {self.method} ({percent:g})',
+                                              approximated, count=1)
+
+        return {'sql': approximated, 'table': table, 'percent': percent,
+                'method': self.method, 'errors': errors}
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Bulk Loader Module
+
+This module loads a DataFrame or local files into a Snowflake table through
+a stage: the data is written as compressed Parquet chunks, uploaded with
+parallel PUT threads and loaded with a single COPY INTO. Connections that
+cannot stage files (e.g. a local sqlite stand-in) fall back to batched
+row inserts.
+"""
+
+import os
+import re
+import time
+import uuid
+import tempfile
+import logging
+import pandas as pd
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Union
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Table and stage names: up to three dot-separated plain or quoted identifiers
+IDENTIFIER_PATTERN = re.compile(r'^(?:[A-Za-z_][\w$]*|"[^"]+")(?:\.(?:[A-Za-z_][\w$]*|"[^"]+")){0,2}$')
+
+# Accepted COPY ON_ERROR values
+ON_ERROR_PATTERN = re.compile(r'^(?:ABORT_STATEMENT|CONTINUE|SKIP_FILE(?:_\d+%?)?)$', re.IGNORECASE)
+
+# COPY file format for each supported input file type
+FILE_FORMATS = {
+    'parquet': "TYPE = PARQUET",
+    'csv': "TYPE = CSV SKIP_HEADER = 1 FIELD_OPTIONALLY_ENCLOSED_BY = '\"'"
+}
+
+def file_type(path: Union[str, Path]) -> str:
+    """Return 'parquet' or 'csv' for a local input file."""
+    suffixes = [suffix.lower() for suffix in Path(path).suffixes]
+    if '.parquet' in suffixes:
+        return 'parquet'
+    if '.csv' in suffixes:
+        return 'csv'
+    raise ValueError(f"Unsupported file type: {path}")
+
+def is_snowflake_connection(connection: Any) -> bool:
+    """Return True for a snowflake-connector connection, which can PUT files."""
+    return type(connection).__module__.startswith('snowflake.connector')
+
+class BulkLoader:
+    """Class to load large DataFrames or files into a table."""
+
+    def __init__(self, connection: Any, stage: str = 'CORTEX_BULK_STAGE',
+                 chunk_rows: int = 500000, threads: int = 4, insert_batch_rows: int = 10000):
+        """Initialize the loader.
+
+        ``connection`` is a DB-API connection. Snowflake connections load via
+        ``stage`` (created as a temporary stage if it does not exist); any
+        other connection uses batched ``executemany`` inserts with qmark
+        placeholders.
+        """
+        if not IDENTIFIER_PATTERN.match(stage):
+            raise ValueError(f"Invalid stage name: {stage}")
+
+        self.connection = connection
+        self.stage = stage
+        self.chunk_rows = chunk_rows
+        self.threads = threads
+        self.insert_batch_rows = insert_batch_rows
+
+    @classmethod
+    def from_env(cls, connection: Any) -> 'BulkLoader':
+        """Create a loader configured from CORTEX_BULK_* environment variables."""
+        return cls(
+            connection,
+            stage=os.getenv('CORTEX_BULK_STAGE', 'CORTEX_BULK_STAGE'),
+            chunk_rows=int(os.getenv('CORTEX_BULK_CHUNK_ROWS', '500000')),
+            threads=int(os.getenv('CORTEX_BULK_THREADS', '4')),
+            insert_batch_rows=int(os.getenv('CORTEX_BULK_INSERT_BATCH_ROWS', '10000'))
+        )
+
+    def load(self, data: Union[pd.DataFrame, str, Path, List[Union[str, Path]]], table: str,
+             method: str = 'auto', on_error: str = 'ABORT_STATEMENT') -> Dict[str, Any]:
+        """Load a DataFrame or local Parquet/CSV files into an existing table.
+
+        ``method`` is 'stage' (PUT + COPY INTO), 'insert' (row batches) or
+        'auto', which stages on Snowflake connections and inserts otherwise.
+        Returns a result with per-file outcomes and the total rows loaded.
+        """
+        started = time.time()
+        if method == 'auto':
+            method = 'stage' if is_snowflake_connection(self.connection) else 'insert'
+
+        try:
+            if not IDENTIFIER_PATTERN.match(table):
+                raise ValueError(f"Invalid table name: {table}")
+            if not ON_ERROR_PATTERN.match(on_error):
+                raise ValueError(f"Invalid ON_ERROR option: {on_error}")
+            if method not in ('stage', 'insert'):
+                raise ValueError(f"Unknown load method: {method}")
+
+            if method == 'stage':
+                files = self._stage_and_copy(data, table, on_error)
+            else:
+                files = self._insert(data, table)
+
+            result = {
+                'success': all(entry['status'] in ('LOADED', 'INSERTED') for entry in files),
+                'table': table,
+                'method': method,
+                'files': files,
+                'rows_loaded': sum(entry.get('rows_loaded') or 0 for entry in files),
+                'elapsed': time.time() - started
+            }
+            logger.info(f"Loaded {result['rows_loaded']} rows into {table} from "
+                        f"{len(files)} files via {method} in {result['elapsed']:.1f}s")
+            return result
+
+        except Exception as e:
+            logger.error(f"Bulk load into {table} failed: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e),
+                'table': table,
+                'method': method,
+                'files': [],
+                'rows_loaded': 0,
+                'elapsed': time.time() - started
+            }
+
+    def _stage_and_copy(self, data, table: str, on_error: str) -> List[Dict[str, Any]]:
+        """Write chunks, PUT them in parallel and COPY them in one statement."""
+        prefix = f"{self.stage}/{uuid.uuid4().hex}"
+
+        with tempfile.TemporaryDirectory(prefix='cortex_bulk_') as workdir:
+            if isinstance(data, pd.DataFrame):
+                kind = 'parquet'
+                tasks = [(self._chunk_writer(data, start, workdir), kind)
+                         for start in range(0, max(len(data), 1), self.chunk_rows)]
+            else:
+                paths = self._paths(data)
+                kinds = {file_type(path) for path in paths}
+                if len(kinds) != 1:
+                    raise ValueError("Input files must all be Parquet or all be CSV")
+                kind = kinds.pop()
+                tasks = [((lambda path=path: path), kind) for path in paths]
+
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"CREATE TEMPORARY STAGE IF NOT EXISTS {self.stage}")
+
+            # Each thread writes its chunk and uploads it, overlapping disk and network
+            with ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='bulk-put') as executor:
+                uploads = list(executor.map(lambda task: self._put(task[0](), task[1], prefix), tasks))
+
+        failed = [upload for upload in uploads if upload['status'] not in ('UPLOADED', 'SKIPPED')]
+        if failed:
+            raise RuntimeError(f"PUT failed for {len(failed)} files: {failed[0]['message']}")
+
+        copy_sql = (
+            f"COPY INTO {table} FROM @{prefix}/ "
+            f"FILE_FORMAT = ({FILE_FORMATS[kind]}) "
+            + ("MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE " if kind == 'parquet' else "")
+            + f"ON_ERROR = {on_error} PURGE = TRUE"
+        )
+        logger.info(f"Executing: {copy_sql}")
+        with self.connection.cursor() as cursor:
+            cursor.execute(copy_sql)
+            columns = [column[0].lower() for column in cursor.description]
+            loaded = {row['file'].rsplit('/', 1)[-1]: row
+                      for row in (dict(zip(columns, values)) for values in cursor.fetchall())
+                      if row.get('file')}
+
+        files = []
+        for upload in uploads:
+            outcome = loaded.get(upload['target'], {})
+            files.append({
+                'file': upload['source'],
+                'bytes': upload['target_size'],
+                'status': (outcome.get('status') or 'NOT_LOADED').upper(),
+                'rows_parsed': outcome.get('rows_parsed'),
+                'rows_loaded': outcome.get('rows_loaded'),
+                'errors_seen': outcome.get('errors_seen'),
+                'first_error': outcome.get('first_error')
+            })
+        return files
+
+    def _chunk_writer(self, data: pd.DataFrame, start: int, workdir: str):
+        """Return a callable writing one chunk to a Snappy-compressed Parquet file."""
+        def write() -> Path:
+            path = Path(workdir) / f"chunk_{start // self.chunk_rows:05d}.parquet"
+            data.iloc[start:start + self.chunk_rows].to_parquet(path, compression='snappy', index=False)
+            return path
+        return write
+
+    def _put(self, path: Path, kind: str, prefix: str) -> Dict[str, Any]:
+        """Upload one file to the stage and return the PUT outcome."""
+        # Parquet is compressed internally; CSV is gzipped by PUT unless already compressed
+        auto_compress = 'TRUE' if kind == 'csv' and not str(path).lower().endswith('.gz') else 'FALSE'
+        put_sql = (f"PUT 'file://{Path(path).resolve().as_posix()}' @{prefix}/ "
+                   f"AUTO_COMPRESS = {auto_compress} OVERWRITE = TRUE")
+        with self.connection.cursor() as cursor:
+            cursor.execute(put_sql)
+            columns = [column[0].lower() for column in cursor.description]
+            outcome = dict(zip(columns, cursor.fetchone()))
+        return {
+            'source': str(path),
+            'target': outcome.get('target'),
+            'target_size': outcome.get('target_size'),
+            'status': (outcome.get('status') or '').upper(),
+            'message': outcome.get('message')
+        }
+
+    def _insert(self, data, table: str) -> List[Dict[str, Any]]:
+        """Insert rows in ``executemany`` batches, one result entry per input."""
+        if isinstance(data, pd.DataFrame):
+            sources = [('<dataframe>', lambda: data)]
+        else:
+            sources = [(str(path), lambda path=path: self._read(path)) for path in self._paths(data)]
+
+        files = []
+        for name, read in sources:
+            frame = read()
+            columns = ', '.join(f'"{column}"' for column in frame.columns)
+            insert_sql = (f"INSERT INTO {table} ({columns}) "
+                          f"VALUES ({', '.join('?' for _ in frame.columns)})")
+            rows = frame.astype(object).where(frame.notna(), None).itertuples(index=False, name=None)
+
+            cursor = self.connection.cursor()
+            try:
+                batch = []
+                for row in rows:
+                    batch.append(row)
+                    if len(batch) >= self.insert_batch_rows:
+                        cursor.executemany(insert_sql, batch)
+                        batch = []
+                if batch:
+                    cursor.executemany(insert_sql, batch)
+                self.connection.commit()
+            finally:
+                cursor.close()
+
+            files.append({'file': name, 'status': 'INSERTED', 'rows_parsed': len(frame),
+                          'rows_loaded': len(frame), 'errors_seen': 0, 'first_error': None})
+        return files
+
+    @staticmethod
+    def _paths(data) -> List[Path]:
+        """Normalize one path or a list of paths."""
+        paths = [data] if isinstance(data, (str, Path)) else list(data)
+        if not paths:
+            raise ValueError("No input files given")
+        return [Path(path) for path in paths]
+
+    @staticmethod
+    def _read(path: Path) -> pd.DataFrame:
+        """Read a local Parquet or CSV input file."""
+        return pd.read_parquet(path) if file_type(path) == 'parquet' else pd.read_csv(path)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Cache Warmer Module
+
+This module pre-executes popular questions so the first user after a deploy
+or cache expiry gets an instant answer. A background thread warms the result
+cache at startup and refreshes it on a fixed interval.
+"""
+
+import os
+import sys
+import time
+import threading
+import logging
+from pathlib import Path
+from typing import List, Optional
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def load_questions(source: Optional[str]) -> Optional[List[str]]:
+    """Load questions from a file (one per line) or a ';'-separated string."""
+    if not source:
+        return None
+    path = Path(source)
+    if path.is_file():
+        lines = path.read_text(encoding='utf-8').splitlines()
+    else:
+        lines = source.split(';')
+    return [line.strip() for line in lines if line.strip() and not line.strip().startswith('#')]
+
+class CacheWarmer:
+    """Class to keep the answers to a list of questions warm in the result cache."""
+
+    def __init__(self, analyst, questions: Optional[List[str]] = None,
+                 interval: Optional[float] = None):
+        """Initialize the warmer.
+
+        ``questions`` defaults to the analyst's sample questions and
+        ``interval`` to the result cache TTL.
+        """
+        self.analyst = analyst
+        self.questions = questions or analyst.get_sample_questions()
+        self.interval = interval or max(analyst.result_cache.ttl, 60)
+
+        self.last_run = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_env(cls, analyst) -> 'CacheWarmer':
+        """Create a warmer configured from CORTEX_WARM_* environment variables."""
+        interval = os.getenv('CORTEX_WARM_INTERVAL')
+        return cls(
+            analyst,
+            questions=load_questions(os.getenv('CORTEX_WARM_QUESTIONS')),
+            interval=float(interval) if interval else None
+        )
+
+    def warm(self) -> int:
+        """Refresh every question once and return the number that succeeded."""
+        started = time.time()
+        warmed = 0
+        for question in self.questions:
+            if self._stop.is_set():
+                break
+            try:
+                result = self.analyst.refresh_question(question)
+                if result['success']:
+                    warmed += 1
+                else:
+                    logger.warning(f"Failed to warm '{question}': {result.get('error')}")
+            except Exception as e:
+                logger.warning(f"Failed to warm '{question}': {str(e)}")
+
+        self.last_run = time.time()
+        logger.info(f"Warmed {warmed}/{len(self.questions)} questions in {self.last_run - started:.1f}s")
+        return warmed
+
+    def start(self):
+        """Warm the cache now and keep refreshing it in a daemon thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='cache-warmer', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop the background thread."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        """Warm immediately, then once per interval until stopped."""
+        while not self._stop.is_set():
+            self.warm()
+            self._stop.wait(self.interval)
+
+def main():
+    """Run the cache warmer in the foreground."""
+    from cortex_analyst import CortexAnalyst
+
+    analyst = CortexAnalyst()
+    if not analyst.connect():
+        print("❌ Connection failed!")
+        sys.exit(1)
+
+    warmer = CacheWarmer.from_env(analyst)
+    print(f"🔥 Warming {len(warmer.questions)} questions every {warmer.interval:.0f}s (Ctrl+C to stop)")
+    try:
+        warmer.start()
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\n👋 Cache warmer stopped by user")
+    finally:
+        warmer.stop(timeout=5)
+        analyst.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Catalog Cache Module
+
+This module caches Snowflake catalog metadata (databases, schemas, tables,
+columns, warehouses and roles) with a TTL and explicit invalidation. Filters
+and limits are pushed into the SHOW command itself (LIKE, IN, STARTS WITH,
+LIMIT) instead of fetching every object and slicing in Python, and
+concurrent misses for the same listing share one SHOW call.
+"""
+
+import os
+import re
+import logging
+from typing import Dict, List, Any, Callable, Optional
+
+from result_cache import ResultCache
+from single_flight import SingleFlight
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# SHOW object type and the optional clauses it accepts, per catalog kind
+SHOW_KINDS = {
+    'databases': ('DATABASES', {'starts_with', 'limit'}),
+    'schemas': ('SCHEMAS', {'in', 'starts_with', 'limit'}),
+    'tables': ('TABLES', {'in', 'starts_with', 'limit'}),
+    'columns': ('COLUMNS', {'in'}),
+    'warehouses': ('WAREHOUSES', set()),
+    'roles': ('ROLES', set())
+}
+
+# Scopes for IN: ACCOUNT, or DATABASE/SCHEMA/TABLE followed by an identifier
+SCOPE_PATTERN = re.compile(
+    r'^(?:ACCOUNT|(?:DATABASE|SCHEMA|TABLE|VIEW)\s+(?:[A-Za-z_][\w$]*|"[^"]+")'
+    r'(?:\.(?:[A-Za-z_][\w$]*|"[^"]+")){0,2})$',
+    re.IGNORECASE
+)
+
+def quote_literal(value: str) -> str:
+    """Return a single-quoted SQL string literal."""
+    return "'" + value.replace('\\', '\\\\').replace("'", "\\'") + "'"
+
+def show_sql(kind: str, like: Optional[str] = None, scope: Optional[str] = None,
+             starts_with: Optional[str] = None, limit: Optional[int] = None) -> str:
+    """Build a SHOW command with the filters and limit the object type supports."""
+    if kind not in SHOW_KINDS:
+        raise ValueError(f"Unknown catalog kind: {kind}")
+    object_type, clauses = SHOW_KINDS[kind]
+
+    sql = f"SHOW {object_type}"
+    if like:
+        sql += f" LIKE {quote_literal(like)}"
+    if scope:
+        if 'in' not in clauses or not SCOPE_PATTERN.match(scope.strip()):
+            raise ValueError(f"Invalid scope for SHOW {object_type}: {scope}")
+        sql += f" IN {scope.strip()}"
+    if starts_with and 'starts_with' in clauses:
+        sql += f" STARTS WITH {quote_literal(starts_with)}"
+    if limit is not None and 'limit' in clauses:
+        sql += f" LIMIT {int(limit)}"
+    return sql
+
+class CatalogCache:
+    """Class to cache catalog listings with a TTL."""
+
+    def __init__(self, run: Callable[[str], Optional[List[Any]]], ttl: int = 300,
+                 max_entries: int = 512):
+        """Initialize the cache.
+
+        ``run(sql)`` executes a SHOW command and returns its rows (or None on
+        failure, which is not cached).
+        """
+        self.run = run
+        self.cache = ResultCache(ttl=ttl, max_entries=max_entries)
+        self.single_flight = SingleFlight()
+
+    @classmethod
+    def from_env(cls, run: Callable[[str], Optional[List[Any]]]) -> 'CatalogCache':
+        """Create a cache configured from CORTEX_CATALOG_* environment variables."""
+        return cls(
+            run,
+            ttl=int(os.getenv('CORTEX_CATALOG_TTL', '300')),
+            max_entries=int(os.getenv('CORTEX_CATALOG_MAX_ENTRIES', '512'))
+        )
+
+    def show(self, kind: str, like: Optional[str] = None, scope: Optional[str] = None,
+             starts_with: Optional[str] = None, limit: Optional[int] = None,
+             refresh: bool = False) -> Optional[List[Any]]:
+        """Return a (possibly cached) catalog listing.
+
+        LIKE, IN, STARTS WITH and LIMIT run in Snowflake where the object type
+        supports them; a limit the command cannot take is applied to the rows.
+        """
+        sql = show_sql(kind, like, scope, starts_with, limit)
+        key = f"{kind}|{sql}"
+        if not refresh:
+            rows = self.cache.get(key)
+            if rows is not None:
+                return rows
+
+        rows = self.single_flight.do(key, lambda: self.run(sql))
+        if rows is None:
+            return None
+        if limit is not None and 'limit' not in SHOW_KINDS[kind][1]:
+            rows = rows[:limit]
+        self.cache.set(key, rows)
+        return rows
+
+    def databases(self, **filters) -> Optional[List[Any]]:
+        """Return databases."""
+        return self.show('databases', **filters)
+
+    def schemas(self, database: Optional[str] = None, **filters) -> Optional[List[Any]]:
+        """Return schemas of a database (the current one by default)."""
+        return self.show('schemas', scope=f"DATABASE {database}" if database else None, **filters)
+
+    def tables(self, schema: Optional[str] = None, **filters) -> Optional[List[Any]]:
+        """Return tables of a schema (the current one by default)."""
+        return self.show('tables', scope=f"SCHEMA {schema}" if schema else None, **filters)
+
+    def columns(self, table: str, **filters) -> Optional[List[Any]]:
+        """Return the columns of a table."""
+        return self.show('columns', scope=f"TABLE {table}", **filters)
+
+    def warehouses(self, **filters) -> Optional[List[Any]]:
+        """Return warehouses."""
+        return self.show('warehouses', **filters)
+
+    def roles(self, **filters) -> Optional[List[Any]]:
+        """Return roles."""
+        return self.show('roles', **filters)
+
+    def invalidate(self, kind: Optional[str] = None):
+        """Drop cached listings of one kind (e.g. after DDL), or all of them."""
+        self.cache.invalidate(prefix=f"{kind}|" if kind else None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache counters."""
+        return self.cache.stats()
@@ -2,15 +2,17 @@
 """
 Snowflake Connection Script with Direct Credentials
 
-This script connects to Snowflake using the provided credentials:
-- Username: rams
-- Password: Sumajavikhyavihaan1981
+This script connects to Snowflake using the credentials of the shared
+credential provider (.env, a credentials file or AWS Secrets Manager, per
+CORTEX_CREDENTIALS_SOURCE), with these defaults:
 - Warehouse: compute_wh
 - Role: accountadmin
 """
 
 import snowflake.connector
 import logging
+from credential_provider import shared_provider
+from snowflake_auth import apply_auth
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -20,36 +22,29 @@ def connect_to_snowflake():
     """Connect to Snowflake with the specified credentials."""
     
     # Connection parameters
-    connection_params = {
-        'user': 'rams',
-        'password': 'Sumajavikhyavihaan1981',
+    connection_params = shared_provider().connection_params({
         'warehouse': 'compute_wh',
         'role': 'accountadmin'
-        # Note: account parameter is required but not provided
-        # You'll need to add your Snowflake account identifier
-        # 'account': 'your_account_identifier'
-    }
+    })
     
     try:
         logger.info("Attempting to connect to Snowflake...")
         
-        # Note: You need to add the account parameter
         # The account identifier is typically in the format: organization-account_name
         # or for legacy accounts: account_name.region.cloud_provider
-        print("⚠️  WARNING: Account identifier is required but not provided.")
-        print("Please add your Snowflake account identifier to the connection_params.")
-        print("Example formats:")
-        print("  - For new accounts: 'organization-account_name'")
-        print("  - For legacy accounts: 'account_name.region.cloud_provider'")
-        print("  - Example: 'myorg-myaccount' or 'xy12345.us-east-1.aws'")
+        if not connection_params.get('account'):
+            print("⚠️  WARNING: Account identifier is required but not provided.")
+            print("Please set SNOWFLAKE_ACCOUNT (or 'account' in your credentials source).")
+            print("Example formats:")
+            print("  - For new accounts: 'organization-account_name'")
+            print("  - For legacy accounts: 'account_name.region.cloud_provider'")
+            print("  - Example: 'myorg-myaccount' or 'xy12345.us-east-1.aws'")
+            return None, None
         
-        # Uncomment and modify the following lines once you have the account identifier:
-        # connection = snowflake.connector.connect(**connection_params)
-        # cursor = connection.cursor()
-        # logger.info("✅ Successfully connected to Snowflake!")
-        # return connection, cursor
-        
-        return None, None
+        connection = snowflake.connector.connect(**apply_auth(connection_params))
+        cursor = connection.cursor()
+        logger.info("✅ Successfully connected to Snowflake!")
+        return connection, cursor
         
     except Exception as e:
         logger.error(f"❌ Failed to connect to Snowflake: {str(e)}")
@@ -133,11 +128,7 @@ def main():
     
     print("Snowflake Connection Script")
     print("="*60)
-    print("Credentials:")
-    print(f"  Username: rams")
-    print(f"  Password: {'*' * len('Sumajavikhyavihaan1981')}")
-    print(f"  Warehouse: compute_wh")
-    print(f"  Role: accountadmin")
+    print("Credentials: from CORTEX_CREDENTIALS_SOURCE (default: .env / environment)")
     print("="*60)
     
     # Attempt connection
@@ -153,7 +144,7 @@ def main():
         logger.info("✅ Connection closed successfully")
     else:
         print("\n❌ Connection failed. Please check the following:")
-        print("1. Add your Snowflake account identifier")
+        print("1. Set your Snowflake account identifier")
         print("2. Verify your credentials are correct")
         print("3. Ensure your network can reach Snowflake")
         print("4. Check if the warehouse and role exist and are accessible")
@@ -7,47 +7,295 @@ using a semantic layer for natural language queries.
 """
 
 import os
+import re
 import json
+import time
+import uuid
+import contextvars
 import yaml
 import pandas as pd
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Iterator, Optional, Tuple
 from snowflake.snowpark import Session
-from dotenv import load_dotenv
+from query_guard import QueryGuard, sql_hash
+from warehouse_router import WarehouseRouter
+from session_pool import SessionPool
+from rollup_manager import RollupManager
+from question_normalizer import normalize_text, extract_slots, canonical_key
+from result_cache import ResultCache
+from single_flight import SingleFlight
+from query_tracker import QueryTracker, result_scan_sql
+from cortex_analyst_client import CortexAnalystClient
+from semantic_index import SemanticIndex
+from approximate_query import ApproximateQuery
+from snowflake_auth import apply_auth, missing_params
+from credential_provider import shared_provider
+from query_registry import (QueryRegistry, current_owner, current_checkpoint, session_parameters,
+                            parse_timeouts)
+import threading
 import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# SQL template for each question intent, keyed by intent name
+INTENT_SQL = {
+    'revenue_by_year': """
+    SELECT 
+        YEAR(o.O_ORDERDATE) as order_year,
+        SUM(o.O_TOTALPRICE) as total_revenue
+    FROM SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.ORDERS o
+    GROUP BY YEAR(o.O_ORDERDATE)
+    ORDER BY order_year
+    """,
+    'top_customers': """
+    SELECT 
+        c.C_NAME as customer_name,
+        SUM(o.O_TOTALPRICE) as total_order_value,
+        COUNT(o.O_ORDERKEY) as order_count
+    FROM SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.ORDERS o
+    JOIN SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.CUSTOMER c ON o.O_CUSTKEY = c.C_CUSTKEY
+    GROUP BY c.C_NAME
+    ORDER BY total_order_value DESC
+    LIMIT {n}
+    """,
+    'aov_by_segment': """
+    SELECT 
+        c.C_MKTSEGMENT as market_segment,
+        AVG(o.O_TOTALPRICE) as average_order_value,
+        COUNT(o.O_ORDERKEY) as order_count
+    FROM SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.ORDERS o
+    JOIN SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.CUSTOMER c ON o.O_CUSTKEY = c.C_CUSTKEY
+    GROUP BY c.C_MKTSEGMENT
+    ORDER BY average_order_value DESC
+    """,
+    'orders_by_month': """
+    SELECT 
+        MONTH(O_ORDERDATE) as order_month,
+        MONTHNAME(O_ORDERDATE) as month_name,
+        COUNT(O_ORDERKEY) as order_count,
+        SUM(O_TOTALPRICE) as total_revenue
+    FROM SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.ORDERS
+    WHERE YEAR(O_ORDERDATE) = {year}
+    GROUP BY MONTH(O_ORDERDATE), MONTHNAME(O_ORDERDATE)
+    ORDER BY order_month
+    """,
+    'revenue_by_nation': """
+    SELECT 
+        n.N_NAME as nation_name,
+        SUM(o.O_TOTALPRICE) as total_revenue,
+        COUNT(o.O_ORDERKEY) as order_count,
+        AVG(o.O_TOTALPRICE) as average_order_value
+    FROM SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.ORDERS o
+    JOIN SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.CUSTOMER c ON o.O_CUSTKEY = c.C_CUSTKEY
+    JOIN SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.NATION n ON c.C_NATIONKEY = n.N_NATIONKEY
+    GROUP BY n.N_NAME
+    ORDER BY total_revenue DESC
+    """,
+    'orders_by_priority': """
+    SELECT 
+        O_ORDERPRIORITY as order_priority,
+        COUNT(O_ORDERKEY) as order_count,
+        SUM(O_TOTALPRICE) as total_revenue,
+        AVG(O_TOTALPRICE) as average_order_value
+    FROM SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.ORDERS
+    GROUP BY O_ORDERPRIORITY
+    ORDER BY order_count DESC
+    """,
+    'revenue_by_quarter': """
+    SELECT 
+        YEAR(O_ORDERDATE) as order_year,
+        QUARTER(O_ORDERDATE) as order_quarter,
+        SUM(O_TOTALPRICE) as total_revenue,
+        COUNT(O_ORDERKEY) as order_count
+    FROM SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.ORDERS
+    GROUP BY YEAR(O_ORDERDATE), QUARTER(O_ORDERDATE)
+    ORDER BY order_year, order_quarter
+    """,
+    'customers_by_nation': """
+    SELECT 
+        n.N_NAME as nation_name,
+        COUNT(DISTINCT c.C_CUSTKEY) as customer_count,
+        SUM(c.C_ACCTBAL) as total_account_balance
+    FROM SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.CUSTOMER c
+    JOIN SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.NATION n ON c.C_NATIONKEY = n.N_NATIONKEY
+    GROUP BY n.N_NAME
+    ORDER BY customer_count DESC
+    """,
+    'revenue_by_segment': """
+    SELECT 
+        c.C_MKTSEGMENT as market_segment,
+        SUM(o.O_TOTALPRICE) as total_revenue,
+        COUNT(o.O_ORDERKEY) as order_count,
+        COUNT(DISTINCT c.C_CUSTKEY) as customer_count
+    FROM SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.ORDERS o
+    JOIN SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.CUSTOMER c ON o.O_CUSTKEY = c.C_CUSTKEY
+    GROUP BY c.C_MKTSEGMENT
+    ORDER BY total_revenue DESC
+    """,
+    'monthly_sales': """
+    SELECT 
+        YEAR(O_ORDERDATE) as order_year,
+        MONTH(O_ORDERDATE) as order_month,
+        MONTHNAME(O_ORDERDATE) as month_name,
+        SUM(O_TOTALPRICE) as total_revenue,
+        COUNT(O_ORDERKEY) as order_count
+    FROM SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.ORDERS
+    WHERE YEAR(O_ORDERDATE) BETWEEN 1992 AND 1998
+    GROUP BY YEAR(O_ORDERDATE), MONTH(O_ORDERDATE), MONTHNAME(O_ORDERDATE)
+    ORDER BY order_year, order_month
+    """,
+    'order_summary': """
+    SELECT 
+        COUNT(O_ORDERKEY) as total_orders,
+        SUM(O_TOTALPRICE) as total_revenue,
+        AVG(O_TOTALPRICE) as average_order_value,
+        MIN(O_ORDERDATE) as earliest_order,
+        MAX(O_ORDERDATE) as latest_order
+    FROM SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.ORDERS
+    """
+}
+
+# Parameters each intent takes from the question's slots, with defaults
+INTENT_PARAMS = {
+    'top_customers': {'n': 10},
+    'orders_by_month': {'year': 1995}
+}
+
+# Semantic shape of the intents a metric rollup can answer: the selected
+# (alias, dimension or metric) pairs, filters on dimensions (':name' refers
+# to an intent parameter) and ordering
+INTENT_SPECS = {
+    'revenue_by_year': {
+        'select': [('order_year', 'order_year'), ('total_revenue', 'total_revenue')],
+        'order_by': 'order_year'
+    },
+    'aov_by_segment': {
+        'select': [('market_segment', 'market_segment'),
+                   ('average_order_value', 'average_order_value'),
+                   ('order_count', 'order_count')],
+        'order_by': 'average_order_value DESC'
+    },
+    'orders_by_month': {
+        'select': [('order_month', 'order_month'), ('month_name', 'month_name'),
+                   ('order_count', 'order_count'), ('total_revenue', 'total_revenue')],
+        'filters': {'order_year': ':year'},
+        'order_by': 'order_month'
+    },
+    'revenue_by_nation': {
+        'select': [('nation_name', 'nation_name'), ('total_revenue', 'total_revenue'),
+                   ('order_count', 'order_count'),
+                   ('average_order_value', 'average_order_value')],
+        'order_by': 'total_revenue DESC'
+    },
+    'revenue_by_quarter': {
+        'select': [('order_year', 'order_year'), ('order_quarter', 'order_quarter'),
+                   ('total_revenue', 'total_revenue'), ('order_count', 'order_count')],
+        'order_by': 'order_year, order_quarter'
+    },
+    'revenue_by_segment': {
+        'select': [('market_segment', 'market_segment'), ('total_revenue', 'total_revenue'),
+                   ('order_count', 'order_count'), ('customer_count', 'customer_count')],
+        'order_by': 'total_revenue DESC'
+    },
+    'monthly_sales': {
+        'select': [('order_year', 'order_year'), ('order_month', 'order_month'),
+                   ('month_name', 'month_name'), ('total_revenue', 'total_revenue'),
+                   ('order_count', 'order_count')],
+        'filters': {'order_year': (1992, 1998)},
+        'order_by': 'order_year, order_month'
+    },
+    'order_summary': {
+        'select': [('total_orders', 'order_count'), ('total_revenue', 'total_revenue'),
+                   ('average_order_value', 'average_order_value'),
+                   ('earliest_order', 'earliest_order'), ('latest_order', 'latest_order')]
+    }
+}
+
+# Named template placeholders, e.g. ``{n}``, bound as qmark parameters
+PLACEHOLDER_PATTERN = re.compile(r'\{(\w+)\}')
+
+def bind_template(template: str, params: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    """Replace ``{name}`` placeholders with ``?`` and return (SQL, binds).
+    
+    The statement text is the same for every parameter value, so Snowflake
+    reuses the compiled plan across variants.
+    """
+    binds = []
+    
+    def bind(match):
+        binds.append(params[match.group(1)])
+        return '?'
+    
+    return PLACEHOLDER_PATTERN.sub(bind, template), binds
+
+def inline_binds(sql: str, binds: Optional[List[Any]]) -> str:
+    """Return a statement with its qmark binds rendered as literals, for display."""
+    values = iter(binds or [])
+    
+    def literal(match):
+        value = next(values)
+        if isinstance(value, str):
+            return "'" + value.replace("'", "''") + "'"
+        return str(value)
+    
+    return re.sub(r'\?', literal, sql) if binds else sql
+
 class CortexAnalyst:
     """Class to handle Snowflake Cortex Analyst operations with semantic layer."""
     
     def __init__(self, semantic_model_path: str = "semantic_model.yaml"):
         """Initialize the Cortex Analyst with semantic model."""
-        load_dotenv()
-        
-        self.connection_params = {
-            'account': os.getenv('SNOWFLAKE_ACCOUNT'),
-            'user': os.getenv('SNOWFLAKE_USER'),
-            'password': os.getenv('SNOWFLAKE_PASSWORD'),
-            'warehouse': os.getenv('SNOWFLAKE_WAREHOUSE'),
-            'database': os.getenv('SNOWFLAKE_DATABASE', 'SNOWFLAKE_SAMPLE_DATA'),
-            'schema': os.getenv('SNOWFLAKE_SCHEMA', 'TPCH_SF1'),
-            'role': os.getenv('SNOWFLAKE_ROLE')
-        }
+        # Credentials come from the process-wide provider (env, file or Secrets Manager)
+        self.credentials = shared_provider()
+        self.connection_params = self.credentials.connection_params({
+            'database': 'SNOWFLAKE_SAMPLE_DATA',
+            'schema': 'TPCH_SF1',
+            # QUERY_TAG and the server-side statement timeout
+            'session_parameters': session_parameters()
+        })
         
         self.session = None
+        self._session_configs = None
+        self._credentials_version = None
+        self.router = None
+        self.pool = None
+        self.analyst_client = None
         self.semantic_model = None
+        self.semantic_index = None
         self.semantic_model_path = semantic_model_path
+        self.context_tokens = int(os.getenv('CORTEX_CONTEXT_TOKENS', '2000'))
+        self._full_context = None
+        self.query_guard = QueryGuard.from_env()
+        self.result_cache = ResultCache.from_env()
+        self.single_flight = SingleFlight()
+        self.query_tracker = QueryTracker.from_env()
+        self.inline_rows = int(os.getenv('CORTEX_INLINE_ROWS', '10000'))
+        self.approximator = ApproximateQuery.from_env(self._table_rows)
+        self.query_timeout = float(os.getenv('CORTEX_QUERY_TIMEOUT', '120'))
+        self.intent_timeouts = parse_timeouts(os.getenv('CORTEX_INTENT_TIMEOUTS'))
+        self.running_queries = QueryRegistry(self.cancel_query)
+        self._revalidating = set()
+        self._revalidate_lock = threading.Lock()
+        self._revalidator = ThreadPoolExecutor(max_workers=2, thread_name_prefix='revalidate')
+        self._sql_runner = ThreadPoolExecutor(max_workers=int(os.getenv('CORTEX_POOL_SIZE', '8')),
+                                              thread_name_prefix='analyst-sql')
+        # Runs queries whose caller must stay responsive to its checkpoint
+        self._query_waiter = ThreadPoolExecutor(max_workers=2 * int(os.getenv('CORTEX_POOL_SIZE', '8')),
+                                                thread_name_prefix='query-wait')
         
         # Load semantic model
         self._load_semantic_model()
+        self.rollups = RollupManager.from_env(self.semantic_model,
+                                              warehouse=self.connection_params['warehouse'])
     
     def _load_semantic_model(self):
         """Load the semantic model from YAML file."""
         try:
             with open(self.semantic_model_path, 'r') as file:
                 self.semantic_model = yaml.safe_load(file)
+            self.semantic_index = SemanticIndex(self.semantic_model)
             logger.info(f"Semantic model loaded from {self.semantic_model_path}")
         except Exception as e:
             logger.error(f"Failed to load semantic model: {str(e)}")
@@ -56,29 +304,78 @@ class CortexAnalyst:
     def connect(self) -> bool:
         """Establish connection to Snowflake using Snowpark."""
         try:
-            # Validate required parameters
-            required_params = ['account', 'user', 'password']
-            missing_params = [param for param in required_params 
-                            if not self.connection_params.get(param)]
+            # Password, key-pair (JWT), SSO or OAuth, per SNOWFLAKE_AUTHENTICATOR
+            self._session_configs = self._auth_configs()
             
-            if missing_params:
-                raise ValueError(f"Missing required parameters: {', '.join(missing_params)}")
+            # Validate required parameters
+            missing = missing_params(self._session_configs)
+            if missing:
+                raise ValueError(f"Missing required parameters: {', '.join(missing)}")
             
             logger.info("Connecting to Snowflake via Snowpark...")
-            self.session = Session.builder.configs(self.connection_params).create()
+            self.session = Session.builder.configs(self._session_configs).create()
             logger.info("Successfully connected to Snowflake!")
             
+            # Route query classes to warehouses, reusing this session for the default one
+            self.router = WarehouseRouter.from_env(
+                self._create_session,
+                self.connection_params['warehouse'],
+                show_warehouses=lambda: self.session.sql("SHOW WAREHOUSES").collect()
+            )
+            self.router.register(self.connection_params['warehouse'], self.session)
+            self.rollups.refresh(self.session)
+            
+            # Queries run on pooled sessions so concurrent users never share one
+            self.pool = SessionPool.from_env(self._create_session)
+            
+            # Generate SQL with the Cortex Analyst API instead of local patterns
+            if os.getenv('CORTEX_ANALYST_MODE', 'patterns').lower() == 'api':
+                prune = os.getenv('CORTEX_ANALYST_PRUNE_MODEL', 'false').lower() == 'true'
+                self.analyst_client = CortexAnalystClient.from_env(
+                    self.session, self.semantic_model_path,
+                    model_for=self.pruned_semantic_model if prune else None)
+            
             return True
             
         except Exception as e:
             logger.error(f"Failed to connect to Snowflake: {str(e)}")
             return False
     
-    def get_semantic_context(self) -> str:
-        """Generate semantic context for Cortex Analyst."""
+    def _auth_configs(self) -> Dict[str, Any]:
+        """Return session configs, re-applying authentication when the credentials rotated."""
+        self.connection_params = self.credentials.connection_params(self.connection_params)
+        version = self.credentials.version
+        if self._session_configs is None or version != self._credentials_version:
+            self._session_configs = apply_auth(self.connection_params)
+            self._credentials_version = version
+        return dict(self._session_configs)
+    
+    def _create_session(self, warehouse: Optional[str], role: Optional[str] = None) -> Session:
+        """Open an additional Snowpark session bound to a warehouse and role."""
+        configs = self._auth_configs()
+        if warehouse:
+            configs['warehouse'] = warehouse
+        if role:
+            configs['role'] = role
+        return Session.builder.configs(configs).create()
+    
+    def get_semantic_context(self, question: Optional[str] = None,
+                             max_tokens: Optional[int] = None) -> str:
+        """Generate semantic context for Cortex Analyst.
+        
+        With a ``question``, only the relevant elements (plus the join paths
+        between their tables) are included, within ``max_tokens``
+        (CORTEX_CONTEXT_TOKENS by default). Without one, the full model is
+        described; that context is built once and reused.
+        """
         if not self.semantic_model:
             return ""
         
+        if question:
+            return self.semantic_index.context(question, max_tokens or self.context_tokens)
+        if self._full_context is not None:
+            return self._full_context
+        
         context = f"Semantic Model: {self.semantic_model.get('name', 'Unknown')}\n"
         context += f"Description: {self.semantic_model.get('description', '')}\n\n"
         
@@ -102,178 +399,432 @@ class CortexAnalyst:
         for dim in self.semantic_model.get('dimensions', []):
             context += f"- {dim['name']}: {dim['description']}\n"
         
+        self._full_context = context
         return context
     
+    def pruned_semantic_model(self, question: str) -> str:
+        """Return the semantic model YAML limited to the elements relevant to a question.
+        
+        Falls back to the full model when nothing in it matches the question.
+        """
+        pruned = self.semantic_index.prune(question, self.context_tokens)
+        if not pruned['tables']:
+            pruned = self.semantic_model
+        return yaml.safe_dump(pruned, sort_keys=False)
+    
+    def match_intent(self, question: str) -> str:
+        """Match a natural language question to one of the INTENT_SQL intents."""
+        question_lower = normalize_text(question)
+        
+        # Define common query patterns
+        if "total revenue" in question_lower and "year" in question_lower:
+            return 'revenue_by_year'
+        elif "top" in question_lower and "customer" in question_lower:
+            return 'top_customers'
+        elif "average order value" in question_lower and "market segment" in question_lower:
+            return 'aov_by_segment'
+        elif ("orders" in question_lower and "month" in question_lower
+              and 'year' in extract_slots(question_lower)):
+            return 'orders_by_month'
+        elif "nation" in question_lower and "revenue" in question_lower:
+            return 'revenue_by_nation'
+        elif "priority" in question_lower and "order" in question_lower:
+            return 'orders_by_priority'
+        elif "quarter" in question_lower and "revenue" in question_lower:
+            return 'revenue_by_quarter'
+        elif "customer count" in question_lower and "nation" in question_lower:
+            return 'customers_by_nation'
+        elif "market segment" in question_lower and "revenue" in question_lower:
+            return 'revenue_by_segment'
+        elif "monthly sales" in question_lower or "sales trends" in question_lower:
+            return 'monthly_sales'
+        else:
+            # Default query - show basic order statistics
+            return 'order_summary'
+    
+    def parse_question(self, question: str) -> Tuple[str, Dict[str, Any]]:
+        """Canonicalize a question into its intent and the parameters it uses."""
+        slots = extract_slots(normalize_text(question))
+        intent = self.match_intent(question)
+        
+        params = {name: slots.get(name, default)
+                  for name, default in INTENT_PARAMS.get(intent, {}).items()}
+        if 'n' in params:
+            params['n'] = max(1, min(int(params['n']), 1000))
+        
+        return intent, params
+    
+    def intent_spec(self, intent: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Return the rollup spec of an intent with its parameters filled in."""
+        spec = INTENT_SPECS.get(intent)
+        if not spec:
+            return None
+        
+        filters = {dim: params[value[1:]] if isinstance(value, str) and value.startswith(':') else value
+                   for dim, value in spec.get('filters', {}).items()}
+        return {**spec, 'filters': filters}
+    
+    def intent_to_sql(self, intent: str, params: Dict[str, Any]) -> Tuple[str, List[Any]]:
+        """Render the parameterized SQL and qmark binds for an intent, preferring a rollup."""
+        # Prefer the smallest pre-built rollup that can answer the intent
+        rollup_statement = self.rollups.rewrite(self.intent_spec(intent, params))
+        if rollup_statement:
+            return rollup_statement
+        
+        return bind_template(INTENT_SQL[intent], params)
+    
     def natural_language_to_sql(self, question: str) -> str:
         """Convert natural language question to SQL using predefined patterns."""
         if not self.session:
             raise Exception("No active session. Please connect first.")
         
-        question_lower = question.lower()
+        return inline_binds(*self.intent_to_sql(*self.parse_question(question)))
+    
+    def explain_query(self, sql_query: str, role: Optional[str] = None,
+                      params: Optional[List[Any]] = None) -> str:
+        """Run an EXPLAIN statement and return its JSON plan."""
+        if not self.session:
+            raise Exception("No active session. Please connect first.")
         
-        # Define common query patterns
-        if "total revenue" in question_lower and "year" in question_lower:
-            return """
-            SELECT 
-                YEAR(o.O_ORDERDATE) as order_year,
-                SUM(o.O_TOTALPRICE) as total_revenue
-            FROM SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.ORDERS o
-            GROUP BY YEAR(o.O_ORDERDATE)
-            ORDER BY order_year
-            """
+        def explain():
+            with self.pool.session(self.router.route('preview'), role) as session:
+                return session.sql(sql_query, params=params or None).collect()[0][0]
         
-        elif "top" in question_lower and "customer" in question_lower:
-            limit = 10
-            if "top 5" in question_lower:
-                limit = 5
-            elif "top 20" in question_lower:
-                limit = 20
-            
-            return f"""
-            SELECT 
-                c.C_NAME as customer_name,
-                SUM(o.O_TOTALPRICE) as total_order_value,
-                COUNT(o.O_ORDERKEY) as order_count
-            FROM SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.ORDERS o
-            JOIN SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.CUSTOMER c ON o.O_CUSTKEY = c.C_CUSTKEY
-            GROUP BY c.C_NAME
-            ORDER BY total_order_value DESC
-            LIMIT {limit}
-            """
+        return self.single_flight.do(self._flight_key(sql_query, role, params=params), explain)
+    
+    @staticmethod
+    def _flight_key(sql_query: str, role: Optional[str], max_rows: Optional[int] = None,
+                    params: Optional[List[Any]] = None) -> str:
+        """Return the single-flight key of a statement: SQL and binds, role and row cap."""
+        return f"{sql_hash(sql_query, params)}|{(role or '').upper()}|{max_rows or ''}"
+    
+    def _run_query(self, sql_query: str, warehouse: Optional[str], role: Optional[str],
+                   max_rows: Optional[int] = None, params: Optional[List[Any]] = None,
+                   timeout: Optional[float] = None, running_key: Optional[str] = None) -> pd.DataFrame:
+        """Run a query on a pooled session and track its query ID, raising on failure.
         
-        elif "average order value" in question_lower and "market segment" in question_lower:
-            return """
-            SELECT 
-                c.C_MKTSEGMENT as market_segment,
-                AVG(o.O_TOTALPRICE) as average_order_value,
-                COUNT(o.O_ORDERKEY) as order_count
-            FROM SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.ORDERS o
-            JOIN SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.CUSTOMER c ON o.O_CUSTKEY = c.C_CUSTKEY
-            GROUP BY c.C_MKTSEGMENT
-            ORDER BY average_order_value DESC
-            """
-        
-        elif "orders" in question_lower and "month" in question_lower and "1995" in question_lower:
-            return """
-            SELECT 
-                MONTH(O_ORDERDATE) as order_month,
-                MONTHNAME(O_ORDERDATE) as month_name,
-                COUNT(O_ORDERKEY) as order_count,
-                SUM(O_TOTALPRICE) as total_revenue
-            FROM SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.ORDERS
-            WHERE YEAR(O_ORDERDATE) = 1995
-            GROUP BY MONTH(O_ORDERDATE), MONTHNAME(O_ORDERDATE)
-            ORDER BY order_month
-            """
+        With ``max_rows``, result batches are read only until the cap is
+        reached; the returned frame then has ``attrs['truncated'] = True`` and
+        the remaining rows stay in the persisted result for paging. A query
+        still running after ``timeout`` seconds is cancelled. ``running_key``
+        records the query ID in the running-query registry.
+        """
+        with self.pool.session(warehouse, role) as session:
+            logger.info(f"Executing query: {sql_query}")
+            job = session.sql(sql_query, params=params or None).collect_nowait()
+            self.query_tracker.record(sql_query, job.query_id, role=role, warehouse=warehouse,
+                                      params=params)
+            if running_key:
+                self.running_queries.started(running_key, job.query_id)
+            self._wait(job, timeout)
+            if not max_rows:
+                return job.result(result_type="pandas")
+            
+            batches, rows, truncated = [], 0, False
+            for batch in job.result(result_type="pandas_batches"):
+                batches.append(batch)
+                rows += len(batch)
+                if rows > max_rows:
+                    truncated = True
+                    break
+            data = pd.concat(batches, ignore_index=True).head(max_rows) if batches else pd.DataFrame()
+            data.attrs['truncated'] = truncated
+            return data
+    
+    def _wait(self, job, timeout: Optional[float]):
+        """Wait for a submitted query, cancelling it once ``timeout`` seconds have passed."""
+        if not timeout:
+            return
+        deadline = time.time() + timeout
+        delay = 0.05
+        while not job.is_done():
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                self.cancel_query(job.query_id)
+                raise TimeoutError(f"Query {job.query_id} cancelled after {timeout:g}s")
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 1.0)
+    
+    def _await(self, run, key: Optional[str] = None):
+        """Call ``run()``, checking the caller's checkpoint while it is in progress.
         
-        elif "nation" in question_lower and "revenue" in question_lower:
-            return """
-            SELECT 
-                n.N_NAME as nation_name,
-                SUM(o.O_TOTALPRICE) as total_revenue,
-                COUNT(o.O_ORDERKEY) as order_count,
-                AVG(o.O_TOTALPRICE) as average_order_value
-            FROM SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.ORDERS o
-            JOIN SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.CUSTOMER c ON o.O_CUSTKEY = c.C_CUSTKEY
-            JOIN SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.NATION n ON c.C_NATIONKEY = n.N_NATIONKEY
-            GROUP BY n.N_NAME
-            ORDER BY total_revenue DESC
-            """
+        If the checkpoint raises, the caller stops waiting and the statement
+        ``key`` (or, without one, every query of the owner) is cancelled
+        unless another owner still waits on it.
+        """
+        checkpoint = current_checkpoint.get()
+        if checkpoint is None:
+            return run()
         
-        elif "priority" in question_lower and "order" in question_lower:
-            return """
-            SELECT 
-                O_ORDERPRIORITY as order_priority,
-                COUNT(O_ORDERKEY) as order_count,
-                SUM(O_TOTALPRICE) as total_revenue,
-                AVG(O_TOTALPRICE) as average_order_value
-            FROM SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.ORDERS
-            GROUP BY O_ORDERPRIORITY
-            ORDER BY order_count DESC
-            """
+        future = self._query_waiter.submit(run)
+        while True:
+            try:
+                return future.result(timeout=0.25)
+            except FutureTimeout:
+                pass
+            try:
+                checkpoint()
+            except BaseException:
+                if key:
+                    self.running_queries.abandon(key)
+                else:
+                    self.running_queries.cancel_owner(current_owner.get())
+                raise
+    
+    def cancel_query(self, query_id: str) -> bool:
+        """Cancel a running query with SYSTEM$CANCEL_QUERY."""
+        if not self.session:
+            return False
+        try:
+            # The control session is never borrowed, so it is free even when the pool is not
+            self.session.sql("SELECT SYSTEM$CANCEL_QUERY(?)", params=[query_id]).collect()
+            logger.info(f"Cancelled query {query_id}")
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to cancel query {query_id}: {str(e)}")
+            return False
+    
+    def cancel_queries(self, owner: str) -> int:
+        """Cancel the running queries of an owner (e.g. a browser session) nobody else waits on."""
+        return self.running_queries.cancel_owner(owner)
+    
+    def execute_query(self, sql_query: str, warehouse: Optional[str] = None,
+                      query_class: str = 'aggregate', role: Optional[str] = None,
+                      max_rows: Optional[int] = None,
+                      params: Optional[List[Any]] = None,
+                      timeout: Optional[float] = None) -> pd.DataFrame:
+        """Execute SQL query and return results as DataFrame.
         
-        elif "quarter" in question_lower and "revenue" in question_lower:
-            return """
-            SELECT 
-                YEAR(O_ORDERDATE) as order_year,
-                QUARTER(O_ORDERDATE) as order_quarter,
-                SUM(O_TOTALPRICE) as total_revenue,
-                COUNT(O_ORDERKEY) as order_count
-            FROM SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.ORDERS
-            GROUP BY YEAR(O_ORDERDATE), QUARTER(O_ORDERDATE)
-            ORDER BY order_year, order_quarter
-            """
+        ``params`` are bound to the statement's ``?`` placeholders. The query
+        runs on a pooled session for ``warehouse`` if given, otherwise for the
+        warehouse routed for ``query_class`` (preview, aggregate or heavy),
+        using ``role`` if given. Concurrent calls for the same normalized SQL,
+        binds and role share a single execution. ``max_rows`` caps the rows
+        fetched into memory (see ``_run_query``). The query is cancelled after
+        ``timeout`` seconds (CORTEX_QUERY_TIMEOUT by default) or when its
+        owner (see ``query_registry.owned_by``) is cancelled. On failure the
+        empty frame carries the error in ``attrs['error']``.
+        """
+        if not self.session:
+            raise Exception("No active session. Please connect first.")
         
-        elif "customer count" in question_lower and "nation" in question_lower:
-            return """
-            SELECT 
-                n.N_NAME as nation_name,
-                COUNT(DISTINCT c.C_CUSTKEY) as customer_count,
-                SUM(c.C_ACCTBAL) as total_account_balance
-            FROM SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.CUSTOMER c
-            JOIN SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.NATION n ON c.C_NATIONKEY = n.N_NATIONKEY
-            GROUP BY n.N_NAME
-            ORDER BY customer_count DESC
-            """
+        try:
+            warehouse = warehouse or self.router.route(query_class)
+            key = self._flight_key(sql_query, role, max_rows, params)
+            with self.running_queries.track(key):
+                return self._await(lambda: self.single_flight.do(key, lambda: self._run_query(
+                    sql_query, warehouse, role, max_rows, params,
+                    timeout=timeout or self.query_timeout, running_key=key)), key)
+            
+        except Exception as e:
+            logger.error(f"Error executing query: {str(e)}")
+            data = pd.DataFrame()
+            data.attrs['error'] = str(e)
+            return data
+    
+    def stream_query(self, sql_query: str, warehouse: Optional[str] = None,
+                     query_class: str = 'heavy', role: Optional[str] = None,
+                     params: Optional[List[Any]] = None,
+                     timeout: Optional[float] = None) -> Iterator[pd.DataFrame]:
+        """Run a query and yield its whole result as pandas batches, raising on failure.
         
-        elif "market segment" in question_lower and "revenue" in question_lower:
-            return """
-            SELECT 
-                c.C_MKTSEGMENT as market_segment,
-                SUM(o.O_TOTALPRICE) as total_revenue,
-                COUNT(o.O_ORDERKEY) as order_count,
-                COUNT(DISTINCT c.C_CUSTKEY) as customer_count
-            FROM SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.ORDERS o
-            JOIN SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.CUSTOMER c ON o.O_CUSTKEY = c.C_CUSTKEY
-            GROUP BY c.C_MKTSEGMENT
-            ORDER BY total_revenue DESC
-            """
+        Unlike execute_query, no row cap applies and the result is never held
+        in memory at once; the pooled session stays checked out until the
+        batches are consumed. The statement is not shared with concurrent
+        callers but is tracked (query ID, owner, ``timeout``) the same way.
+        An empty result yields one empty frame with the result's columns.
+        """
+        if not self.session:
+            raise Exception("No active session. Please connect first.")
         
-        elif "monthly sales" in question_lower or "sales trends" in question_lower:
-            return """
-            SELECT 
-                YEAR(O_ORDERDATE) as order_year,
-                MONTH(O_ORDERDATE) as order_month,
-                MONTHNAME(O_ORDERDATE) as month_name,
-                SUM(O_TOTALPRICE) as total_revenue,
-                COUNT(O_ORDERKEY) as order_count
-            FROM SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.ORDERS
-            WHERE YEAR(O_ORDERDATE) BETWEEN 1992 AND 1998
-            GROUP BY YEAR(O_ORDERDATE), MONTH(O_ORDERDATE), MONTHNAME(O_ORDERDATE)
-            ORDER BY order_year, order_month
-            """
+        warehouse = warehouse or self.router.route(query_class)
+        key = self._flight_key(sql_query, role, params=params) + '|stream'
+        with self.running_queries.track(key):
+            with self.pool.session(warehouse, role) as session:
+                logger.info(f"Streaming query: {sql_query}")
+                job = session.sql(sql_query, params=params or None).collect_nowait()
+                self.query_tracker.record(sql_query, job.query_id, role=role, warehouse=warehouse,
+                                          params=params)
+                self.running_queries.started(key, job.query_id)
+                self._wait(job, timeout or self.query_timeout)
+                empty = True
+                for batch in job.result(result_type="pandas_batches"):
+                    empty = False
+                    yield batch
+                if empty:
+                    # No batches for an empty result; its empty frame still has the columns
+                    yield job.result(result_type="pandas")
+    
+    async def execute_query_async(self, sql_query: str, warehouse: Optional[str] = None,
+                                  query_class: str = 'aggregate', role: Optional[str] = None,
+                                  params: Optional[List[Any]] = None) -> pd.DataFrame:
+        """Async variant of execute_query; shares in-flight queries with sync callers.
         
-        else:
-            # Default query - show basic order statistics
-            return """
-            SELECT 
-                COUNT(O_ORDERKEY) as total_orders,
-                SUM(O_TOTALPRICE) as total_revenue,
-                AVG(O_TOTALPRICE) as average_order_value,
-                MIN(O_ORDERDATE) as earliest_order,
-                MAX(O_ORDERDATE) as latest_order
-            FROM SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.ORDERS
-            """
-    
-    def execute_query(self, sql_query: str) -> pd.DataFrame:
-        """Execute SQL query and return results as DataFrame."""
+        Like execute_query, a failure returns an empty frame with the error in
+        ``attrs['error']``.
+        """
         if not self.session:
             raise Exception("No active session. Please connect first.")
         
         try:
-            logger.info(f"Executing query: {sql_query}")
-            result = self.session.sql(sql_query).to_pandas()
-            return result
+            warehouse = warehouse or self.router.route(query_class)
+            key = self._flight_key(sql_query, role, params=params)
+            with self.running_queries.track(key):
+                return await self.single_flight.do_async(key, lambda: self._run_query(
+                    sql_query, warehouse, role, params=params,
+                    timeout=self.query_timeout, running_key=key))
             
         except Exception as e:
             logger.error(f"Error executing query: {str(e)}")
-            return pd.DataFrame()
+            data = pd.DataFrame()
+            data.attrs['error'] = str(e)
+            return data
+    
+    def ask_question(self, question: str, role: Optional[str] = None,
+                     warehouse: Optional[str] = None) -> Dict[str, Any]:
+        """Ask a natural language question and get results.
+        
+        Results are cached on the canonical (intent, params) key, so different
+        phrasings of the same question share one cache entry. A stale entry is
+        returned immediately while it is refreshed in the background. ``role``
+        and ``warehouse`` override the connection defaults for this call only.
+        """
+        if self.analyst_client:
+            return self._ask_analyst_api(question, role, warehouse)
+        
+        intent, params = self.parse_question(question)
+        cache_key = self._cache_key(intent, params, role)
+        
+        cached, stale = self.result_cache.lookup(cache_key)
+        if cached is not None:
+            if stale:
+                self._revalidate(cache_key, intent, params, question, role, warehouse)
+            return {**cached, 'question': question, 'cached': True, 'stale': stale}
+        
+        return self._answer_and_cache(cache_key, intent, params, question, role, warehouse)
     
-    def ask_question(self, question: str) -> Dict[str, Any]:
-        """Ask a natural language question and get results."""
+    def ask_approximate(self, question: str, role: Optional[str] = None,
+                        warehouse: Optional[str] = None,
+                        percent: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Answer a question from a sampled or approximate variant of its SQL.
+        
+        Meant to be shown while ``ask_question`` computes the exact answer.
+        Returns None when the exact answer is already cached or cheap (local
+        rollup, small table), or when SQL comes from the Cortex Analyst API.
+        ``percent`` overrides the sample rate chosen from the table size. The
+        result's ``approximate`` entry describes the sample and maps columns
+        to their 95% error bound columns. The rewritten SQL is cost-checked like
+        the exact one and skipped (None) unless the guard allows or routes it.
+        """
+        if self.analyst_client:
+            return None
+        
+        intent, params = self.parse_question(question)
+        cached, _ = self.result_cache.lookup(self._cache_key(intent, params, role))
+        if cached is not None or self.rollups.answer(self.intent_spec(intent, params)) is not None:
+            return None
+        
         try:
-            # Generate SQL from natural language
-            sql_query = self.natural_language_to_sql(question)
+            sql_query, binds = self.intent_to_sql(intent, params)
+            plan = self.approximator.rewrite(sql_query, percent)
+            if not plan:
+                return None
+            
+            # A sketch-only plan still scans every row; a limited or resampled
+            # plan would no longer match its error bounds
+            guard = self.guard_query(plan['sql'], binds, role)
+            if guard['action'] not in ('allow', 'route'):
+                logger.info(f"Skipping approximate answer, cost guard decided {guard['action']}")
+                return None
+            
+            result = self._execute_guarded(plan['sql'], binds, role, warehouse)
+            if result['success'] and result['data'].empty:
+                result.update(success=False, error='Approximate query returned no data')
+            result.update(question=question, source='approximate',
+                          approximate={key: plan[key] for key in ('table', 'percent', 'method', 'errors')})
+            return result
+            
+        except Exception as e:
+            logger.warning(f"Approximate answer failed: {str(e)}")
+            return None
+    
+    def _table_rows(self, table: str) -> Optional[int]:
+        """Return a table's row count from INFORMATION_SCHEMA (None if unknown)."""
+        parts = table.upper().split('.')
+        if len(parts) != 3 or not self.session:
+            return None
+        
+        data = self.execute_query(
+            f"SELECT ROW_COUNT FROM {parts[0]}.INFORMATION_SCHEMA.TABLES "
+            f"WHERE TABLE_SCHEMA = ? AND TABLE_NAME = ?",
+            query_class='preview', params=parts[1:]
+        )
+        return None if data.empty or pd.isna(data.iloc[0, 0]) else int(data.iloc[0, 0])
+    
+    def refresh_question(self, question: str, role: Optional[str] = None) -> Dict[str, Any]:
+        """Answer a question bypassing the cache and store the fresh result."""
+        if self.analyst_client:
+            return self._ask_analyst_api(question, role, None, use_cache=False)
+        
+        intent, params = self.parse_question(question)
+        return self._answer_and_cache(self._cache_key(intent, params, role),
+                                      intent, params, question, role, None)
+    
+    @staticmethod
+    def _cache_key(intent: str, params: Dict[str, Any], role: Optional[str]) -> str:
+        """Return the result cache key of a canonicalized question."""
+        cache_key = canonical_key(intent, params)
+        if role:
+            cache_key += f"|role={role.upper()}"
+        return cache_key
+    
+    def _answer_and_cache(self, cache_key: str, intent: str, params: Dict[str, Any],
+                          question: str, role: Optional[str],
+                          warehouse: Optional[str]) -> Dict[str, Any]:
+        """Answer a question and cache successful, non-empty, exact results."""
+        result = self._answer(intent, params, question, role, warehouse)
+        # A result the cost guard sampled is not the answer to the question
+        sampled = (result.get('guard') or {}).get('action') == 'sample'
+        if result['success'] and not result['data'].empty and not sampled:
+            self.result_cache.set(cache_key, result)
+        return result
+    
+    def _revalidate(self, cache_key: str, intent: str, params: Dict[str, Any],
+                    question: str, role: Optional[str], warehouse: Optional[str]):
+        """Refresh a stale cache entry in the background, once per key."""
+        with self._revalidate_lock:
+            if cache_key in self._revalidating:
+                return
+            self._revalidating.add(cache_key)
+        
+        def refresh():
+            try:
+                self._answer_and_cache(cache_key, intent, params, question, role, warehouse)
+            finally:
+                with self._revalidate_lock:
+                    self._revalidating.discard(cache_key)
+        
+        logger.info(f"Serving stale result, revalidating {cache_key}")
+        self._revalidator.submit(refresh)
+    
+    def _answer(self, intent: str, params: Dict[str, Any], question: str,
+                role: Optional[str] = None, warehouse: Optional[str] = None) -> Dict[str, Any]:
+        """Answer a canonicalized question from a rollup or the warehouse."""
+        try:
+            # Answer from a local rollup when one fits (works offline)
+            local_data = self.rollups.answer(self.intent_spec(intent, params))
+            if local_data is not None:
+                return {
+                    'success': True,
+                    'sql': None,
+                    'data': local_data,
+                    'question': question,
+                    'source': 'rollup',
+                    'rollup': local_data.attrs.get('rollup')
+                }
+            
+            # Generate SQL from the canonical intent
+            sql_query, binds = self.intent_to_sql(intent, params)
             
             if not sql_query:
                 return {
@@ -283,18 +834,120 @@ class CortexAnalyst:
                     'data': pd.DataFrame()
                 }
             
-            # Execute the query
-            data = self.execute_query(sql_query)
+            return {**self._execute_guarded(sql_query, binds, role, warehouse,
+                                            timeout=self.intent_timeouts.get(intent)),
+                    'question': question}
             
+        except Exception as e:
+            logger.error(f"Error processing question: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e),
+                'sql': None,
+                'data': pd.DataFrame()
+            }
+    
+    def guard_query(self, sql_query: str, binds: Optional[List[Any]] = None,
+                    role: Optional[str] = None) -> Dict[str, Any]:
+        """Return the query guard's decision (allow, limit, sample, route or reject) for a statement."""
+        return self.query_guard.check(sql_query, lambda sql: self.explain_query(sql, role, binds))
+    
+    def _execute_guarded(self, sql_query: str, binds: List[Any], role: Optional[str],
+                         warehouse: Optional[str], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Cost-check a generated statement, then execute it as the guard decided."""
+        # Pre-flight cost check
+        guard = self.guard_query(sql_query, binds, role)
+        if guard['action'] == 'reject':
             return {
-                'success': True,
+                'success': False,
+                'error': f"Query rejected by cost guard: {guard['reason']}",
                 'sql': sql_query,
+                'data': pd.DataFrame(),
+                'guard': guard
+            }
+        
+        # Execute the (possibly limited or sampled) query
+        sql_query = guard['sql']
+        query_class = 'heavy' if guard['action'] == 'route' else 'aggregate'
+        data = self.execute_query(sql_query, warehouse=guard['warehouse'] or warehouse,
+                                  query_class=query_class, role=role,
+                                  max_rows=self.inline_rows, params=binds, timeout=timeout)
+        if data.attrs.get('error'):
+            return {
+                'success': False,
+                'error': data.attrs['error'],
+                'sql': sql_query,
+                'params': binds,
                 'data': data,
-                'question': question
+                'guard': guard
+            }
+        
+        return {
+            'success': True,
+            'sql': sql_query,
+            'params': binds,
+            'data': data,
+            'guard': guard,
+            'query_id': self.last_query_id(sql_query, role, binds),
+            'truncated': data.attrs.get('truncated', False)
+        }
+    
+    def _ask_analyst_api(self, question: str, role: Optional[str], warehouse: Optional[str],
+                         use_cache: bool = True) -> Dict[str, Any]:
+        """Answer a question with SQL generated by the Cortex Analyst API.
+        
+        The statement starts executing as soon as it has streamed in, while
+        the rest of the response is still arriving. If the response then
+        fails, the statement is cancelled.
+        """
+        execution = {}
+        abandoned = threading.Event()
+        
+        def check_abandoned():
+            if abandoned.is_set():
+                raise RuntimeError("Cortex Analyst response failed, abandoning its query")
+        
+        def run_sql(statement: str):
+            # Run with this caller's owner (the caller itself checks its checkpoint); the
+            # statement's own checkpoint only stops it once the response has failed
+            context = contextvars.copy_context()
+            context.run(current_checkpoint.set, check_abandoned)
+            if not current_owner.get():
+                # Track the query even without an owner, so it can be cancelled
+                context.run(current_owner.set, f"analyst-sql:{uuid.uuid4().hex[:12]}")
+            execution['future'] = self._sql_runner.submit(context.run, self._execute_guarded,
+                                                          statement, [], role, warehouse)
+        
+        def abandon():
+            # Not started yet: drop it; running: its checkpoint cancels the query
+            if 'future' in execution:
+                abandoned.set()
+                execution['future'].cancel()
+        
+        try:
+            response = self.analyst_client.message(question, on_sql=run_sql, use_cache=use_cache)
+            if not response['success'] or 'future' not in execution:
+                abandon()
+                return {
+                    'success': False,
+                    'error': response.get('error') or response.get('text') or 'Cortex Analyst returned no SQL',
+                    'sql': None,
+                    'data': pd.DataFrame(),
+                    'suggestions': response.get('suggestions', [])
+                }
+            
+            return {
+                **self._await(execution['future'].result),
+                'question': question,
+                'interpretation': response['text'],
+                'suggestions': response['suggestions'],
+                'request_id': response['request_id'],
+                'source': 'cortex_analyst'
             }
             
         except Exception as e:
             logger.error(f"Error processing question: {str(e)}")
+            abandon()
             return {
                 'success': False,
                 'error': str(e),
@@ -302,6 +955,70 @@ class CortexAnalyst:
                 'data': pd.DataFrame()
             }
     
+    def last_query_id(self, sql_query: str, role: Optional[str] = None,
+                      params: Optional[List[Any]] = None) -> Optional[str]:
+        """Return the query ID of a statement's still-persisted result, if any."""
+        entry = self.query_tracker.lookup(sql_query, role, params)
+        return entry['query_id'] if entry else None
+    
+    def scan_result(self, query_id: str, select: str = '*', where: Optional[str] = None,
+                    group_by: Optional[List[str]] = None, order_by: Optional[str] = None,
+                    limit: Optional[int] = None, offset: Optional[int] = None) -> pd.DataFrame:
+        """Run a follow-up (page, sort, export, re-aggregation) over a persisted result.
+        
+        The result is read with RESULT_SCAN; if it is no longer persisted, the
+        original query is run again and the follow-up retried on the new result.
+        """
+        if not self.session:
+            raise Exception("No active session. Please connect first.")
+        
+        entry = self.query_tracker.get(query_id)
+        query_id, role = self.persisted_result(query_id)
+        warehouse = self.router.route('preview')
+        
+        scan = lambda current_id: result_scan_sql(current_id, select, where, group_by,
+                                                  order_by, limit, offset)
+        try:
+            return self._run_query(scan(query_id), warehouse, role, timeout=self.query_timeout)
+        except Exception as e:
+            if not entry:
+                raise
+            logger.warning(f"Persisted result {query_id} unavailable, recomputing: {str(e)}")
+            self.query_tracker.forget(query_id)
+            return self._run_query(scan(self._recompute(entry)), warehouse, role,
+                                   timeout=self.query_timeout)
+    
+    def persist_scan(self, query_id: str, select: str) -> str:
+        """Store a SELECT over a persisted result as a new persisted result and return its query ID.
+        
+        Only one row is fetched; the new result is read with ``scan_result``.
+        A statement whose result is still tracked is not run again.
+        """
+        if not self.session:
+            raise Exception("No active session. Please connect first.")
+        
+        query_id, role = self.persisted_result(query_id)
+        sql = result_scan_sql(query_id, select)
+        entry = self.query_tracker.lookup(sql, role)
+        if not entry:
+            self._run_query(sql, self.router.route('preview'), role, max_rows=1,
+                            timeout=self.query_timeout)
+            entry = self.query_tracker.lookup(sql, role)
+        return entry['query_id']
+    
+    def persisted_result(self, query_id: str) -> Tuple[str, Optional[str]]:
+        """Return (query ID, role) of a still-persisted result, recomputing it if expired."""
+        entry = self.query_tracker.get(query_id)
+        if entry and not self.query_tracker.is_valid(entry):
+            query_id = self._recompute(entry)
+        return query_id, entry['role'] if entry else None
+    
+    def _recompute(self, entry: Dict[str, Any]) -> str:
+        """Run a tracked statement again and return its new query ID."""
+        self._run_query(entry['sql'], entry['warehouse'], entry['role'], max_rows=1,
+                        params=entry['params'])
+        return self.query_tracker.lookup(entry['sql'], entry['role'], entry['params'])['query_id']
+    
     def get_sample_questions(self) -> List[str]:
         """Get sample questions that can be asked."""
         return [
@@ -333,14 +1050,26 @@ class CortexAnalyst:
             raise ValueError(f"Table {table_name} not found in semantic model")
         
         try:
-            query = f"SELECT * FROM {base_table} LIMIT {limit}"
-            return self.execute_query(query)
+            # One statement text for every table and limit
+            return self.execute_query("SELECT * FROM IDENTIFIER(?) LIMIT ?", query_class='preview',
+                                      params=[base_table, int(limit)])
         except Exception as e:
             logger.error(f"Error getting table preview: {str(e)}")
             return pd.DataFrame()
     
     def close(self):
         """Close the Snowflake session."""
+        for owner in self.running_queries.owners():
+            self.running_queries.cancel_owner(owner)
+        self._revalidator.shutdown(wait=False)
+        self._sql_runner.shutdown(wait=False)
+        self._query_waiter.shutdown(wait=False)
+        if self.analyst_client:
+            self.analyst_client.close()
+        if self.pool:
+            self.pool.close()
+        if self.router:
+            self.router.close(keep=self.session)
         if self.session:
             self.session.close()
             logger.info("Session closed.")
@@ -358,6 +1087,7 @@ def test_cortex_analyst():
         
         # Test sample question
         question = "What is the total revenue by year?"
+        print(f"Pruned Context Length: {len(analyst.get_semantic_context(question))} characters")
         result = analyst.ask_question(question)
         
         if result['success']:
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Cortex Analyst Client Module
+
+This module provides a client for the Snowflake Cortex Analyst REST API
+(``/api/v2/cortex/analyst/message``). Requests reuse a pooled keep-alive HTTP
+session, responses are parsed as they stream in so the generated SQL can be
+executed before the rest of the answer has arrived, and completed responses
+are cached on the question plus a hash of the semantic model.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Dict, List, Any, Callable, Iterator, Optional, Tuple
+
+from question_normalizer import normalize_text
+from result_cache import ResultCache
+from snowflake_auth import rest_auth_header
+from credential_provider import shared_provider
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MESSAGE_PATH = '/api/v2/cortex/analyst/message'
+
+def parse_sse(lines: Iterator[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield (event, data) pairs from the lines of a server-sent event stream."""
+    event, data = 'message', []
+    for line in lines:
+        if line is None:
+            continue
+        if not line:
+            if data:
+                yield event, json.loads('\n'.join(data))
+            event, data = 'message', []
+        elif line.startswith('event:'):
+            event = line[6:].strip()
+        elif line.startswith('data:'):
+            data.append(line[5:].strip())
+    if data:
+        yield event, json.loads('\n'.join(data))
+
+class CortexAnalystClient:
+    """Class to send questions to the Cortex Analyst API over a pooled session."""
+
+    def __init__(self, base_url: str, auth_header: Callable[[], str],
+                 semantic_model: Optional[str] = None, semantic_model_file: Optional[str] = None,
+                 stream: bool = True, timeout: float = 60.0, pool_size: int = 8,
+                 cache: Optional[ResultCache] = None,
+                 model_for: Optional[Callable[[str], str]] = None):
+        """Initialize the client.
+
+        ``auth_header()`` returns the current Authorization header value; it
+        is called per request so rotated tokens are picked up. Pass either the
+        semantic model YAML inline (``semantic_model``) or a stage reference
+        such as ``@DB.SCHEMA.STAGE/semantic_model.yaml`` (``semantic_model_file``).
+        ``model_for(question)``, if given, returns the inline YAML to send for
+        a question, e.g. a model pruned to the relevant elements.
+        """
+        if not semantic_model and not semantic_model_file:
+            raise ValueError("A semantic model (inline YAML or stage file) is required")
+
+        self.base_url = base_url.rstrip('/')
+        self.auth_header = auth_header
+        self.semantic_model = semantic_model
+        self.semantic_model_file = semantic_model_file
+        self.stream = stream
+        self.timeout = timeout
+        self.cache = cache or ResultCache(ttl=0)
+        self.model_for = model_for
+        self.model_hash = hashlib.sha256(
+            (semantic_model or semantic_model_file).encode('utf-8')).hexdigest()[:16]
+
+        # One keep-alive connection pool for every request
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.http.mount('https://', adapter)
+        self.http.mount('http://', adapter)
+
+    @classmethod
+    def from_env(cls, session=None, semantic_model_path: str = 'semantic_model.yaml',
+                 model_for: Optional[Callable[[str], str]] = None) -> 'CortexAnalystClient':
+        """Create a client configured from CORTEX_ANALYST_* environment variables.
+
+        Without CORTEX_ANALYST_TOKEN, a cached key-pair JWT is used when
+        SNOWFLAKE_AUTHENTICATOR=snowflake_jwt, else the Snowpark ``session``'s
+        own REST token. CORTEX_ANALYST_URL points the client at another host,
+        e.g. the local mock server.
+        """
+        base_url = os.getenv('CORTEX_ANALYST_URL') or \
+            f"https://{shared_provider().get().get('account')}.snowflakecomputing.com"
+
+        token = os.getenv('CORTEX_ANALYST_TOKEN')
+        keypair_header = None if token else rest_auth_header()
+        if keypair_header:
+            auth_header = keypair_header
+            extra_headers = {'X-Snowflake-Authorization-Token-Type': 'KEYPAIR_JWT'}
+        elif token:
+            token_type = os.getenv('CORTEX_ANALYST_TOKEN_TYPE', 'KEYPAIR_JWT')
+            auth_header = lambda: f"Bearer {token}"
+            extra_headers = {'X-Snowflake-Authorization-Token-Type': token_type}
+        else:
+            auth_header = lambda: f'Snowflake Token="{session.connection.rest.token}"' if session else ''
+            extra_headers = {}
+
+        model_file = os.getenv('CORTEX_SEMANTIC_MODEL_FILE')
+        model_yaml = None
+        if not model_file:
+            with open(semantic_model_path, 'r') as file:
+                model_yaml = file.read()
+
+        client = cls(
+            base_url,
+            auth_header,
+            semantic_model=model_yaml,
+            semantic_model_file=model_file,
+            stream=os.getenv('CORTEX_ANALYST_STREAM', 'true').lower() == 'true',
+            timeout=float(os.getenv('CORTEX_ANALYST_TIMEOUT', '60')),
+            pool_size=int(os.getenv('CORTEX_POOL_SIZE', '8')),
+            cache=ResultCache(ttl=int(os.getenv('CORTEX_ANALYST_CACHE_TTL', '3600')),
+                              max_entries=int(os.getenv('CORTEX_CACHE_MAX_ENTRIES', '256'))),
+            model_for=model_for
+        )
+        client.http.headers.update(extra_headers)
+        return client
+
+    def message(self, question: str, history: Optional[List[Dict[str, Any]]] = None,
+                on_sql: Optional[Callable[[str], None]] = None,
+                use_cache: bool = True) -> Dict[str, Any]:
+        """Send a question and return the parsed analyst response.
+
+        ``on_sql(statement)`` is called as soon as the SQL statement is
+        complete, before the remaining content has streamed in. Single-turn
+        responses are cached on the normalized question and model hash.
+        """
+        cache_key = f"{self.model_hash}|{normalize_text(question)}"
+        if use_cache and not history:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                if on_sql and cached['sql']:
+                    on_sql(cached['sql'])
+                return {**cached, 'cached': True}
+
+        messages = list(history or []) + [
+            {'role': 'user', 'content': [{'type': 'text', 'text': question}]}
+        ]
+        body = {'messages': messages, 'stream': self.stream}
+        if self.semantic_model_file:
+            body['semantic_model_file'] = self.semantic_model_file
+        elif self.model_for:
+            body['semantic_model'] = self.model_for(question)
+        else:
+            body['semantic_model'] = self.semantic_model
+
+        try:
+            headers = {'Authorization': self.auth_header(), 'Content-Type': 'application/json',
+                       'Accept': 'text/event-stream' if self.stream else 'application/json'}
+            with self.http.post(self.base_url + MESSAGE_PATH, json=body, headers=headers,
+                                stream=self.stream, timeout=self.timeout) as response:
+                if response.status_code != 200:
+                    raise RuntimeError(f"HTTP {response.status_code}: {response.text[:500]}")
+                if self.stream:
+                    result = self._read_stream(response, on_sql)
+                else:
+                    result = self._read_message(response.json(), on_sql)
+
+        except Exception as e:
+            logger.error(f"Cortex Analyst request failed: {str(e)}")
+            return {'success': False, 'error': str(e), 'sql': None, 'text': '', 'suggestions': []}
+
+        if result['success'] and not history:
+            self.cache.set(cache_key, result)
+        return result
+
+    def close(self):
+        """Close the pooled HTTP connections."""
+        self.http.close()
+
+    def _read_stream(self, response, on_sql: Optional[Callable[[str], None]]) -> Dict[str, Any]:
+        """Assemble a streamed response, handing off SQL as soon as it is complete."""
+        blocks = {}
+        current = None
+        sql_sent = False
+        request_id, warnings = None, []
+
+        def finish(index):
+            nonlocal sql_sent
+            block = blocks.get(index)
+            if block and block['type'] == 'sql' and not sql_sent:
+                sql_sent = True
+                if on_sql:
+                    on_sql(block['statement'])
+
+        for event, data in parse_sse(response.iter_lines(decode_unicode=True)):
+            if event == 'message.content.delta':
+                index = data['index']
+                if current is not None and index != current:
+                    finish(current)
+                current = index
+                block = blocks.setdefault(index, {'type': data['type'], 'text': '',
+                                                  'statement': '', 'suggestions': []})
+                block['text'] += data.get('text_delta', '')
+                block['statement'] += data.get('statement_delta', '')
+                if 'confidence' in data:
+                    block['confidence'] = data['confidence']
+                suggestion = data.get('suggestions_delta')
+                if suggestion:
+                    while len(block['suggestions']) <= suggestion['index']:
+                        block['suggestions'].append('')
+                    block['suggestions'][suggestion['index']] += suggestion.get('suggestion_delta', '')
+            elif event == 'error':
+                raise RuntimeError(data.get('message', 'Cortex Analyst returned an error'))
+            elif event == 'warnings':
+                warnings.extend(data.get('warnings', []))
+            elif event == 'response_metadata':
+                request_id = data.get('request_id', request_id)
+            elif event == 'done':
+                break
+
+        if current is not None:
+            finish(current)
+
+        content = [blocks[index] for index in sorted(blocks)]
+        return self._result(content, request_id, warnings)
+
+    def _read_message(self, payload: Dict[str, Any], on_sql: Optional[Callable[[str], None]]) -> Dict[str, Any]:
+        """Parse a complete (non-streamed) response."""
+        content = payload.get('message', {}).get('content', [])
+        result = self._result(content, payload.get('request_id'), payload.get('warnings', []))
+        if on_sql and result['sql']:
+            on_sql(result['sql'])
+        return result
+
+    @staticmethod
+    def _result(content: List[Dict[str, Any]], request_id: Optional[str],
+                warnings: List[Any]) -> Dict[str, Any]:
+        """Build the client result from response content blocks."""
+        text = ' '.join(block['text'].strip() for block in content
+                        if block['type'] == 'text' and block.get('text'))
+        sql = next((block['statement'] for block in content if block['type'] == 'sql'), None)
+        suggestions = [suggestion for block in content if block['type'] == 'suggestions'
+                       for suggestion in block.get('suggestions', [])]
+        return {
+            'success': True,
+            'text': text,
+            'sql': sql,
+            'suggestions': suggestions,
+            'request_id': request_id,
+            'warnings': warnings
+        }
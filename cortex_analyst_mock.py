@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Cortex Analyst Mock Server Module
+
+This module serves a local stand-in for the Cortex Analyst message endpoint
+for offline development and testing. Questions are answered with the
+pattern-matched intent SQL from ``cortex_analyst.py``, either as one JSON
+message or as a server-sent event stream over a keep-alive connection.
+
+Point the client at it with ``CORTEX_ANALYST_URL=http://localhost:8765``.
+"""
+
+import json
+import time
+import uuid
+import argparse
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Any
+
+from cortex_analyst import CortexAnalyst, INTENT_SQL, bind_template, inline_binds
+from cortex_analyst_client import MESSAGE_PATH
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class MockAnalystHandler(BaseHTTPRequestHandler):
+    """Request handler answering analyst messages from intent patterns."""
+
+    # HTTP/1.1 keeps connections alive between requests
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        """Answer one analyst message request."""
+        if self.path != MESSAGE_PATH:
+            self._send_json(404, {'message': f'Unknown path {self.path}'})
+            return
+
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        except ValueError:
+            self._send_json(400, {'message': 'Request body is not valid JSON'})
+            return
+
+        if not body.get('semantic_model') and not body.get('semantic_model_file'):
+            self._send_json(400, {'message': 'semantic_model or semantic_model_file is required'})
+            return
+
+        question = next((item['text'] for message in reversed(body.get('messages', []))
+                         if message.get('role') == 'user'
+                         for item in message.get('content', []) if item.get('type') == 'text'), '')
+        content = self.server.answer(question)
+        request_id = uuid.uuid4().hex
+
+        if body.get('stream'):
+            self._send_stream(content, request_id)
+        else:
+            self._send_json(200, {
+                'message': {'role': 'analyst', 'content': content},
+                'request_id': request_id,
+                'warnings': []
+            })
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        """Send a complete JSON response."""
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, content: List[Dict[str, Any]], request_id: str):
+        """Send content blocks as server-sent delta events in chunked encoding."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        self._send_event('status', {'status': 'interpreting_question'})
+        for index, block in enumerate(content):
+            if block['type'] == 'text':
+                for word in block['text'].split(' '):
+                    self._send_event('message.content.delta',
+                                     {'index': index, 'type': 'text', 'text_delta': word + ' '})
+            elif block['type'] == 'sql':
+                for line in block['statement'].splitlines(keepends=True):
+                    self._send_event('message.content.delta',
+                                     {'index': index, 'type': 'sql', 'statement_delta': line})
+            elif block['type'] == 'suggestions':
+                for number, suggestion in enumerate(block['suggestions']):
+                    self._send_event('message.content.delta', {
+                        'index': index, 'type': 'suggestions',
+                        'suggestions_delta': {'index': number, 'suggestion_delta': suggestion}
+                    })
+        self._send_event('response_metadata', {'request_id': request_id})
+        self._send_event('done', {})
+        self.wfile.write(b'0\r\n\r\n')
+
+    def _send_event(self, event: str, data: Dict[str, Any]):
+        """Write one server-sent event as an HTTP chunk."""
+        time.sleep(self.server.token_delay)
+        payload = f"event: {event}\ndata: {json.dumps(data)}\n\n".encode('utf-8')
+        self.wfile.write(f"{len(payload):X}\r\n".encode('ascii') + payload + b'\r\n')
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        """Route request logs through the module logger."""
+        logger.info(format % args)
+
+class MockAnalystServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding the pattern matcher used for answers."""
+
+    daemon_threads = True
+
+    def __init__(self, address, token_delay: float = 0.0):
+        """Initialize the server; ``token_delay`` simulates generation latency per event."""
+        super().__init__(address, MockAnalystHandler)
+        self.analyst = CortexAnalyst()
+        self.token_delay = token_delay
+
+    def answer(self, question: str) -> List[Dict[str, Any]]:
+        """Return analyst content blocks for a question."""
+        intent, params = self.analyst.parse_question(question)
+        statement = inline_binds(*bind_template(INTENT_SQL[intent], params))
+        return [
+            {'type': 'text', 'text': f"This is our interpretation of your question: {question}"},
+            {'type': 'sql', 'statement': statement.strip(), 'confidence': {'verified_query_used': None}},
+            {'type': 'suggestions', 'suggestions': self.analyst.get_sample_questions()[:3]}
+        ]
+
+def main():
+    """Run the mock server in the foreground."""
+    parser = argparse.ArgumentParser(description="Local Cortex Analyst mock server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--token-delay", type=float, default=0.0,
+                        help="Seconds to wait before each streamed event")
+    args = parser.parse_args()
+
+    server = MockAnalystServer((args.host, args.port), token_delay=args.token_delay)
+    print(f"🧪 Mock Cortex Analyst listening on http://{args.host}:{args.port}{MESSAGE_PATH}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Mock server stopped by user")
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Cortex Batch Module
+
+This module runs a file of questions and SQL statements headlessly
+(``cortex-batch``), several at a time over the analyst's session pool. Each
+result is streamed batch by batch into its own Parquet or Arrow IPC file, and
+a run manifest records the status, timings, row counts and query IDs of every
+item. Re-running with the same output directory resumes: finished items are
+skipped, so only failed or unstarted ones run again.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+import contextvars
+import logging
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Any, Iterable, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from query_registry import owned_by
+from query_tracker import result_scan_sql
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+OUTPUT_FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+SQL_PATTERN = re.compile(r'^\s*(SELECT|WITH|SHOW|DESCRIBE|DESC)\b', re.IGNORECASE)
+
+# Rows buffered at most to settle the file schema of a result
+SCHEMA_SAMPLE_ROWS = 100000
+
+def item_id(kind: str, text: str) -> str:
+    """Return a stable ID for an item, so a resumed run recognizes it."""
+    return f"{kind}-{hashlib.sha256(' '.join(text.split()).encode('utf-8')).hexdigest()[:12]}"
+
+def load_items(path: str) -> List[Dict[str, Any]]:
+    """Read the items of a batch file.
+
+    ``.jsonl`` files hold one object per line with ``question`` or ``sql``
+    and optional ``id``, ``role``, ``warehouse`` and ``params``. ``.sql``
+    files hold statements separated by semicolons. Other files hold one
+    question or SQL statement per line; blank lines and ``#`` comments are
+    skipped.
+    """
+    text = Path(path).read_text(encoding='utf-8')
+    if path.endswith('.jsonl'):
+        entries = [json.loads(line) for line in text.splitlines() if line.strip()]
+    elif path.endswith('.sql'):
+        entries = [{'sql': statement.strip()} for statement in text.split(';') if statement.strip()]
+    else:
+        entries = []
+        for line in text.splitlines():
+            line = line.strip()
+            if line and not line.startswith('#'):
+                entries.append({'sql': line} if SQL_PATTERN.match(line) else {'question': line})
+
+    items = {}
+    for entry in entries:
+        kind = 'sql' if entry.get('sql') else 'question'
+        item = {
+            'id': str(entry.get('id') or item_id(kind, entry[kind])),
+            'kind': kind,
+            'text': entry[kind],
+            'role': entry.get('role'),
+            'warehouse': entry.get('warehouse'),
+            'params': entry.get('params')
+        }
+        items.setdefault(item['id'], item)
+    return list(items.values())
+
+def write_batches(batches: Iterable[pd.DataFrame], path: Path, file_format: str) -> int:
+    """Write pandas batches to one Parquet or Arrow IPC file as they arrive; return the row count.
+
+    Batches are converted separately, so a column's pandas dtype may differ
+    between them (all-null in one, integers with nulls in another). The file
+    schema is therefore unified over the first batches, up to
+    ``SCHEMA_SAMPLE_ROWS`` rows or the first batch without all-null columns,
+    and later batches are cast to it; columns still all-null are written as
+    strings. An empty result keeps its columns. The file is written under a
+    ``.part`` name, renamed when complete and removed on failure.
+    """
+    partial = path.with_name(path.name + '.part')
+    writer, schema, pending, rows = None, None, [], 0
+
+    def open_writer():
+        nonlocal writer, schema
+        schema = pa.schema([field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                            for field in (schema or pa.schema([]))])
+        writer = pq.ParquetWriter(str(partial), schema) if file_format == 'parquet' \
+            else pa.ipc.new_file(str(partial), schema)
+        for table in pending:
+            writer.write_table(table.cast(schema))
+        pending.clear()
+
+    try:
+        for batch in batches:
+            table = pa.Table.from_pandas(batch, preserve_index=False).replace_schema_metadata()
+            rows += len(batch)
+            if writer is not None:
+                writer.write_table(table if table.schema.equals(schema) else table.cast(schema))
+                continue
+
+            schema = table.schema if schema is None else \
+                pa.unify_schemas([schema, table.schema], promote_options='permissive')
+            pending.append(table)
+            if rows >= SCHEMA_SAMPLE_ROWS or not any(pa.types.is_null(field.type) for field in schema):
+                open_writer()
+        if writer is None:
+            open_writer()
+        writer.close()
+        writer = None
+        os.replace(partial, path)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        partial.unlink(missing_ok=True)
+        raise
+    return rows
+
+class BatchRun:
+    """Class to run batch items concurrently and keep the run manifest up to date."""
+
+    def __init__(self, analyst, output_dir: str, file_format: str = 'parquet',
+                 concurrency: int = 8, timeout: Optional[float] = None,
+                 deadline: Optional[float] = None):
+        """Initialize the run.
+
+        ``timeout`` caps each SQL item's query (questions use the analyst's
+        per-intent timeouts). No new item starts once ``deadline`` seconds
+        have passed; those stay pending for the next run.
+        """
+        if file_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format: {file_format}")
+
+        self.analyst = analyst
+        self.output_dir = Path(output_dir)
+        self.file_format = file_format
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.deadline = deadline
+        self.manifest_path = self.output_dir / 'manifest.json'
+
+        self.manifest = {'runs': [], 'items': {}}
+        self._lock = threading.RLock()
+
+    def load_manifest(self, restart: bool = False):
+        """Load the manifest of a previous run; with ``restart``, keep only its timings."""
+        if not self.manifest_path.exists():
+            return
+        previous = json.loads(self.manifest_path.read_text(encoding='utf-8'))
+        if restart:
+            previous['items'] = {key: {'seconds': entry['seconds']}
+                                 for key, entry in previous['items'].items() if entry.get('seconds')}
+        self.manifest = previous
+
+    def run(self, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Run every item not finished yet and return the manifest."""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        started = time.time()
+        run_info = {'started_at': started, 'finished_at': None, 'items': len(items)}
+        self.manifest['runs'].append(run_info)
+
+        entries = self.manifest['items']
+        pending = [item for item in items if entries.get(item['id'], {}).get('status') != 'done']
+        # Slowest first (by earlier timings), so one long query does not finish the run alone
+        pending.sort(key=lambda item: -(entries.get(item['id'], {}).get('seconds') or 0))
+        logger.info(f"{len(items) - len(pending)} of {len(items)} items already done, running {len(pending)}")
+
+        def guarded(item):
+            if self.deadline and time.time() - started > self.deadline:
+                self._record(item, {'status': 'pending', 'error': 'Deadline reached before start'})
+                return
+            self._run_item(item)
+
+        # Every query of this run is owned by it, so closing the analyst cancels them
+        run_id = f"batch:{os.getpid()}:{int(started)}"
+        with owned_by(run_id):
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='batch') as executor:
+                futures = [executor.submit(contextvars.copy_context().run, guarded, item)
+                           for item in pending]
+                for future in as_completed(futures):
+                    future.result()
+
+        run_info['finished_at'] = time.time()
+        self._save()
+        return self.manifest
+
+    def summary(self) -> Dict[str, int]:
+        """Return the number of items per status."""
+        counts = {}
+        for entry in self.manifest['items'].values():
+            if entry.get('status'):
+                counts[entry['status']] = counts.get(entry['status'], 0) + 1
+        return counts
+
+    def _run_item(self, item: Dict[str, Any]):
+        """Run one item, write its result file and record the outcome."""
+        path = self.output_dir / (item['id'] + OUTPUT_FORMATS[self.file_format])
+        started = time.time()
+        self._record(item, {'status': 'running', 'started_at': started})
+        try:
+            if item['kind'] == 'sql':
+                entry = self._run_sql(item, path)
+            else:
+                entry = self._run_question(item, path)
+            entry['status'] = 'done'
+            entry['file'] = path.name
+            entry['bytes'] = path.stat().st_size
+        except Exception as e:
+            logger.error(f"Batch item {item['id']} failed: {str(e)}")
+            entry = {'status': 'failed', 'error': str(e)}
+        entry['seconds'] = round(time.time() - started, 3)
+        self._record(item, entry)
+
+    def _run_sql(self, item: Dict[str, Any], path: Path) -> Dict[str, Any]:
+        """Stream a SQL item's full result to its file."""
+        rows = write_batches(self.analyst.stream_query(item['text'], warehouse=item['warehouse'],
+                                                       role=item['role'], params=item['params'],
+                                                       timeout=self.timeout),
+                             path, self.file_format)
+        return {'rows': rows,
+                'query_id': self.analyst.last_query_id(item['text'], item['role'], item['params'])}
+
+    def _run_question(self, item: Dict[str, Any], path: Path) -> Dict[str, Any]:
+        """Answer a question and write its result, streaming it again if it was truncated."""
+        result = self.analyst.ask_question(item['text'], role=item['role'], warehouse=item['warehouse'])
+        if not result['success']:
+            raise RuntimeError(result.get('error') or 'Question failed')
+
+        entry = {'sql': result.get('sql'), 'query_id': result.get('query_id'),
+                 'source': result.get('source', 'warehouse'), 'cached': result.get('cached', False)}
+        if result.get('truncated') and result.get('query_id'):
+            # Only the first rows were kept in memory; read the rest from the persisted result
+            query_id, role = self.analyst.persisted_result(result['query_id'])
+            batches = self.analyst.stream_query(result_scan_sql(query_id), role=role,
+                                                timeout=self.timeout)
+        else:
+            batches = [result['data']]
+        entry['rows'] = write_batches(batches, path, self.file_format)
+        return entry
+
+    def _record(self, item: Dict[str, Any], entry: Dict[str, Any]):
+        """Update an item's manifest entry and save the manifest."""
+        with self._lock:
+            current = self.manifest['items'].setdefault(item['id'], {})
+            if entry.get('status') == 'running':
+                current.clear()
+            current.update({'kind': item['kind'], 'text': item['text'], **entry})
+            self._save()
+
+    def _save(self):
+        """Write the manifest atomically, so an interrupted run leaves a readable one."""
+        with self._lock:
+            partial = self.manifest_path.with_name(self.manifest_path.name + '.part')
+            partial.write_text(json.dumps(self.manifest, indent=2, default=str), encoding='utf-8')
+            os.replace(partial, self.manifest_path)
+
+def main():
+    """Run a batch file of questions and SQL from the command line."""
+    from cortex_analyst import CortexAnalyst
+
+    parser = argparse.ArgumentParser(prog='cortex-batch',
+                                     description="Run questions and SQL concurrently into Parquet/Arrow files")
+    parser.add_argument("input", help="Batch file: .txt (one per line), .sql or .jsonl")
+    parser.add_argument("--output", default='batch_output', help="Directory for result files and the manifest")
+    parser.add_argument("--format", choices=sorted(OUTPUT_FORMATS), default='parquet')
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv('CORTEX_POOL_SIZE', '8')),
+                        help="Items run at once (default: CORTEX_POOL_SIZE)")
+    parser.add_argument("--timeout", type=float, help="Per-query timeout in seconds for SQL items")
+    parser.add_argument("--deadline", type=float, help="Start no new items after this many seconds")
+    parser.add_argument("--restart", action="store_true",
+                        help="Run every item again instead of resuming the previous run")
+    args = parser.parse_args()
+
+    items = load_items(args.input)
+    analyst = CortexAnalyst()
+    if not analyst.connect():
+        print("❌ Connection failed!")
+        sys.exit(1)
+
+    try:
+        batch = BatchRun(analyst, args.output, args.format, concurrency=args.concurrency,
+                         timeout=args.timeout, deadline=args.deadline)
+        batch.load_manifest(restart=args.restart)
+        started = time.time()
+        batch.run(items)
+        counts = batch.summary()
+        print(f"✅ {counts.get('done', 0)} done, {counts.get('failed', 0)} failed, "
+              f"{counts.get('pending', 0)} pending in {time.time() - started:.1f}s "
+              f"(manifest: {batch.manifest_path})")
+        if counts.get('failed') or counts.get('pending'):
+            sys.exit(1)
+    finally:
+        analyst.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Credential Provider Module
+
+This module supplies the Snowflake credentials of every connection class from
+one configurable source: environment variables (and the .env file), a JSON
+or KEY=VALUE file, or an AWS Secrets Manager secret such as the
+``sflk-svc-user`` secret provisioned in secrets_manager.tf. Credentials are
+cached in memory for a TTL and refreshed in the background shortly before
+they expire, so session starts never wait on a secret fetch.
+"""
+
+import os
+import json
+import time
+import threading
+import logging
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SOURCES = ('env', 'file', 'secretsmanager')
+
+# Connection parameters always present, and those only passed on when set
+CONNECTION_KEYS = ('account', 'user', 'password', 'warehouse', 'database', 'schema', 'role')
+OPTIONAL_KEYS = ('token', 'private_key_path', 'private_key_passphrase')
+
+# Other spellings found in existing secrets
+ALIASES = {'username': 'user', 'oauth_token': 'token', 'private_key_file': 'private_key_path'}
+
+def normalize(values: Dict[str, Any]) -> Dict[str, Any]:
+    """Map 'SNOWFLAKE_USER', 'user' or 'username' style keys to connection parameter names."""
+    credentials = {}
+    for key, value in values.items():
+        name = key.lower()
+        if name.startswith('snowflake_'):
+            name = name[len('snowflake_'):]
+        name = ALIASES.get(name, name)
+        if name in CONNECTION_KEYS + OPTIONAL_KEYS and value not in (None, ''):
+            credentials[name] = value
+    return credentials
+
+def parse_key_values(text: str) -> Dict[str, str]:
+    """Parse KEY=VALUE lines, ignoring comments and blank lines."""
+    values = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith('#') or '=' not in line:
+            continue
+        key, value = line.split('=', 1)
+        values[key.strip()] = value.strip().strip('"\'')
+    return values
+
+class EnvSource:
+    """Credentials from SNOWFLAKE_* environment variables."""
+
+    name = 'env'
+
+    def fetch(self) -> Dict[str, Any]:
+        """Return the credentials set in the environment."""
+        return normalize({key: value for key, value in os.environ.items()
+                          if key.startswith('SNOWFLAKE_')})
+
+class FileSource:
+    """Credentials from a JSON object or KEY=VALUE file."""
+
+    name = 'file'
+
+    def __init__(self, path: str):
+        """Initialize the source with the file path."""
+        self.path = Path(os.path.expanduser(path))
+
+    def fetch(self) -> Dict[str, Any]:
+        """Read and return the credentials in the file."""
+        text = self.path.read_text(encoding='utf-8')
+        values = json.loads(text) if text.lstrip().startswith('{') else parse_key_values(text)
+        return normalize(values)
+
+class SecretsManagerSource:
+    """Credentials from a JSON AWS Secrets Manager secret."""
+
+    name = 'secretsmanager'
+
+    def __init__(self, secret_id: str, region: Optional[str] = None,
+                 endpoint_url: Optional[str] = None, client=None):
+        """Initialize the source.
+
+        ``endpoint_url`` points boto3 at a local stand-in (a moto server, for
+        example); ``client`` replaces the boto3 client altogether.
+        """
+        self.secret_id = secret_id
+        self.region = region
+        self.endpoint_url = endpoint_url
+        self._client = client
+
+    @property
+    def client(self):
+        """Return the Secrets Manager client, creating it on first use."""
+        if self._client is None:
+            import boto3
+            self._client = boto3.client('secretsmanager', region_name=self.region,
+                                        endpoint_url=self.endpoint_url)
+        return self._client
+
+    def fetch(self) -> Dict[str, Any]:
+        """Fetch the current version of the secret and return its credentials."""
+        response = self.client.get_secret_value(SecretId=self.secret_id)
+        logger.info(f"Fetched secret {self.secret_id} (version {response.get('VersionId')})")
+        return normalize(json.loads(response['SecretString']))
+
+class CredentialProvider:
+    """Class to cache credentials from a source with a TTL and refresh-ahead."""
+
+    def __init__(self, source, ttl: float = 3600, refresh_ahead: float = 300):
+        """Initialize the provider.
+
+        Cached credentials are served for ``ttl`` seconds. A read within
+        ``refresh_ahead`` seconds of expiry still returns them at once but
+        starts a background fetch, so callers only wait on the first fetch or
+        after an idle period longer than the TTL.
+        """
+        self.source = source
+        self.ttl = ttl
+        self.refresh_ahead = min(refresh_ahead, ttl)
+        self.version = 0
+        self.fetches = 0
+
+        self._credentials = None
+        self._expires_at = 0
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._refresher = ThreadPoolExecutor(max_workers=1, thread_name_prefix='credentials')
+
+    @classmethod
+    def from_env(cls) -> 'CredentialProvider':
+        """Create a provider configured from CORTEX_CREDENTIALS_* environment variables."""
+        name = os.getenv('CORTEX_CREDENTIALS_SOURCE', 'env').lower()
+        if name == 'file':
+            source = FileSource(os.getenv('CORTEX_CREDENTIALS_FILE', 'credentials.json'))
+        elif name == 'secretsmanager':
+            source = SecretsManagerSource(
+                os.getenv('CORTEX_CREDENTIALS_SECRET_ID', 'sflk-svc-user'),
+                region=os.getenv('AWS_REGION') or os.getenv('AWS_DEFAULT_REGION'),
+                endpoint_url=os.getenv('CORTEX_CREDENTIALS_ENDPOINT_URL') or None
+            )
+        elif name == 'env':
+            source = EnvSource()
+        else:
+            raise ValueError(f"Unknown credentials source: {name}")
+
+        return cls(
+            source,
+            ttl=float(os.getenv('CORTEX_CREDENTIALS_TTL', '3600')),
+            refresh_ahead=float(os.getenv('CORTEX_CREDENTIALS_REFRESH_AHEAD', '300'))
+        )
+
+    def get(self) -> Dict[str, Any]:
+        """Return the current credentials (empty if they could not be fetched)."""
+        with self._lock:
+            remaining = self._expires_at - time.time()
+            if self._credentials is not None and remaining > 0:
+                if remaining <= self.refresh_ahead and not self._refreshing:
+                    self._refreshing = True
+                    self._refresher.submit(self._refresh)
+                return dict(self._credentials)
+
+            try:
+                self._store(self.source.fetch())
+            except Exception as e:
+                logger.error(f"Failed to fetch credentials from {self.source.name}: {str(e)}")
+                # Expired credentials beat none while the source is unreachable
+                return dict(self._credentials or {})
+            return dict(self._credentials)
+
+    def invalidate(self):
+        """Drop the cached credentials so the next read fetches them (after a rotation)."""
+        with self._lock:
+            self._expires_at = 0
+
+    def connection_params(self, defaults: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Return connection parameters: the current credentials over ``defaults``.
+
+        Keys of ``defaults`` that are not credentials (session parameters,
+        paramstyle, ...) are passed through unchanged.
+        """
+        defaults = defaults or {}
+        credentials = self.get()
+        params = dict(defaults)
+        for key in CONNECTION_KEYS:
+            params[key] = credentials.get(key) or defaults.get(key)
+        for key in OPTIONAL_KEYS:
+            if credentials.get(key):
+                params[key] = credentials[key]
+        return params
+
+    def _refresh(self):
+        """Fetch the credentials in the background, keeping the cached ones on failure."""
+        try:
+            credentials = self.source.fetch()
+            with self._lock:
+                self._store(credentials)
+        except Exception as e:
+            logger.warning(f"Background credential refresh from {self.source.name} failed: {str(e)}")
+        finally:
+            self._refreshing = False
+
+    def _store(self, credentials: Dict[str, Any]):
+        """Cache fetched credentials; the caller holds the lock."""
+        self.fetches += 1
+        if credentials != self._credentials:
+            self.version += 1
+        self._credentials = credentials
+        self._expires_at = time.time() + self.ttl
+
+_shared_provider = None
+_shared_lock = threading.Lock()
+
+def shared_provider() -> CredentialProvider:
+    """Return the credential provider shared by every connection in this process.
+
+    The .env file is read once here, so CORTEX_CREDENTIALS_* settings can
+    live in it as well.
+    """
+    global _shared_provider
+    with _shared_lock:
+        if _shared_provider is None:
+            from dotenv import load_dotenv
+            load_dotenv()
+            _shared_provider = CredentialProvider.from_env()
+        return _shared_provider
@@ -3,6 +3,8 @@
 Launcher script for Snowflake Cortex Analyst Streamlit App
 
 This script provides an easy way to launch either the demo or production version.
+With --workers N, N replicas run on the ports after --port behind a sticky
+local proxy on --port, supervised and restarted if they exit.
 """
 
 import os
@@ -18,11 +20,22 @@ def check_env_file():
     if not env_path.exists():
         return False
     
-    required_vars = ['SNOWFLAKE_ACCOUNT', 'SNOWFLAKE_USER', 'SNOWFLAKE_PASSWORD']
-    
     try:
         with open(env_path, 'r') as f:
             content = f.read()
+            # Credentials kept in a file or Secrets Manager are checked on connect
+            if any(line.strip().lower() in ('cortex_credentials_source=file',
+                                             'cortex_credentials_source=secretsmanager')
+                   for line in content.split('\n')):
+                return True
+            # Key-pair, SSO and OAuth logins need no password
+            required_vars = ['SNOWFLAKE_ACCOUNT', 'SNOWFLAKE_USER']
+            if 'snowflake_authenticator=snowflake_jwt' in content.lower():
+                required_vars.append('SNOWFLAKE_PRIVATE_KEY_PATH')
+            elif 'snowflake_authenticator=oauth' in content.lower():
+                required_vars.append('SNOWFLAKE_OAUTH_TOKEN')
+            elif 'snowflake_authenticator=externalbrowser' not in content.lower():
+                required_vars.append('SNOWFLAKE_PASSWORD')
             for var in required_vars:
                 if f"{var}=" not in content:
                     return False
@@ -38,19 +51,49 @@ def check_env_file():
     except Exception:
         return False
 
-def launch_demo(port=12000):
+def streamlit_command(app, port, address="0.0.0.0"):
+    """Return the command running a Streamlit app on a port."""
+    return [
+        sys.executable, "-m", "streamlit", "run", app,
+        "--server.port", str(port),
+        "--server.address", address,
+        "--server.headless", "true"
+    ]
+
+def launch_replicas(app, port, workers, env, warm=False):
+    """Run ``workers`` replicas of an app behind a sticky proxy on ``port``.
+    
+    Production replicas share a result cache in CORTEX_CACHE_DIR; only the
+    first one warms it.
+    """
+    from replica_supervisor import run_replicas
+    
+    def env_for(index):
+        replica_env = dict(env)
+        if warm and index > 0:
+            replica_env['CORTEX_WARM_CACHE'] = 'false'
+        return replica_env
+    
+    print(f"🧩 {workers} replicas on ports {port + 1}-{port + workers}, sticky proxy on {port}")
+    try:
+        # Replicas only listen locally; clients reach them through the proxy
+        run_replicas(lambda replica_port: streamlit_command(app, replica_port, "127.0.0.1"),
+                     env_for, port, workers)
+    except KeyboardInterrupt:
+        print("\n👋 Application stopped by user")
+
+def launch_demo(port=12000, workers=1):
     """Launch the demo version."""
     print("🎯 Launching Snowflake Cortex Analyst Demo...")
     print(f"📱 Demo will be available at: http://localhost:{port}")
     print("💡 This version uses mock data and doesn't require Snowflake credentials")
     print("-" * 60)
     
-    cmd = [
-        sys.executable, "-m", "streamlit", "run", "demo_app.py",
-        "--server.port", str(port),
-        "--server.address", "0.0.0.0",
-        "--server.headless", "true"
-    ]
+    if workers > 1:
+        launch_replicas("demo_app.py", port, workers, dict(os.environ))
+        return
+    
+    cmd = streamlit_command("demo_app.py", port)
     
     try:
         subprocess.run(cmd, check=True)
@@ -59,22 +102,32 @@ def launch_demo(port=12000):
     except subprocess.CalledProcessError as e:
         print(f"❌ Error launching demo: {e}")
 
-def launch_production(port=12001):
+def launch_production(port=12001, warm=False, warm_questions=None, workers=1):
     """Launch the production version."""
     print("🚀 Launching Snowflake Cortex Analyst (Production)...")
     print(f"📱 App will be available at: http://localhost:{port}")
     print("🔐 This version requires valid Snowflake credentials in .env file")
+    
+    env = dict(os.environ)
+    if warm:
+        # The app starts the cache warmer when it creates its analyst
+        env['CORTEX_WARM_CACHE'] = 'true'
+        if warm_questions:
+            env['CORTEX_WARM_QUESTIONS'] = warm_questions
+        print("🔥 Cache warmer enabled: popular questions are pre-executed at startup")
     print("-" * 60)
     
-    cmd = [
-        sys.executable, "-m", "streamlit", "run", "streamlit_app.py",
-        "--server.port", str(port),
-        "--server.address", "0.0.0.0",
-        "--server.headless", "true"
-    ]
+    if workers > 1:
+        # Replicas answer from one on-disk result cache
+        env.setdefault('CORTEX_CACHE_DIR', str(Path('.cache') / 'results'))
+        print(f"🗄️  Shared result cache: {env['CORTEX_CACHE_DIR']}")
+        launch_replicas("streamlit_app.py", port, workers, env, warm=warm)
+        return
+    
+    cmd = streamlit_command("streamlit_app.py", port)
     
     try:
-        subprocess.run(cmd, check=True)
+        subprocess.run(cmd, check=True, env=env)
     except KeyboardInterrupt:
         print("\n👋 Application stopped by user")
     except subprocess.CalledProcessError as e:
@@ -114,6 +167,12 @@ def main():
                        help="Port to run the application on")
     parser.add_argument("--setup", action="store_true",
                        help="Set up environment and install dependencies")
+    parser.add_argument("--warm", action="store_true",
+                       help="Pre-execute popular questions at startup and keep them refreshed (production only)")
+    parser.add_argument("--warm-questions", default=None,
+                       help="File with one question per line to warm (defaults to the sample questions)")
+    parser.add_argument("--workers", type=int, default=1,
+                       help="Run this many supervised replicas on the following ports behind a sticky proxy")
     
     args = parser.parse_args()
     
@@ -152,9 +211,10 @@ def main():
     print("=" * 50)
     
     if mode == "demo":
-        launch_demo(port)
+        launch_demo(port, workers=args.workers)
     else:
-        launch_production(port)
+        launch_production(port, warm=args.warm, warm_questions=args.warm_questions,
+                          workers=args.workers)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
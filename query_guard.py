@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Query Cost Guard Module
+
+This module provides a pre-flight cost check for generated SQL. Each query is
+explained with EXPLAIN USING JSON and, based on the estimated bytes scanned,
+is allowed, limited, sampled, routed to a larger warehouse or rejected.
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+import logging
+from typing import Dict, Any, Callable, Optional, Sequence
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+GB = 1024 ** 3
+
+# String literals, quoted identifiers and comments, blanked before checking a statement
+LITERAL_PATTERN = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"]|\"\")*\"|\$\$.*?\$\$|--[^\n]*|//[^\n]*|/\*.*?\*/",
+                             re.DOTALL)
+# Statements and functions that change state, even inside a SELECT or WITH
+WRITE_PATTERN = re.compile(
+    r'\b(?:INSERT|UPDATE|DELETE|MERGE|CREATE|DROP|ALTER|TRUNCATE|UNDROP|GRANT|REVOKE|COPY|PUT|GET|'
+    r'REMOVE|CALL|EXECUTE|USE|SET|UNSET|BEGIN|COMMIT|ROLLBACK)\b|\bSYSTEM\$', re.IGNORECASE)
+
+# Aggregates whose value a sample understates (they are not scaled back up)
+SAMPLE_SENSITIVE_PATTERN = re.compile(r'\b(?:SUM|COUNT)\s*\(', re.IGNORECASE)
+
+def sql_hash(sql: str, params: Optional[Sequence[Any]] = None) -> str:
+    """Return a stable hash of a SQL statement, ignoring whitespace and case.
+
+    Bind ``params``, if given, are part of the hash.
+    """
+    normalized = " ".join(sql.split()).rstrip(';').lower()
+    if params:
+        normalized += '|' + json.dumps(list(params), default=str)
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+def read_only_statement(sql: str) -> str:
+    """Return a single read-only SELECT/WITH statement without its trailing semicolon.
+
+    Raises ValueError for several statements, other statement types, or
+    write statements and SYSTEM$ functions anywhere in the statement.
+    """
+    statement = sql.strip().rstrip(';').strip()
+    code = LITERAL_PATTERN.sub(' ', statement)
+    if ';' in code:
+        raise ValueError("Only a single statement is allowed")
+    if not re.match(r'\s*(?:\(\s*)*(?:SELECT|WITH)\b', code, re.IGNORECASE):
+        raise ValueError("Only SELECT and WITH statements are allowed")
+    write = WRITE_PATTERN.search(code)
+    if write:
+        raise ValueError(f"{write.group(0).upper()} is not allowed in a read-only statement")
+    return statement
+
+class QueryGuard:
+    """Class to estimate query cost with EXPLAIN and decide how to run it."""
+
+    ACTIONS = ('allow', 'limit', 'sample', 'route', 'reject')
+
+    def __init__(self, enabled: bool = True, max_bytes: float = 2 * GB,
+                 reject_bytes: float = 100 * GB, oversize_action: str = 'auto',
+                 row_limit: int = 10000, sample_percent: float = 10.0,
+                 large_warehouse: Optional[str] = None, cache_ttl: int = 3600):
+        """Initialize the guard with cost thresholds."""
+        if oversize_action not in ('auto',) + self.ACTIONS:
+            raise ValueError(f"Unknown oversize action: {oversize_action}")
+
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self.reject_bytes = reject_bytes
+        self.oversize_action = oversize_action
+        self.row_limit = row_limit
+        self.sample_percent = sample_percent
+        self.large_warehouse = large_warehouse
+        self.cache_ttl = cache_ttl
+
+        self._decisions = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'QueryGuard':
+        """Create a guard configured from CORTEX_GUARD_* environment variables."""
+        return cls(
+            enabled=os.getenv('CORTEX_GUARD_ENABLED', 'true').lower() == 'true',
+            max_bytes=float(os.getenv('CORTEX_GUARD_MAX_GB', '2')) * GB,
+            reject_bytes=float(os.getenv('CORTEX_GUARD_REJECT_GB', '100')) * GB,
+            oversize_action=os.getenv('CORTEX_GUARD_ACTION', 'auto'),
+            row_limit=int(os.getenv('CORTEX_GUARD_ROW_LIMIT', '10000')),
+            sample_percent=float(os.getenv('CORTEX_GUARD_SAMPLE_PERCENT', '10')),
+            large_warehouse=(os.getenv('CORTEX_GUARD_LARGE_WAREHOUSE')
+                             or os.getenv('CORTEX_WAREHOUSE_HEAVY') or None),
+            cache_ttl=int(os.getenv('CORTEX_GUARD_CACHE_TTL', '3600'))
+        )
+
+    def check(self, sql: str, explain: Callable[[str], str]) -> Dict[str, Any]:
+        """Return the cached or freshly computed decision for a SQL statement.
+
+        ``explain`` runs ``EXPLAIN USING JSON <sql>`` and returns the JSON plan.
+        """
+        if not self.enabled:
+            return self._decision('allow', sql, reason='guard disabled')
+
+        key = sql_hash(sql)
+        with self._lock:
+            cached = self._decisions.get(key)
+        if cached and time.time() - cached[0] < self.cache_ttl:
+            return cached[1]
+
+        try:
+            estimate = self.estimate(explain(f"EXPLAIN USING JSON {sql}"))
+        except Exception as e:
+            # Without an estimate the cost is unknown, so do not run the statement
+            logger.warning(f"Pre-flight EXPLAIN failed, rejecting query: {str(e)}")
+            return self._decision('reject', None, reason=f"EXPLAIN failed: {str(e)}")
+
+        decision = self.decide(sql, estimate)
+        logger.info(f"Query guard: {decision['action']} ({decision['reason']})")
+
+        with self._lock:
+            self._decisions[key] = (time.time(), decision)
+        return decision
+
+    def estimate(self, plan_json: str) -> Dict[str, Any]:
+        """Extract partition and byte estimates from an EXPLAIN USING JSON plan."""
+        plan = json.loads(plan_json) if isinstance(plan_json, str) else plan_json
+        stats = plan.get('GlobalStats', {})
+
+        tables = {}
+        aggregated = False
+        for operations in plan.get('Operations', []):
+            for operation in operations:
+                if operation.get('operation') == 'TableScan':
+                    for table in operation.get('objects', []):
+                        tables[table] = tables.get(table, 0) + operation.get('bytesAssigned', 0)
+                elif operation.get('operation') == 'Aggregate':
+                    aggregated = True
+
+        return {
+            'partitions_total': stats.get('partitionsTotal', 0),
+            'partitions_assigned': stats.get('partitionsAssigned', 0),
+            'bytes_assigned': stats.get('bytesAssigned', 0),
+            'tables': tables,
+            'aggregated': aggregated
+        }
+
+    def decide(self, sql: str, estimate: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply the configured thresholds to a cost estimate.
+
+        Oversize aggregates are never limited (the full scan would still run)
+        and only sampled without SUM or COUNT; otherwise they are routed to
+        the large warehouse, or rejected without one.
+        """
+        scanned = estimate['bytes_assigned']
+        size = f"{scanned / GB:.2f} GB over {estimate['partitions_assigned']} partitions"
+
+        if scanned <= self.max_bytes:
+            return self._decision('allow', sql, estimate, reason=size)
+
+        if scanned > self.reject_bytes:
+            return self._decision('reject', None, estimate,
+                                  reason=f"{size} exceeds the {self.reject_bytes / GB:.0f} GB limit")
+
+        action = self.oversize_action
+        if action == 'auto':
+            if self.large_warehouse:
+                action = 'route'
+            else:
+                action = 'sample' if estimate['aggregated'] else 'limit'
+
+        aggregated = estimate['aggregated'] or SAMPLE_SENSITIVE_PATTERN.search(sql)
+        if action == 'sample' and SAMPLE_SENSITIVE_PATTERN.search(sql):
+            # SUM and COUNT over a sample would be silently too small
+            action = 'route'
+        if action == 'limit' and aggregated:
+            # A row cap on the output does not shorten the scan behind an aggregate
+            action = 'route'
+
+        if action == 'route' and not self.large_warehouse:
+            action = 'reject'
+
+        if action == 'limit':
+            return self._decision('limit', self.add_limit(sql), estimate, reason=size)
+        if action == 'sample':
+            return self._decision('sample', self.add_sample(sql, estimate['tables']),
+                                  estimate, reason=size)
+        if action == 'route':
+            return self._decision('route', sql, estimate, reason=size,
+                                  warehouse=self.large_warehouse)
+        return self._decision('reject', None, estimate,
+                              reason=f"{size} exceeds the {self.max_bytes / GB:.0f} GB limit")
+
+    def add_limit(self, sql: str) -> str:
+        """Wrap a query so that it returns at most ``row_limit`` rows."""
+        # The newline keeps a trailing line comment from swallowing the parenthesis
+        return f"SELECT * FROM ({sql.strip().rstrip(';')}\n) LIMIT {self.row_limit}"
+
+    def add_sample(self, sql: str, tables: Dict[str, int]) -> str:
+        """Add a block SAMPLE clause to the largest scanned table.
+
+        Only one side of a join is sampled so join selectivity is preserved.
+        """
+        if not tables:
+            return sql
+
+        largest = max(tables, key=tables.get)
+        keywords = r'(?:ON|WHERE|GROUP|ORDER|JOIN|INNER|LEFT|RIGHT|FULL|CROSS|LIMIT|SAMPLE|HAVING)'
+        pattern = re.compile(
+            rf'((?:FROM|JOIN)\s+{re.escape(largest)}(?:\s+(?:AS\s+)?(?!{keywords}\b)\w+)?)',
+            re.IGNORECASE
+        )
+        return pattern.sub(rf'\1 SAMPLE SYSTEM ({self.sample_percent:g})', sql)
+
+    def clear(self):
+        """Forget all cached decisions."""
+        with self._lock:
+            self._decisions.clear()
+
+    def _decision(self, action: str, sql: Optional[str], estimate: Optional[Dict] = None,
+                  reason: str = '', warehouse: Optional[str] = None) -> Dict[str, Any]:
+        """Build a decision dictionary."""
+        return {
+            'action': action,
+            'sql': sql,
+            'warehouse': warehouse,
+            'estimate': estimate,
+            'reason': reason
+        }
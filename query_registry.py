@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Query Registry Module
+
+This module keeps track of the warehouse queries that are running on behalf
+of each owner (a Streamlit browser session, for example) so they can be
+cancelled with SYSTEM$CANCEL_QUERY when the owner moves on or goes away.
+Sessions are tagged with a QUERY_TAG naming this process; the command line
+cancels queries whose process has exited or that ran too long.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+import contextvars
+import logging
+from contextlib import contextmanager
+from typing import Dict, List, Any, Callable, Optional
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+APP_NAME = 'cortex-analyst'
+
+# Owner of the queries started in the current thread or task
+current_owner = contextvars.ContextVar('query_owner', default=None)
+
+# Called periodically while a query runs; raising from it abandons the query
+current_checkpoint = contextvars.ContextVar('query_checkpoint', default=None)
+
+def query_tag() -> str:
+    """Return the QUERY_TAG identifying this process's sessions."""
+    return json.dumps({'app': APP_NAME, 'host': socket.gethostname(), 'pid': os.getpid()},
+                      separators=(',', ':'))
+
+def session_parameters() -> Dict[str, Any]:
+    """Return the session parameters every app session is opened with.
+
+    STATEMENT_TIMEOUT_IN_SECONDS (CORTEX_STATEMENT_TIMEOUT) is the server-side
+    backstop for queries the app has lost track of.
+    """
+    return {
+        'QUERY_TAG': query_tag(),
+        'STATEMENT_TIMEOUT_IN_SECONDS': int(os.getenv('CORTEX_STATEMENT_TIMEOUT', '600'))
+    }
+
+def parse_timeouts(spec: Optional[str]) -> Dict[str, float]:
+    """Parse 'intent:seconds,...' into a timeout per intent."""
+    timeouts = {}
+    for item in (spec or '').split(','):
+        if item.strip():
+            intent, seconds = item.split(':')
+            timeouts[intent.strip()] = float(seconds)
+    return timeouts
+
+@contextmanager
+def owned_by(owner: Optional[str], checkpoint: Optional[Callable[[], None]] = None):
+    """Attribute the queries started in a with-block to ``owner``.
+
+    ``checkpoint()`` is called every fraction of a second while a query is
+    awaited; if it raises (a Streamlit rerun or stop request, for example),
+    the caller stops waiting and the query is cancelled unless another owner
+    still waits on it.
+    """
+    owner_token = current_owner.set(owner)
+    checkpoint_token = current_checkpoint.set(checkpoint)
+    try:
+        yield
+    finally:
+        current_checkpoint.reset(checkpoint_token)
+        current_owner.reset(owner_token)
+
+class QueryRegistry:
+    """Class to map owners to their running queries and cancel them."""
+
+    def __init__(self, cancel: Callable[[str], Any]):
+        """Initialize the registry; ``cancel(query_id)`` cancels a running query."""
+        self.cancel = cancel
+        self._queries = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self, key: str, owner: Optional[str] = None):
+        """Register ``owner`` as waiting on the statement ``key`` for a with-block.
+
+        Callers sharing one execution (single flight) all attach to the same
+        key; the query is only cancelled once none of them still want it.
+        """
+        owner = owner or current_owner.get()
+        if not owner:
+            yield
+            return
+
+        with self._lock:
+            entry = self._queries.setdefault(key, {'query_id': None, 'owners': set(),
+                                                   'started_at': time.time()})
+            entry['owners'].add(owner)
+        try:
+            yield
+        finally:
+            with self._lock:
+                entry['owners'].discard(owner)
+                if not entry['owners'] and self._queries.get(key) is entry:
+                    del self._queries[key]
+
+    def started(self, key: str, query_id: str):
+        """Record the query ID of a tracked statement once it has been submitted."""
+        with self._lock:
+            entry = self._queries.get(key)
+            if entry is not None:
+                entry['query_id'] = query_id
+
+    def running(self, owner: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return the tracked queries, optionally only those of one owner."""
+        with self._lock:
+            return [{'key': key, 'query_id': entry['query_id'], 'owners': sorted(entry['owners']),
+                     'seconds': time.time() - entry['started_at']}
+                    for key, entry in self._queries.items()
+                    if owner is None or owner in entry['owners']]
+
+    def owners(self) -> List[str]:
+        """Return every owner with a tracked query."""
+        with self._lock:
+            return sorted({owner for entry in self._queries.values() for owner in entry['owners']})
+
+    def abandon(self, key: str, owner: Optional[str] = None) -> int:
+        """Detach an owner from one statement, cancelling it if nobody else waits on it."""
+        return self._detach(owner or current_owner.get(), [key])
+
+    def cancel_owner(self, owner: str) -> int:
+        """Detach an owner from its queries and cancel those nobody else waits on."""
+        return self._detach(owner)
+
+    def _detach(self, owner: Optional[str], keys: Optional[List[str]] = None) -> int:
+        """Detach an owner from some (or all) of its statements and cancel the orphaned ones."""
+        to_cancel = []
+        with self._lock:
+            for key in list(keys if keys is not None else self._queries):
+                entry = self._queries.get(key)
+                if entry is None or owner not in entry['owners']:
+                    continue
+                entry['owners'].discard(owner)
+                if not entry['owners']:
+                    del self._queries[key]
+                    if entry['query_id']:
+                        to_cancel.append(entry['query_id'])
+
+        for query_id in to_cancel:
+            try:
+                self.cancel(query_id)
+                logger.info(f"Cancelled query {query_id} abandoned by {owner}")
+            except Exception as e:
+                logger.warning(f"Failed to cancel query {query_id}: {str(e)}")
+        return len(to_cancel)
+
+def find_orphans(rows: List[Dict[str, Any]], max_age: float,
+                 include_live: bool = False) -> List[Dict[str, Any]]:
+    """Pick the running app queries whose process is gone or that exceeded ``max_age``.
+
+    ``rows`` are QUERY_HISTORY rows with lower-case keys.
+    """
+    host = socket.gethostname()
+    orphans = []
+    for row in rows:
+        try:
+            tag = json.loads(row.get('query_tag') or '')
+        except ValueError:
+            continue
+        if not isinstance(tag, dict) or tag.get('app') != APP_NAME:
+            continue
+
+        # This command's own session
+        if tag.get('host') == host and tag.get('pid') == os.getpid():
+            continue
+
+        reason = None
+        if tag.get('host') == host and not _process_alive(tag.get('pid')):
+            reason = f"process {tag.get('pid')} has exited"
+        elif row['seconds'] > max_age:
+            reason = f"running for {row['seconds']:.0f}s"
+        elif include_live:
+            reason = 'requested'
+        if reason:
+            orphans.append({**row, 'reason': reason})
+    return orphans
+
+def _process_alive(pid: Optional[int]) -> bool:
+    """Return whether a local process is still running."""
+    if not pid:
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def main():
+    """Cancel app queries left running by exited processes or past their age limit."""
+    from cortex_analyst import CortexAnalyst
+
+    parser = argparse.ArgumentParser(description="Cancel orphaned Cortex Analyst queries")
+    parser.add_argument("--max-age", type=float,
+                        default=float(os.getenv('CORTEX_STATEMENT_TIMEOUT', '600')),
+                        help="Cancel app queries running longer than this many seconds")
+    parser.add_argument("--all", action="store_true",
+                        help="Cancel every running app query, including live processes'")
+    parser.add_argument("--dry-run", action="store_true", help="Only list the queries")
+    args = parser.parse_args()
+
+    analyst = CortexAnalyst()
+    if not analyst.connect():
+        print("❌ Connection failed!")
+        sys.exit(1)
+
+    try:
+        rows = analyst.session.sql(
+            "SELECT QUERY_ID, QUERY_TAG, WAREHOUSE_NAME, EXECUTION_STATUS, "
+            "DATEDIFF('second', START_TIME, CURRENT_TIMESTAMP()) AS SECONDS "
+            "FROM TABLE(INFORMATION_SCHEMA.QUERY_HISTORY(RESULT_LIMIT => 10000)) "
+            "WHERE EXECUTION_STATUS IN ('RUNNING', 'QUEUED', 'RESUMING_WAREHOUSE', 'BLOCKED') "
+            "AND QUERY_TAG LIKE ?",
+            params=[f'%"app":"{APP_NAME}"%']
+        ).collect()
+        rows = [{key.lower(): value for key, value in row.as_dict().items()} for row in rows]
+
+        orphans = find_orphans(rows, args.max_age, include_live=args.all)
+        print(f"🔎 {len(rows)} running app queries, {len(orphans)} to cancel")
+        for orphan in orphans:
+            print(f"  {orphan['query_id']} on {orphan['warehouse_name']} "
+                  f"({orphan['execution_status'].lower()}, {orphan['reason']})")
+            if not args.dry_run:
+                analyst.cancel_query(orphan['query_id'])
+        if orphans and not args.dry_run:
+            print(f"✅ Cancelled {len(orphans)} queries")
+    finally:
+        analyst.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Query Tracker Module
+
+This module records the Snowflake query ID of every executed statement,
+keyed by its SQL hash, so follow-up operations (paging, sorting, exports,
+re-aggregation) can read the persisted result with RESULT_SCAN instead of
+running the query again. Persisted results live for 24 hours.
+"""
+
+import os
+import re
+import time
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional
+
+from query_guard import sql_hash
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+QUERY_ID_PATTERN = re.compile(r'^[0-9a-fA-F-]{36}$')
+
+def result_scan_sql(query_id: str, select: str = '*', where: Optional[str] = None,
+                    group_by: Optional[List[str]] = None, order_by: Optional[str] = None,
+                    limit: Optional[int] = None, offset: Optional[int] = None) -> str:
+    """Return a SELECT over the persisted result of a query."""
+    if not QUERY_ID_PATTERN.match(query_id):
+        raise ValueError(f"Invalid query ID: {query_id}")
+
+    sql = f"SELECT {select} FROM TABLE(RESULT_SCAN('{query_id}'))"
+    if where:
+        sql += f" WHERE {where}"
+    if group_by:
+        sql += f" GROUP BY {', '.join(group_by)}"
+    if order_by:
+        sql += f" ORDER BY {order_by}"
+    if limit is not None:
+        sql += f" LIMIT {int(limit)}"
+    if offset:
+        sql += f" OFFSET {int(offset)}"
+    return sql
+
+class QueryTracker:
+    """Class to map executed SQL to the Snowflake query ID of its result."""
+
+    def __init__(self, reuse_ttl: int = 23 * 3600, max_entries: int = 1024):
+        """Initialize the tracker.
+
+        ``reuse_ttl`` is kept below Snowflake's 24-hour result retention so a
+        tracked result is not used right as it expires.
+        """
+        self.reuse_ttl = reuse_ttl
+        self.max_entries = max_entries
+
+        self._queries = OrderedDict()
+        self._by_id = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'QueryTracker':
+        """Create a tracker configured from CORTEX_RESULT_* environment variables."""
+        return cls(
+            reuse_ttl=int(os.getenv('CORTEX_RESULT_REUSE_TTL', str(23 * 3600))),
+            max_entries=int(os.getenv('CORTEX_RESULT_MAX_TRACKED', '1024'))
+        )
+
+    def record(self, sql: str, query_id: str, role: Optional[str] = None,
+               warehouse: Optional[str] = None,
+               params: Optional[List[Any]] = None) -> Dict[str, Any]:
+        """Record the query ID of an executed statement and its bind parameters."""
+        entry = {
+            'query_id': query_id,
+            'sql': sql,
+            'params': list(params) if params else None,
+            'sql_hash': sql_hash(sql, params),
+            'role': role,
+            'warehouse': warehouse,
+            'executed_at': time.time()
+        }
+        key = self._key(sql, role, params)
+        with self._lock:
+            self._queries[key] = entry
+            self._queries.move_to_end(key)
+            self._by_id[query_id] = entry
+            while len(self._queries) > self.max_entries:
+                _, evicted = self._queries.popitem(last=False)
+                self._by_id.pop(evicted['query_id'], None)
+        return entry
+
+    def lookup(self, sql: str, role: Optional[str] = None,
+               params: Optional[List[Any]] = None) -> Optional[Dict[str, Any]]:
+        """Return the tracked entry for a statement if its result is still persisted."""
+        with self._lock:
+            entry = self._queries.get(self._key(sql, role, params))
+        return entry if entry and self.is_valid(entry) else None
+
+    def get(self, query_id: str) -> Optional[Dict[str, Any]]:
+        """Return the tracked entry for a query ID."""
+        with self._lock:
+            return self._by_id.get(query_id)
+
+    def is_valid(self, entry: Dict[str, Any]) -> bool:
+        """Return True while a tracked result is within the reuse window."""
+        return time.time() - entry['executed_at'] < self.reuse_ttl
+
+    def forget(self, query_id: str):
+        """Drop a query ID whose persisted result is no longer available."""
+        with self._lock:
+            entry = self._by_id.pop(query_id, None)
+            if entry:
+                self._queries.pop(self._key(entry['sql'], entry['role'], entry['params']), None)
+
+    @staticmethod
+    def _key(sql: str, role: Optional[str], params: Optional[List[Any]] = None) -> str:
+        """Return the lookup key of a statement: SQL and binds hash plus role."""
+        return f"{sql_hash(sql, params)}|{(role or '').upper()}"
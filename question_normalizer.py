@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Question Normalizer Module
+
+This module canonicalizes free-form questions before intent matching.
+Phrasing differences (number words, synonyms, punctuation) are removed and
+parameters such as N, year, market segment and nation are extracted into
+slots, so equivalent questions share one (intent, params) cache key.
+"""
+
+import re
+import json
+from typing import Dict, Any
+
+UNIT_WORDS = {
+    'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7,
+    'eight': 8, 'nine': 9
+}
+
+TENS_WORDS = {
+    'twenty': 20, 'thirty': 30, 'forty': 40, 'fifty': 50, 'sixty': 60,
+    'seventy': 70, 'eighty': 80, 'ninety': 90
+}
+
+NUMBER_WORDS = {
+    **UNIT_WORDS, **TENS_WORDS,
+    'ten': 10, 'eleven': 11, 'twelve': 12, 'thirteen': 13, 'fourteen': 14, 'fifteen': 15,
+    'sixteen': 16, 'seventeen': 17, 'eighteen': 18, 'nineteen': 19,
+    'hundred': 100, 'a hundred': 100, 'one hundred': 100, 'a dozen': 12, 'dozen': 12
+}
+
+# "twenty-five" / "twenty five": combined before single words are replaced
+COMPOUND_PATTERN = re.compile(rf"\b({'|'.join(TENS_WORDS)})[- ]({'|'.join(UNIT_WORDS)})\b")
+
+# Phrase rewrites applied in order, so later patterns see earlier results
+SYNONYMS = [
+    (r'\b(?:biggest|largest|best|highest value|leading)\b', 'top'),
+    (r'\b(?:clients?|buyers?)\b', 'customers'),
+    (r'\b(?:earnings|income|turnover)\b', 'revenue'),
+    (r'\b(?:countries|country)\b', 'nation'),
+    (r'\baov\b', 'average order value'),
+    (r'\b(?:avg|mean)\b', 'average'),
+    (r'\b(?:per|for each|by each)\b', 'by'),
+    (r'\bmonthly\b(?! sales)', 'by month'),
+    (r'\bquarterly\b', 'by quarter'),
+    (r'\b(?:yearly|annual|annually)\b', 'by year'),
+    (r'(?<!market )\bsegments?\b', 'market segment')
+]
+
+MARKET_SEGMENTS = ('AUTOMOBILE', 'BUILDING', 'FURNITURE', 'HOUSEHOLD', 'MACHINERY')
+
+NATIONS = (
+    'ALGERIA', 'ARGENTINA', 'BRAZIL', 'CANADA', 'EGYPT', 'ETHIOPIA', 'FRANCE',
+    'GERMANY', 'INDIA', 'INDONESIA', 'IRAN', 'IRAQ', 'JAPAN', 'JORDAN', 'KENYA',
+    'MOROCCO', 'MOZAMBIQUE', 'PERU', 'CHINA', 'ROMANIA', 'SAUDI ARABIA', 'VIETNAM',
+    'RUSSIA', 'UNITED KINGDOM', 'UNITED STATES'
+)
+
+def normalize_text(question: str) -> str:
+    """Return a lower-case question with number words and synonyms canonicalized."""
+    text = question.lower()
+    text = re.sub(r"[^\w\s-]", ' ', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+
+    text = COMPOUND_PATTERN.sub(
+        lambda match: str(TENS_WORDS[match.group(1)] + UNIT_WORDS[match.group(2)]), text)
+
+    # Longest phrases first so "one hundred" wins over "one"
+    for word in sorted(NUMBER_WORDS, key=len, reverse=True):
+        text = re.sub(rf'\b{word}\b', str(NUMBER_WORDS[word]), text)
+
+    for pattern, replacement in SYNONYMS:
+        text = re.sub(pattern, replacement, text)
+
+    return re.sub(r'\s+', ' ', text).strip()
+
+def extract_slots(text: str) -> Dict[str, Any]:
+    """Extract N, year, market segment and nation slots from normalized text."""
+    slots = {}
+
+    top = re.search(r'\btop (\d+)\b', text) or re.search(r'\b(\d+) top\b', text)
+    if top:
+        slots['n'] = int(top.group(1))
+
+    year = re.search(r'\b(19\d{2}|20\d{2})\b', text)
+    if year:
+        slots['year'] = int(year.group(1))
+
+    upper = text.upper()
+    for segment in MARKET_SEGMENTS:
+        if re.search(rf'\b{segment}\b', upper):
+            slots['segment'] = segment
+            break
+
+    for nation in NATIONS:
+        if re.search(rf'\b{nation}\b', upper):
+            slots['nation'] = nation
+            break
+
+    return slots
+
+def canonical_key(intent: str, params: Dict[str, Any]) -> str:
+    """Return the cache key of a canonicalized question."""
+    return f"{intent}|{json.dumps(params, sort_keys=True, default=str)}"
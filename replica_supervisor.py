@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Replica Supervisor Module
+
+This module runs several replicas of the app on consecutive ports behind a
+local TCP reverse proxy. The supervisor restarts replicas that exit, with an
+exponential backoff for ones that keep crashing. The proxy sends each client
+address to the same replica (rendezvous hashing), so Streamlit's websocket
+and session state stay on one process; when that replica is down, its
+clients move to the next one in their order, and only they move.
+"""
+
+import time
+import socket
+import asyncio
+import hashlib
+import threading
+import subprocess
+import logging
+from typing import Dict, List, Callable
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Bytes copied per read between client and replica
+CHUNK_SIZE = 64 * 1024
+
+def rendezvous_order(client: str, ports: List[int]) -> List[int]:
+    """Return the ports in a client's stable order of preference."""
+    return sorted(ports, key=lambda port: hashlib.sha1(f"{client}|{port}".encode()).digest(), reverse=True)
+
+def port_open(port: int, host: str = '127.0.0.1', timeout: float = 0.2) -> bool:
+    """Return whether something accepts connections on a local port."""
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+class Replica:
+    """One supervised replica process."""
+
+    def __init__(self, index: int, port: int, command: List[str], env: Dict[str, str]):
+        """Initialize the replica; it is started with ``start()``."""
+        self.index = index
+        self.port = port
+        self.command = command
+        self.env = env
+        self.process = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.backoff = 1.0
+        self.restart_at = 0.0
+        self.ready = False
+
+    def start(self):
+        """Start (or restart) the process."""
+        self.process = subprocess.Popen(self.command, env=self.env)
+        self.started_at = time.time()
+        self.ready = False
+        logger.info(f"Replica {self.index} started on port {self.port} (pid {self.process.pid})")
+
+    def alive(self) -> bool:
+        """Return whether the process is running."""
+        return self.process is not None and self.process.poll() is None
+
+class ReplicaSupervisor:
+    """Class to start replicas, restart the ones that exit and report the healthy ones."""
+
+    def __init__(self, command_for: Callable[[int], List[str]], env_for: Callable[[int], Dict[str, str]],
+                 ports: List[int], check_interval: float = 1.0, max_backoff: float = 30.0,
+                 stable_after: float = 60.0):
+        """Initialize the supervisor.
+
+        ``command_for(port)`` and ``env_for(index)`` describe each replica. A
+        replica that exits within ``stable_after`` seconds of starting waits
+        twice as long as last time (up to ``max_backoff``) before restarting.
+        """
+        self.replicas = [Replica(index, port, command_for(port), env_for(index))
+                         for index, port in enumerate(ports)]
+        self.check_interval = check_interval
+        self.max_backoff = max_backoff
+        self.stable_after = stable_after
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start every replica and the supervision thread."""
+        for replica in self.replicas:
+            replica.start()
+        self._thread = threading.Thread(target=self._run, name='replica-supervisor', daemon=True)
+        self._thread.start()
+
+    def healthy_ports(self) -> List[int]:
+        """Return the ports of running replicas that accept connections."""
+        return [replica.port for replica in self.replicas if replica.alive() and replica.ready]
+
+    def stop(self, timeout: float = 10.0):
+        """Stop supervising and terminate every replica."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        for replica in self.replicas:
+            if replica.alive():
+                replica.process.terminate()
+        deadline = time.time() + timeout
+        for replica in self.replicas:
+            if replica.process is None:
+                continue
+            try:
+                replica.process.wait(max(deadline - time.time(), 0.1))
+            except subprocess.TimeoutExpired:
+                replica.process.kill()
+
+    def check(self):
+        """Mark started replicas ready and restart exited ones whose backoff is over."""
+        now = time.time()
+        for replica in self.replicas:
+            if replica.alive():
+                if not replica.ready and port_open(replica.port):
+                    replica.ready = True
+                    logger.info(f"Replica {replica.index} is ready on port {replica.port}")
+                continue
+
+            if not replica.restart_at:
+                # Just exited: schedule the restart
+                uptime = now - replica.started_at
+                replica.backoff = 1.0 if uptime >= self.stable_after \
+                    else min(replica.backoff * 2, self.max_backoff)
+                replica.restart_at = now + replica.backoff
+                replica.ready = False
+                logger.warning(f"Replica {replica.index} exited with code {replica.process.returncode} "
+                               f"after {uptime:.0f}s; restarting in {replica.backoff:.0f}s")
+            elif now >= replica.restart_at:
+                replica.restart_at = 0.0
+                replica.restarts += 1
+                replica.start()
+
+    def _run(self):
+        """Check the replicas until stopped."""
+        while not self._stop.wait(self.check_interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Replica supervision failed: {str(e)}")
+
+class StickyProxy:
+    """Local TCP reverse proxy sending each client address to the same healthy replica."""
+
+    def __init__(self, backends: Callable[[], List[int]], host: str = '0.0.0.0', port: int = 12001,
+                 backend_host: str = '127.0.0.1'):
+        """Initialize the proxy; ``backends()`` returns the ports of the healthy replicas."""
+        self.backends = backends
+        self.host = host
+        self.port = port
+        self.backend_host = backend_host
+
+    async def serve(self):
+        """Accept connections until cancelled."""
+        server = await asyncio.start_server(self._handle, self.host, self.port)
+        logger.info(f"Sticky proxy listening on {self.host}:{self.port}")
+        async with server:
+            await server.serve_forever()
+
+    async def _handle(self, client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter):
+        """Connect a client to its replica and copy bytes both ways."""
+        client = (client_writer.get_extra_info('peername') or ('unknown',))[0]
+        upstream = None
+        for port in rendezvous_order(client, self.backends()):
+            try:
+                upstream = await asyncio.open_connection(self.backend_host, port)
+                break
+            except OSError:
+                continue
+
+        if upstream is None:
+            client_writer.write(b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\n"
+                                b"Retry-After: 1\r\nConnection: close\r\n\r\n")
+            await self._close(client_writer)
+            return
+
+        backend_reader, backend_writer = upstream
+        await asyncio.gather(self._pipe(client_reader, backend_writer),
+                             self._pipe(backend_reader, client_writer))
+
+    async def _pipe(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Copy bytes from one side to the other until either closes."""
+        try:
+            while True:
+                data = await reader.read(CHUNK_SIZE)
+                if not data:
+                    break
+                writer.write(data)
+                await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            await self._close(writer)
+
+    @staticmethod
+    async def _close(writer: asyncio.StreamWriter):
+        """Close a connection, ignoring errors from a peer that is already gone."""
+        try:
+            writer.close()
+            await writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+
+def run_replicas(command_for: Callable[[int], List[str]], env_for: Callable[[int], Dict[str, str]],
+                 port: int, workers: int, host: str = '0.0.0.0'):
+    """Serve ``workers`` replicas on the ports after ``port`` behind a sticky proxy on ``port``."""
+    ports = [port + number for number in range(1, workers + 1)]
+    supervisor = ReplicaSupervisor(command_for, env_for, ports)
+    supervisor.start()
+    try:
+        asyncio.run(StickyProxy(supervisor.healthy_ports, host=host, port=port).serve())
+    finally:
+        supervisor.stop()
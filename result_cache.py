@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Result Cache Module
+
+This module provides a thread-safe, TTL-bounded LRU cache for query results,
+shared by every user of a CortexAnalyst instance. Entries past their TTL can
+still be served as stale for a grace period while they are revalidated. With
+CORTEX_CACHE_DIR set, the cache is also backed by a SQLite file there, so
+every process on the machine (launch.py --workers replicas) shares results.
+"""
+
+import os
+import time
+import pickle
+import sqlite3
+import threading
+import logging
+from pathlib import Path
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class ResultCache:
+    """Class to cache results by key with a time-to-live and a size bound."""
+
+    def __init__(self, ttl: int = 600, max_entries: int = 256, stale_ttl: int = 0):
+        """Initialize the cache; a ttl of 0 disables caching.
+        
+        Entries older than ``ttl`` remain available as stale for ``stale_ttl``
+        more seconds.
+        """
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'ResultCache':
+        """Create a cache configured from CORTEX_CACHE_* environment variables.
+
+        With CORTEX_CACHE_DIR, the cache is a SharedResultCache in that directory.
+        """
+        settings = dict(
+            ttl=int(os.getenv('CORTEX_CACHE_TTL', '600')),
+            max_entries=int(os.getenv('CORTEX_CACHE_MAX_ENTRIES', '256')),
+            stale_ttl=int(os.getenv('CORTEX_CACHE_STALE_TTL', '3600'))
+        )
+        directory = os.getenv('CORTEX_CACHE_DIR')
+        if directory and cls is ResultCache:
+            return SharedResultCache(
+                directory,
+                disk_entries=int(os.getenv('CORTEX_CACHE_DISK_MAX_ENTRIES', '4096')),
+                **settings
+            )
+        return cls(**settings)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for a key, or None if missing or not fresh."""
+        value, stale = self.lookup(key)
+        return None if stale else value
+
+    def lookup(self, key: str) -> Tuple[Optional[Any], bool]:
+        """Return (value, is_stale) for a key, or (None, False) if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            age = time.time() - entry[0] if entry is not None else None
+            if entry is None or age >= self.ttl + self.stale_ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None, False
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], age >= self.ttl
+
+    def set(self, key: str, value: Any):
+        """Store a value under a key, evicting the least recently used entries."""
+        if self.ttl <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Optional[str] = None, prefix: Optional[str] = None):
+        """Drop one key, every key starting with ``prefix``, or every entry when neither is given."""
+        with self._lock:
+            if key is not None:
+                self._entries.pop(key, None)
+            elif prefix is not None:
+                for stale_key in [k for k in self._entries if k.startswith(prefix)]:
+                    del self._entries[stale_key]
+            else:
+                self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current size."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0
+            }
+
+class SharedResultCache(ResultCache):
+    """Result cache backed by a SQLite file that several processes share.
+
+    The in-memory LRU stays in front as a first level; misses are looked up
+    on disk, so an answer computed by one process is served by all. Values
+    are pickled, so the directory must only be writable by this app's user.
+    Invalidations reach the disk and this process; other processes drop
+    their in-memory copy when its TTL runs out.
+    """
+
+    def __init__(self, directory: str, ttl: int = 600, max_entries: int = 256,
+                 stale_ttl: int = 0, disk_entries: int = 4096):
+        """Initialize the cache; the file keeps at most ``disk_entries`` entries."""
+        super().__init__(ttl=ttl, max_entries=max_entries, stale_ttl=stale_ttl)
+        self.disk_entries = disk_entries
+        self.path = Path(directory) / 'results.sqlite'
+        self.path.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+
+        self._db = sqlite3.connect(str(self.path), timeout=10, check_same_thread=False)
+        self._db_lock = threading.Lock()
+        self._writes = 0
+        with self._db_lock, self._db:
+            # WAL lets readers in other processes proceed while one writes
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS results "
+                             "(key TEXT PRIMARY KEY, stored_at REAL NOT NULL, value BLOB NOT NULL)")
+
+    def lookup(self, key: str) -> Tuple[Optional[Any], bool]:
+        """Return (value, is_stale) from memory, else from disk."""
+        value, stale = super().lookup(key)
+        if value is not None:
+            return value, stale
+
+        try:
+            with self._db_lock:
+                row = self._db.execute("SELECT stored_at, value FROM results WHERE key = ?",
+                                       (key,)).fetchone()
+            if row is None:
+                return None, False
+            age = time.time() - row[0]
+            if age >= self.ttl + self.stale_ttl:
+                return None, False
+            value = pickle.loads(row[1])
+        except (sqlite3.Error, pickle.UnpicklingError) as e:
+            logger.warning(f"Shared result cache read failed: {str(e)}")
+            return None, False
+
+        with self._lock:
+            # Keep the original timestamp so the entry expires on schedule
+            self._entries[key] = (row[0], value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self.misses -= 1
+            self.hits += 1
+        return value, age >= self.ttl
+
+    def set(self, key: str, value: Any):
+        """Store a value in memory and on disk."""
+        if self.ttl <= 0:
+            return
+        super().set(key, value)
+
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            with self._db_lock, self._db:
+                self._db.execute("INSERT OR REPLACE INTO results (key, stored_at, value) VALUES (?, ?, ?)",
+                                 (key, time.time(), blob))
+                self._writes += 1
+                if self._writes % 100 == 0:
+                    self._prune()
+        except (sqlite3.Error, pickle.PicklingError, TypeError) as e:
+            logger.warning(f"Shared result cache write failed: {str(e)}")
+
+    def invalidate(self, key: Optional[str] = None, prefix: Optional[str] = None):
+        """Drop entries from memory and disk."""
+        super().invalidate(key, prefix)
+        try:
+            with self._db_lock, self._db:
+                if key is not None:
+                    self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+                elif prefix is not None:
+                    self._db.execute("DELETE FROM results WHERE substr(key, 1, ?) = ?",
+                                     (len(prefix), prefix))
+                else:
+                    self._db.execute("DELETE FROM results")
+        except sqlite3.Error as e:
+            logger.warning(f"Shared result cache invalidation failed: {str(e)}")
+
+    def _prune(self):
+        """Delete expired entries and the oldest ones beyond ``disk_entries``; the caller holds the lock."""
+        self._db.execute("DELETE FROM results WHERE stored_at < ?",
+                         (time.time() - self.ttl - self.stale_ttl,))
+        self._db.execute("DELETE FROM results WHERE key NOT IN "
+                         "(SELECT key FROM results ORDER BY stored_at DESC LIMIT ?)", (self.disk_entries,))
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Result Exporter Module
+
+This module exports large persisted results without pulling them through
+pandas: the warehouse unloads the result to a stage as compressed, size-capped
+Parquet or CSV parts (COPY INTO @stage), the parts are downloaded with
+parallel GET threads and optionally bundled into one archive. Exports run as
+background jobs that report their progress.
+"""
+
+import os
+import sys
+import time
+import uuid
+import zipfile
+import threading
+import logging
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional
+
+from query_tracker import result_scan_sql
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Unload file format for each export format
+EXPORT_FORMATS = {
+    'parquet': "TYPE = PARQUET COMPRESSION = SNAPPY",
+    'csv': "TYPE = CSV COMPRESSION = GZIP FIELD_OPTIONALLY_ENCLOSED_BY = '\"' NULL_IF = ()"
+}
+
+class ExportJob:
+    """Class to track one background export and its progress."""
+
+    def __init__(self, query_id: str, file_format: str, archive: bool):
+        """Initialize a pending job."""
+        self.job_id = uuid.uuid4().hex[:12]
+        self.query_id = query_id
+        self.file_format = file_format
+        self.archive = archive
+
+        self.phase = 'queued'
+        self.rows = 0
+        self.files_total = 0
+        self.files_done = 0
+        self.bytes_total = 0
+        self.bytes_done = 0
+        self.files = []
+        self.archive_path = None
+        self.error = None
+        self.started_at = time.time()
+        self.finished_at = None
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def done(self) -> bool:
+        """Return True once the job has succeeded or failed."""
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job finishes; return False on timeout."""
+        return self._done.wait(timeout)
+
+    def progress(self) -> Dict[str, Any]:
+        """Return a snapshot of the job's progress."""
+        return {
+            'job_id': self.job_id,
+            'phase': self.phase,
+            'rows': self.rows,
+            'files_total': self.files_total,
+            'files_done': self.files_done,
+            'bytes_total': self.bytes_total,
+            'bytes_done': self.bytes_done,
+            'fraction': self.bytes_done / self.bytes_total if self.bytes_total else 0.0,
+            'files': list(self.files),
+            'archive_path': self.archive_path,
+            'error': self.error,
+            'elapsed': (self.finished_at or time.time()) - self.started_at
+        }
+
+class ResultExporter:
+    """Class to run stage-based exports of persisted results in the background."""
+
+    def __init__(self, analyst, export_dir: str = 'exports', stage: str = 'CORTEX_EXPORT_STAGE',
+                 max_file_size: int = 256 * 1024 * 1024, threads: int = 8, max_jobs: int = 2):
+        """Initialize the exporter.
+
+        At most ``max_jobs`` exports run at once; each downloads its parts
+        with ``threads`` parallel GETs.
+        """
+        self.analyst = analyst
+        self.export_dir = Path(export_dir)
+        self.stage = stage
+        self.max_file_size = max_file_size
+        self.threads = threads
+
+        self.jobs = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix='export')
+
+    @classmethod
+    def from_env(cls, analyst) -> 'ResultExporter':
+        """Create an exporter configured from CORTEX_EXPORT_* environment variables."""
+        return cls(
+            analyst,
+            export_dir=os.getenv('CORTEX_EXPORT_DIR', 'exports'),
+            stage=os.getenv('CORTEX_EXPORT_STAGE', 'CORTEX_EXPORT_STAGE'),
+            max_file_size=int(float(os.getenv('CORTEX_EXPORT_MAX_FILE_MB', '256')) * 1024 * 1024),
+            threads=int(os.getenv('CORTEX_EXPORT_THREADS', '8')),
+            max_jobs=int(os.getenv('CORTEX_EXPORT_MAX_JOBS', '2'))
+        )
+
+    def start(self, query_id: str, file_format: str = 'parquet', archive: bool = False) -> ExportJob:
+        """Queue an export of a persisted result and return its job."""
+        if file_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {file_format}")
+
+        job = ExportJob(query_id, file_format, archive)
+        self.jobs[job.job_id] = job
+        self._executor.submit(self._run, job)
+        return job
+
+    def close(self):
+        """Stop accepting jobs; running jobs finish in the background."""
+        self._executor.shutdown(wait=False)
+
+    def _run(self, job: ExportJob):
+        """Unload, download and optionally archive one result."""
+        target_dir = self.export_dir / job.job_id
+        location = f"@{self.stage}/{job.job_id}/"
+        try:
+            query_id, role = self.analyst.persisted_result(job.query_id)
+            with self.analyst.pool.session(self.analyst.router.route('heavy'), role) as session:
+                # Temporary stages live as long as this session, so COPY and GET share it
+                session.sql(f"CREATE TEMPORARY STAGE IF NOT EXISTS {self.stage}").collect()
+
+                job.phase = 'unloading'
+                unloaded = session.sql(
+                    f"COPY INTO {location}part FROM ({result_scan_sql(query_id)}) "
+                    f"FILE_FORMAT = ({EXPORT_FORMATS[job.file_format]}) "
+                    f"HEADER = TRUE MAX_FILE_SIZE = {int(self.max_file_size)} OVERWRITE = TRUE"
+                ).collect()
+                job.rows = sum(self._record(row).get('rows_unloaded', 0) for row in unloaded)
+
+                parts = [self._record(row) for row in session.sql(f"LIST {location}").collect()]
+                job.files_total = len(parts)
+                job.bytes_total = sum(part['size'] for part in parts)
+
+                job.phase = 'downloading'
+                target_dir.mkdir(parents=True, exist_ok=True)
+                with ThreadPoolExecutor(max_workers=self.threads,
+                                        thread_name_prefix=f'export-get-{job.job_id}') as downloads:
+                    list(downloads.map(lambda part: self._get(session, job, location, part, target_dir),
+                                       parts))
+
+                session.sql(f"REMOVE {location}").collect()
+
+            if job.archive:
+                job.phase = 'archiving'
+                job.archive_path = str(self._archive(job, target_dir))
+
+            job.phase = 'done'
+            logger.info(f"Export {job.job_id}: {job.rows} rows in {job.files_total} files, "
+                        f"{job.bytes_total / 1024 / 1024:.1f} MB")
+
+        except Exception as e:
+            logger.error(f"Export {job.job_id} failed: {str(e)}")
+            job.phase = 'failed'
+            job.error = str(e)
+
+        finally:
+            job.finished_at = time.time()
+            job._done.set()
+
+    @staticmethod
+    def _record(row) -> Dict[str, Any]:
+        """Return a Snowpark row as a dictionary with lower-case keys."""
+        return {key.lower(): value for key, value in row.as_dict().items()}
+
+    def _get(self, session, job: ExportJob, location: str, part: Dict[str, Any], target_dir: Path):
+        """Download one unloaded part and update the job's progress."""
+        name = part['name'].rsplit('/', 1)[-1]
+        session.file.get(f"{location}{name}", str(target_dir))
+        with job._lock:
+            job.files.append(str(target_dir / name))
+            job.files_done += 1
+            job.bytes_done += part['size']
+
+    def _archive(self, job: ExportJob, target_dir: Path) -> Path:
+        """Bundle the downloaded parts into one zip (stored: parts are already compressed)."""
+        archive_path = self.export_dir / f"export_{job.job_id}.zip"
+        with zipfile.ZipFile(archive_path, 'w', compression=zipfile.ZIP_STORED) as archive:
+            for path in sorted(job.files):
+                archive.write(path, arcname=Path(path).name)
+        return archive_path
+
+def main():
+    """Export a persisted result by query ID from the command line."""
+    import argparse
+    from cortex_analyst import CortexAnalyst
+
+    parser = argparse.ArgumentParser(description="Export a persisted query result via a stage")
+    parser.add_argument("query_id", help="Snowflake query ID of the result to export")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default='parquet')
+    parser.add_argument("--archive", action="store_true", help="Bundle the parts into one zip")
+    args = parser.parse_args()
+
+    analyst = CortexAnalyst()
+    if not analyst.connect():
+        print("❌ Connection failed!")
+        sys.exit(1)
+
+    exporter = ResultExporter.from_env(analyst)
+    try:
+        job = exporter.start(args.query_id, args.format, args.archive)
+        while not job.wait(2):
+            progress = job.progress()
+            print(f"⏳ {progress['phase']}: {progress['files_done']}/{progress['files_total']} files")
+        if job.error:
+            print(f"❌ Export failed: {job.error}")
+            sys.exit(1)
+        print(f"✅ Exported {job.rows} rows to {job.archive_path or exporter.export_dir / job.job_id}")
+    finally:
+        exporter.close()
+        analyst.close()
+
+if __name__ == "__main__":
+    main()
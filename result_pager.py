@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Result Pager Module
+
+This module pages through a persisted query result one page at a time.
+Snowflake does not keep row order between scans, so the result is sorted
+once per sort order into a new persisted result that numbers its rows
+(ROW_NUMBER), and every page is read as a range of row numbers. The next
+page is prefetched in the background and a small LRU cache keeps recently
+viewed pages, so memory stays bounded no matter how large the result is.
+"""
+
+import threading
+import logging
+import pandas as pd
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Callable, Optional, Sequence
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Row number column of a numbered result
+ROW_COLUMN = '"_PAGE_ROW"'
+
+# Shared by all pagers so each open result does not start its own threads
+_prefetcher = ThreadPoolExecutor(max_workers=4, thread_name_prefix='page-prefetch')
+
+class ResultPager:
+    """Class to fetch pages of a persisted result on demand."""
+
+    def __init__(self, scan: Callable[..., pd.DataFrame], persist: Callable[[str, str], str],
+                 query_id: str, columns: Sequence[str], page_size: int = 100,
+                 order_by: Optional[str] = None, cache_pages: int = 8, prefetch: bool = True):
+        """Initialize the pager.
+
+        ``scan(query_id, select=..., where=..., order_by=...)`` reads from a
+        persisted result, e.g. ``CortexAnalyst.scan_result``, and
+        ``persist(query_id, select)`` stores a SELECT over it as a new
+        persisted result and returns its query ID, e.g.
+        ``CortexAnalyst.persist_scan``. Without ``order_by`` rows are numbered
+        by the first of ``columns``.
+        """
+        if not columns:
+            raise ValueError("Paging needs the result's columns for a deterministic order")
+
+        self.scan = scan
+        self.persist = persist
+        self.query_id = query_id
+        self.columns = list(columns)
+        self.page_size = page_size
+        self.order_by = order_by
+        self.cache_pages = cache_pages
+        self.prefetch = prefetch
+
+        self._total_rows = None
+        self._numbered_id = None
+        self._pages = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._number_lock = threading.Lock()
+
+    def page(self, number: int) -> pd.DataFrame:
+        """Return one page (0-based), prefetching the page after it."""
+        data = self._get(number)
+        if self.prefetch and number + 1 < self.page_count():
+            self._schedule(number + 1)
+        return data
+
+    def total_rows(self) -> int:
+        """Return the number of rows in the result."""
+        if self._total_rows is None:
+            counted = self.scan(self.query_id, select='COUNT(*) AS ROW_COUNT')
+            self._total_rows = int(counted.iloc[0, 0]) if not counted.empty else 0
+        return self._total_rows
+
+    def page_count(self) -> int:
+        """Return the number of pages in the result."""
+        return max(1, -(-self.total_rows() // self.page_size))
+
+    def sorted_by(self, order_by: Optional[str]) -> 'ResultPager':
+        """Return a pager over the same result with a different sort order."""
+        if order_by == self.order_by:
+            return self
+        pager = ResultPager(self.scan, self.persist, self.query_id, self.columns, self.page_size,
+                            order_by, self.cache_pages, self.prefetch)
+        pager._total_rows = self._total_rows
+        return pager
+
+    def _get(self, number: int) -> pd.DataFrame:
+        """Return a page from the cache, an in-flight prefetch, or a fresh scan."""
+        with self._lock:
+            if number in self._pages:
+                self._pages.move_to_end(number)
+                return self._pages[number]
+            pending = self._pending.get(number)
+
+        if pending is not None:
+            return pending.result()
+
+        data = self._fetch(number)
+        self._store(number, data)
+        return data
+
+    def _schedule(self, number: int):
+        """Prefetch a page in the background unless it is cached or in flight."""
+        with self._lock:
+            if number in self._pages or number in self._pending:
+                return
+            future = Future()
+            self._pending[number] = future
+
+        def run():
+            try:
+                data = self._fetch(number)
+                self._store(number, data)
+                future.set_result(data)
+            except Exception as e:
+                logger.warning(f"Failed to prefetch page {number}: {str(e)}")
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._pending.pop(number, None)
+
+        _prefetcher.submit(run)
+
+    def numbering(self) -> str:
+        """Return the SELECT that numbers the result's rows in the chosen order."""
+        order_by = self.order_by or '"{}"'.format(self.columns[0].replace('"', '""'))
+        return f"*, ROW_NUMBER() OVER (ORDER BY {order_by}) - 1 AS {ROW_COLUMN}"
+
+    def _numbered(self, stale: Optional[str] = None) -> str:
+        """Return the query ID of the numbered result, sorting the result on first use.
+
+        ``stale`` is a numbered result that could not be read; it is replaced
+        unless another page already did so.
+        """
+        with self._number_lock:
+            if self._numbered_id is None or self._numbered_id == stale:
+                self._numbered_id = self.persist(self.query_id, self.numbering())
+            return self._numbered_id
+
+    def _fetch(self, number: int) -> pd.DataFrame:
+        """Scan one page, a range of row numbers, from the numbered result."""
+        first = number * self.page_size
+        scan = lambda numbered_id: self.scan(
+            numbered_id, select=f"* EXCLUDE {ROW_COLUMN}",
+            where=f"{ROW_COLUMN} >= {first} AND {ROW_COLUMN} < {first + self.page_size}",
+            order_by=ROW_COLUMN)
+        numbered_id = self._numbered()
+        try:
+            return scan(numbered_id)
+        except Exception as e:
+            # The numbered result expired; sort again
+            logger.warning(f"Numbered result of {self.query_id} unavailable, renumbering: {str(e)}")
+            return scan(self._numbered(stale=numbered_id))
+
+    def _store(self, number: int, data: pd.DataFrame):
+        """Cache a page, evicting the least recently used pages."""
+        with self._lock:
+            self._pages[number] = data
+            self._pages.move_to_end(number)
+            while len(self._pages) > self.cache_pages:
+                self._pages.popitem(last=False)
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Rollup Manager Module
+
+This module builds and maintains pre-aggregated rollups of the semantic-model
+metrics (total_revenue, order_count, customer_count, average_order_value) for
+common dimension combinations. Rollups are Snowflake dynamic tables or, when
+working offline, local Parquet files. Intent queries are rewritten to read
+the smallest rollup that can answer them.
+"""
+
+import os
+import sys
+import time
+import calendar
+import argparse
+import threading
+import logging
+import pandas as pd
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Dimensions stored in rollups, as expressions over the joined base tables
+ROLLUP_DIMENSIONS = {
+    'order_year': 'YEAR(o.O_ORDERDATE)',
+    'order_quarter': 'QUARTER(o.O_ORDERDATE)',
+    'order_month': 'MONTH(o.O_ORDERDATE)',
+    'market_segment': 'c.C_MKTSEGMENT',
+    'nation_name': 'n.N_NAME'
+}
+
+# Dimensions computed from a stored dimension: (source dimension, SQL expression)
+DERIVED_DIMENSIONS = {
+    'month_name': ('order_month', "MONTHNAME(DATE_FROM_PARTS(2000, order_month, 1))")
+}
+
+# Stored measures: (build expression, re-aggregation expression, pandas re-aggregation)
+ROLLUP_MEASURES = {
+    'total_revenue': ('SUM(o.O_TOTALPRICE)', 'SUM(total_revenue)', 'sum'),
+    'order_count': ('COUNT(o.O_ORDERKEY)', 'SUM(order_count)', 'sum'),
+    'earliest_order': ('MIN(o.O_ORDERDATE)', 'MIN(earliest_order)', 'min'),
+    'latest_order': ('MAX(o.O_ORDERDATE)', 'MAX(latest_order)', 'max'),
+    # Distinct counts cannot be re-aggregated; only served at their exact grain
+    'customer_count': ('COUNT(DISTINCT o.O_CUSTKEY)', 'SUM(customer_count)', 'sum')
+}
+
+NON_ADDITIVE_MEASURES = ('customer_count',)
+
+# Metrics computed from stored measures
+DERIVED_METRICS = {
+    'average_order_value': 'SUM(total_revenue) / NULLIF(SUM(order_count), 0)'
+}
+
+# Rollups to build, keyed by name, with their grain
+DEFAULT_ROLLUPS = {
+    'total': [],
+    'year': ['order_year'],
+    'segment': ['market_segment'],
+    'nation': ['nation_name'],
+    'year_quarter': ['order_year', 'order_quarter'],
+    'year_month': ['order_year', 'order_quarter', 'order_month'],
+    'month_segment_nation': ['order_year', 'order_quarter', 'order_month',
+                             'market_segment', 'nation_name']
+}
+
+class RollupManager:
+    """Class to build rollups and rewrite intent queries against them."""
+
+    BACKENDS = ('snowflake', 'parquet')
+
+    def __init__(self, semantic_model: Optional[Dict[str, Any]], backend: Optional[str] = None,
+                 schema: Optional[str] = None, directory: str = '.rollups',
+                 target_lag: str = '1 hour', warehouse: Optional[str] = None,
+                 max_age: int = 86400, rollups: Optional[Dict[str, List[str]]] = None):
+        """Initialize the manager.
+
+        ``backend`` is ``snowflake`` (dynamic tables in ``schema``), ``parquet``
+        (files in ``directory``) or None to disable rollups.
+        """
+        if backend and backend not in self.BACKENDS:
+            raise ValueError(f"Unknown rollup backend: {backend}")
+        if backend == 'snowflake' and not schema:
+            raise ValueError("The snowflake rollup backend requires a target schema")
+
+        self.backend = backend
+        self.schema = schema
+        self.directory = Path(directory)
+        self.target_lag = target_lag
+        self.warehouse = warehouse
+        self.max_age = max_age
+        self.rollups = rollups or DEFAULT_ROLLUPS
+        self.base_tables = self._base_tables(semantic_model or {})
+
+        # Rollups known to exist, mapped to their row count (None if unknown)
+        self.available = {}
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, semantic_model: Optional[Dict[str, Any]],
+                 warehouse: Optional[str] = None) -> 'RollupManager':
+        """Create a manager configured from CORTEX_ROLLUP_* environment variables."""
+        return cls(
+            semantic_model,
+            backend=os.getenv('CORTEX_ROLLUP_BACKEND') or None,
+            schema=os.getenv('CORTEX_ROLLUP_SCHEMA') or None,
+            directory=os.getenv('CORTEX_ROLLUP_DIR', '.rollups'),
+            target_lag=os.getenv('CORTEX_ROLLUP_TARGET_LAG', '1 hour'),
+            warehouse=os.getenv('CORTEX_ROLLUP_WAREHOUSE') or warehouse,
+            max_age=int(os.getenv('CORTEX_ROLLUP_MAX_AGE', '86400'))
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """Return True if a rollup backend is configured."""
+        return self.backend is not None
+
+    def table_name(self, name: str) -> str:
+        """Return the Snowflake table name of a rollup."""
+        return f"{self.schema}.ROLLUP_{name.upper()}"
+
+    def build_sql(self, name: str) -> str:
+        """Return the aggregate SELECT that defines a rollup."""
+        grain = self.rollups[name]
+        columns = [f"{ROLLUP_DIMENSIONS[dim]} AS {dim}" for dim in grain]
+        columns += [f"{build} AS {measure}" for measure, (build, _, _) in ROLLUP_MEASURES.items()]
+
+        sql = f"SELECT {', '.join(columns)}\nFROM {self.base_tables['orders']} o"
+        if {'market_segment', 'nation_name'} & set(grain):
+            sql += f"\nJOIN {self.base_tables['customer']} c ON o.O_CUSTKEY = c.C_CUSTKEY"
+        if 'nation_name' in grain:
+            sql += f"\nJOIN {self.base_tables['nation']} n ON c.C_NATIONKEY = n.N_NATIONKEY"
+        if grain:
+            sql += f"\nGROUP BY {', '.join(ROLLUP_DIMENSIONS[dim] for dim in grain)}"
+        return sql
+
+    def build(self, session, names: Optional[List[str]] = None, rebuild: bool = False):
+        """Create or refresh rollups using a Snowpark session."""
+        if not self.enabled:
+            raise ValueError("No rollup backend configured")
+
+        for name in names or list(self.rollups):
+            started = time.time()
+            if self.backend == 'snowflake':
+                ddl = 'CREATE OR REPLACE DYNAMIC TABLE' if rebuild else 'CREATE DYNAMIC TABLE IF NOT EXISTS'
+                warehouse = f"\nWAREHOUSE = {self.warehouse}" if self.warehouse else ''
+                session.sql(
+                    f"{ddl} {self.table_name(name)}\n"
+                    f"TARGET_LAG = '{self.target_lag}'{warehouse}\n"
+                    f"AS {self.build_sql(name)}"
+                ).collect()
+            else:
+                if not rebuild and self._fresh(name):
+                    continue
+                frame = session.sql(self.build_sql(name)).to_pandas()
+                frame.columns = [column.lower() for column in frame.columns]
+                self.directory.mkdir(parents=True, exist_ok=True)
+                frame.to_parquet(path, index=False, compression='snappy')
+                with self._lock:
+                    self._frames.pop(name, None)
+            logger.info(f"Built rollup {name} in {time.time() - started:.1f}s")
+
+        self.refresh(session)
+
+    def refresh(self, session=None):
+        """Reload the set of available rollups.
+
+        Parquet rollups older than ``max_age`` are not available: nothing
+        refreshes them once the build job stops.
+        """
+        if not self.enabled:
+            return
+
+        available = {}
+        if self.backend == 'snowflake':
+            if session is None:
+                return
+            try:
+                rows = session.sql(f"SHOW DYNAMIC TABLES LIKE 'ROLLUP_%' IN SCHEMA {self.schema}").collect()
+            except Exception as e:
+                logger.warning(f"Failed to list rollups: {str(e)}")
+                rows = []
+            existing = {row.as_dict().get('name', '').upper(): row.as_dict().get('rows') for row in rows}
+            for name in self.rollups:
+                table = f"ROLLUP_{name.upper()}"
+                if table in existing:
+                    available[name] = existing[table]
+        else:
+            for name in self.rollups:
+                if self._fresh(name):
+                    available[name] = None
+
+        with self._lock:
+            self.available = available
+        logger.info(f"Available rollups: {', '.join(available) or 'none'}")
+
+    def choose(self, spec: Optional[Dict[str, Any]]) -> Optional[str]:
+        """Return the smallest available rollup that can answer an intent spec."""
+        if not self.enabled or not spec:
+            return None
+
+        required = set(spec.get('dimensions', [])) | set(spec.get('filters', {}))
+        elements = [element for _, element in spec['select']]
+        for element in elements:
+            if element in DERIVED_DIMENSIONS:
+                required.add(DERIVED_DIMENSIONS[element][0])
+            elif element not in ROLLUP_DIMENSIONS and element not in ROLLUP_MEASURES \
+                    and element not in DERIVED_METRICS:
+                return None
+        exact = any(element in NON_ADDITIVE_MEASURES for element in elements)
+
+        with self._lock:
+            available = dict(self.available)
+
+        candidates = []
+        for name, row_count in available.items():
+            grain = set(self.rollups[name])
+            if not required <= grain or (exact and grain != required):
+                continue
+            # Fewer dimensions means fewer rows when the row count is unknown
+            candidates.append((row_count if row_count is not None else float('inf'), len(grain), name))
+
+        return min(candidates)[2] if candidates else None
+
+    def rewrite(self, spec: Optional[Dict[str, Any]]) -> Optional[Tuple[str, List[Any]]]:
+        """Return (SQL, binds) answering an intent spec from a Snowflake rollup, if one fits.
+
+        Filter values are bound as qmark parameters.
+        """
+        if self.backend != 'snowflake':
+            return None
+        name = self.choose(spec)
+        if not name:
+            return None
+
+        columns = [f"{self._expression(element)} AS {alias}" for alias, element in spec['select']]
+        sql = f"SELECT {', '.join(columns)}\nFROM {self.table_name(name)}"
+
+        conditions, binds = [], []
+        for dim, value in spec.get('filters', {}).items():
+            if isinstance(value, tuple):
+                conditions.append(f"{dim} BETWEEN ? AND ?")
+                binds.extend(value)
+            else:
+                conditions.append(f"{dim} = ?")
+                binds.append(value)
+        if conditions:
+            sql += f"\nWHERE {' AND '.join(conditions)}"
+
+        group_by = [self._expression(element) for _, element in spec['select']
+                    if element in ROLLUP_DIMENSIONS or element in DERIVED_DIMENSIONS]
+        if group_by:
+            sql += f"\nGROUP BY {', '.join(group_by)}"
+        if spec.get('order_by'):
+            sql += f"\nORDER BY {spec['order_by']}"
+
+        logger.info(f"Rewrote query to rollup {name}")
+        return sql, binds
+
+    def answer(self, spec: Optional[Dict[str, Any]]) -> Optional[pd.DataFrame]:
+        """Answer an intent spec from a local Parquet rollup, if one fits."""
+        if self.backend != 'parquet':
+            return None
+        name = self.choose(spec)
+        if not name:
+            return None
+        if not self._fresh(name):
+            # Aged since the last refresh
+            logger.info(f"Rollup {name} is older than {self.max_age}s, answering from the warehouse")
+            with self._lock:
+                self.available.pop(name, None)
+            return None
+
+        frame = self._frame(name)
+        for dim, value in spec.get('filters', {}).items():
+            if isinstance(value, tuple):
+                frame = frame[frame[dim].between(value[0], value[1])]
+            else:
+                frame = frame[frame[dim] == value]
+
+        dims = []
+        for _, element in spec['select']:
+            if element in DERIVED_DIMENSIONS:
+                element = DERIVED_DIMENSIONS[element][0]
+            if element in ROLLUP_DIMENSIONS and element not in dims:
+                dims.append(element)
+        aggregations = {measure: reagg for measure, (_, _, reagg) in ROLLUP_MEASURES.items()}
+        if dims:
+            frame = frame.groupby(dims, as_index=False).agg(aggregations)
+        else:
+            frame = frame.agg(aggregations).to_frame().T
+
+        result = pd.DataFrame(index=frame.index)
+        for alias, element in spec['select']:
+            if element == 'month_name':
+                result[alias] = frame['order_month'].map(lambda month: calendar.month_abbr[int(month)])
+            elif element == 'average_order_value':
+                result[alias] = frame['total_revenue'] / frame['order_count'].where(frame['order_count'] != 0)
+            else:
+                result[alias] = frame[element]
+
+        for clause in reversed([part.strip() for part in (spec.get('order_by') or '').split(',') if part.strip()]):
+            column, _, direction = clause.partition(' ')
+            result = result.sort_values(column, ascending=direction.strip().upper() != 'DESC',
+                                        kind='stable')
+
+        # Match the upper-case column names Snowflake returns for unquoted aliases
+        result.columns = [column.upper() for column in result.columns]
+        logger.info(f"Answered query from local rollup {name}")
+        result = result.reset_index(drop=True)
+        result.attrs['rollup'] = name
+        return result
+
+    def _expression(self, element: str) -> str:
+        """Return the rollup-level SQL expression for a spec element."""
+        if element in ROLLUP_DIMENSIONS:
+            return element
+        if element in DERIVED_DIMENSIONS:
+            return DERIVED_DIMENSIONS[element][1]
+        if element in DERIVED_METRICS:
+            return DERIVED_METRICS[element]
+        return ROLLUP_MEASURES[element][1]
+
+    def _fresh(self, name: str) -> bool:
+        """Return whether a Parquet rollup exists and is younger than ``max_age``."""
+        path = self._path(name)
+        return path.exists() and time.time() - path.stat().st_mtime < self.max_age
+
+    def _frame(self, name: str) -> pd.DataFrame:
+        """Load a Parquet rollup, caching it in memory until the file is rebuilt."""
+        mtime = self._path(name).stat().st_mtime
+        with self._lock:
+            cached = self._frames.get(name)
+            if cached is None or cached[0] != mtime:
+                cached = self._frames[name] = (mtime, pd.read_parquet(self._path(name)))
+            return cached[1]
+
+    def _path(self, name: str) -> Path:
+        """Return the Parquet file of a rollup."""
+        return self.directory / f"rollup_{name}.parquet"
+
+    @staticmethod
+    def _base_tables(semantic_model: Dict[str, Any]) -> Dict[str, str]:
+        """Resolve the physical ORDERS, CUSTOMER and NATION tables from the semantic model."""
+        tables = {table['name']: table['base_table'] for table in semantic_model.get('tables', [])}
+        return {
+            'orders': tables.get('sales_data', 'SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.ORDERS'),
+            'customer': tables.get('customer_data', 'SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.CUSTOMER'),
+            'nation': tables.get('nation_data', 'SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.NATION')
+        }
+
+def main():
+    """Build the configured rollups."""
+    from cortex_analyst import CortexAnalyst
+
+    parser = argparse.ArgumentParser(description="Build semantic-model metric rollups")
+    parser.add_argument("--backend", choices=RollupManager.BACKENDS, default=None,
+                        help="Rollup backend (defaults to CORTEX_ROLLUP_BACKEND)")
+    parser.add_argument("--rollup", action="append", dest="rollups",
+                        help="Rollup to build (repeatable, defaults to all)")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Recreate rollups that already exist")
+    args = parser.parse_args()
+
+    if args.backend:
+        os.environ['CORTEX_ROLLUP_BACKEND'] = args.backend
+
+    analyst = CortexAnalyst()
+    if not analyst.connect():
+        print("❌ Connection failed!")
+        sys.exit(1)
+
+    try:
+        with analyst.pool.session(analyst.router.route('heavy')) as session:
+            analyst.rollups.build(session, args.rollups, args.rebuild)
+        print(f"✅ Rollups available: {', '.join(analyst.rollups.available) or 'none'}")
+    finally:
+        analyst.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Semantic Index Module
+
+This module provides an in-memory BM25 index over the elements of a semantic
+model (tables, columns, metrics, dimensions). For a question it selects the
+most relevant elements, adds the tables and join keys on the relationship
+paths between them so joins stay valid, and renders a context that fits a
+token budget instead of the whole model.
+"""
+
+import re
+import math
+import logging
+from collections import Counter, defaultdict, deque
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+from question_normalizer import normalize_text
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+STOPWORDS = {
+    'a', 'an', 'the', 'of', 'by', 'for', 'in', 'on', 'to', 'and', 'or', 'is', 'are',
+    'was', 'were', 'what', 'which', 'who', 'how', 'many', 'much', 'me', 'show', 'give',
+    'list', 'each', 'all', 'with', 'from', 'that', 'this', 'do', 'does', 'have', 'has'
+}
+
+def stem(word: str) -> str:
+    """Reduce simple English plurals to their singular form."""
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+def tokenize(text: str) -> List[str]:
+    """Split text (including snake_case names) into stemmed, stopword-free terms."""
+    words = re.findall(r'[a-z0-9]+', text.lower().replace('_', ' '))
+    return [stem(word) for word in words if word not in STOPWORDS]
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimate the LLM token count of a text (about 4 characters per token)."""
+    return len(text) // 4 + 1
+
+class SemanticIndex:
+    """Class to rank semantic model elements against a question with BM25."""
+
+    def __init__(self, semantic_model: Dict[str, Any], k1: float = 1.5, b: float = 0.75):
+        """Build the index over a loaded semantic model."""
+        self.model = semantic_model or {}
+        self.k1 = k1
+        self.b = b
+
+        self.tables = {table['name']: table for table in self.model.get('tables', [])}
+        self.relationships = self.model.get('relationships', [])
+        self.elements = []
+        self._postings = defaultdict(list)
+        self._lengths = []
+
+        self._index_elements()
+        self._neighbours = self._relationship_graph()
+        self.average_length = sum(self._lengths) / len(self._lengths) if self._lengths else 0.0
+        logger.info(f"Indexed {len(self.elements)} semantic model elements")
+
+    def search(self, question: str, top_k: Optional[int] = None) -> List[Tuple[float, Dict[str, Any]]]:
+        """Return (score, element) pairs for a question, best first."""
+        scores = defaultdict(float)
+        count = len(self.elements)
+        for term in set(tokenize(normalize_text(question))):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for position, frequency in postings:
+                norm = 1 - self.b + self.b * self._lengths[position] / self.average_length
+                scores[position] += idf * frequency * (self.k1 + 1) / (frequency + self.k1 * norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return [(score, self.elements[position]) for position, score in ranked[:top_k]]
+
+    def select(self, question: str, max_tokens: int = 2000, top_k: int = 40,
+               min_ratio: float = 0.25) -> Dict[str, Any]:
+        """Pick the elements relevant to a question that fit within ``max_tokens``.
+
+        Elements scoring below ``min_ratio`` of the best match are dropped.
+        Each picked element brings the tables it needs, the tables on the join
+        paths to the tables already picked, and the join key columns.
+        """
+        selection = {'tables': {}, 'relationships': [], 'metrics': [], 'dimensions': []}
+        used = estimate_tokens(self._header())
+
+        ranked = self.search(question, top_k)
+        for score, element in ranked:
+            if score < min_ratio * ranked[0][0]:
+                break
+            candidate = self._with_element(selection, element)
+            cost = estimate_tokens(self._render(candidate)) - estimate_tokens(self._render(selection))
+            if used + cost > max_tokens:
+                continue
+            selection, used = candidate, used + cost
+
+        return selection
+
+    def context(self, question: str, max_tokens: int = 2000) -> str:
+        """Return the semantic context for a question within a token budget."""
+        return self._header() + self._render(self.select(question, max_tokens))
+
+    def prune(self, question: str, max_tokens: int = 2000) -> Dict[str, Any]:
+        """Return a copy of the semantic model limited to the elements relevant to a question."""
+        selection = self.select(question, max_tokens)
+        tables = []
+        for name, columns in selection['tables'].items():
+            table = dict(self.tables[name])
+            table['columns'] = [column for column in table.get('columns', []) if column['name'] in columns]
+            tables.append(table)
+
+        pruned = {key: value for key, value in self.model.items()
+                  if key not in ('tables', 'relationships', 'metrics', 'dimensions')}
+        pruned.update({
+            'tables': tables,
+            'relationships': selection['relationships'],
+            'metrics': selection['metrics'],
+            'dimensions': selection['dimensions']
+        })
+        return pruned
+
+    def _index_elements(self):
+        """Create one BM25 document per table, column, metric and dimension."""
+        def add(kind: str, element: Dict[str, Any], tables: Set[str], table: Optional[str] = None):
+            # Names count twice: they are the strongest signal
+            text = ' '.join([element['name'], element['name'], element.get('description', ''),
+                             ' '.join(element.get('synonyms', []))])
+            terms = Counter(tokenize(text))
+            position = len(self.elements)
+            self.elements.append({'kind': kind, 'name': element['name'], 'table': table,
+                                  'tables': tables, 'element': element})
+            self._lengths.append(sum(terms.values()))
+            for term, frequency in terms.items():
+                self._postings[term].append((position, frequency))
+
+        column_tables = defaultdict(set)
+        for name, table in self.tables.items():
+            add('table', table, {name})
+            for column in table.get('columns', []):
+                column_tables[column['name']].add(name)
+                add('column', column, {name}, table=name)
+
+        # Metrics and dimensions need the tables of the columns their expressions use
+        for kind in ('metrics', 'dimensions'):
+            for element in self.model.get(kind, []):
+                used = set(re.findall(r'[A-Za-z_]\w*', element.get('expr', '')))
+                tables = {table for column in used for table in column_tables.get(column, ())}
+                add(kind[:-1], element, tables)
+
+    def _relationship_graph(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Return each table's relationships, in both directions."""
+        neighbours = defaultdict(list)
+        for relationship in self.relationships:
+            neighbours[relationship['from_table']].append(relationship)
+            neighbours[relationship['to_table']].append(relationship)
+        return neighbours
+
+    def _join_path(self, start: str, goal: str) -> Optional[List[Dict[str, Any]]]:
+        """Return the relationships on the shortest join path between two tables."""
+        previous = {start: None}
+        queue = deque([start])
+        while queue:
+            table = queue.popleft()
+            if table == goal:
+                path = []
+                while previous[table]:
+                    relationship, table = previous[table]
+                    path.append(relationship)
+                return path
+            for relationship in self._neighbours.get(table, []):
+                other = relationship['to_table'] if relationship['from_table'] == table else relationship['from_table']
+                if other not in previous:
+                    previous[other] = (relationship, table)
+                    queue.append(other)
+        return None
+
+    def _with_element(self, selection: Dict[str, Any], element: Dict[str, Any]) -> Dict[str, Any]:
+        """Return a copy of a selection with an element and its join closure added."""
+        candidate = {
+            'tables': {name: list(columns) for name, columns in selection['tables'].items()},
+            'relationships': list(selection['relationships']),
+            'metrics': list(selection['metrics']),
+            'dimensions': list(selection['dimensions'])
+        }
+
+        for table in element['tables']:
+            self._add_table(candidate, table)
+
+        if element['kind'] == 'column' and element['name'] not in candidate['tables'][element['table']]:
+            candidate['tables'][element['table']].append(element['name'])
+        elif element['kind'] in ('metric', 'dimension'):
+            used = set(re.findall(r'[A-Za-z_]\w*', element['element'].get('expr', '')))
+            for table in element['tables']:
+                for column in self.tables[table].get('columns', []):
+                    if column['name'] in used and column['name'] not in candidate['tables'][table]:
+                        candidate['tables'][table].append(column['name'])
+            bucket = candidate[element['kind'] + 's']
+            if element['element'] not in bucket:
+                bucket.append(element['element'])
+        return candidate
+
+    def _add_table(self, selection: Dict[str, Any], table: str):
+        """Add a table, plus the tables and join keys connecting it to the selection."""
+        if table in selection['tables']:
+            return
+        existing = list(selection['tables'])
+        selection['tables'][table] = []
+        if not existing:
+            return
+
+        paths = [path for path in (self._join_path(table, other) for other in existing) if path is not None]
+        if not paths:
+            return
+        for relationship in min(paths, key=len):
+            if relationship in selection['relationships']:
+                continue
+            selection['relationships'].append(relationship)
+            for side in ('from', 'to'):
+                name = relationship[f'{side}_table']
+                columns = selection['tables'].setdefault(name, [])
+                if relationship[f'{side}_column'] not in columns:
+                    columns.append(relationship[f'{side}_column'])
+
+    def _header(self) -> str:
+        """Return the model name and description lines."""
+        return (f"Semantic Model: {self.model.get('name', 'Unknown')}\n"
+                f"Description: {self.model.get('description', '')}\n\n")
+
+    def _render(self, selection: Dict[str, Any]) -> str:
+        """Render a selection in the same layout as the full semantic context."""
+        context = "Available Tables:\n"
+        for name, selected in selection['tables'].items():
+            table = self.tables[name]
+            context += f"- {name}: {table.get('description', '')}\n"
+            context += f"  Base Table: {table.get('base_table', '')}\n"
+            context += "  Columns:\n"
+            for column in table.get('columns', []):
+                if column['name'] in selected:
+                    context += f"    - {column['name']}: {column.get('description', '')} ({column.get('data_type', '')})\n"
+            context += "\n"
+
+        if selection['relationships']:
+            context += "Relationships:\n"
+            for relationship in selection['relationships']:
+                context += (f"- {relationship['from_table']}.{relationship['from_column']} -> "
+                            f"{relationship['to_table']}.{relationship['to_column']}\n")
+            context += "\n"
+
+        context += "Available Metrics:\n"
+        for metric in selection['metrics']:
+            context += f"- {metric['name']}: {metric.get('description', '')}\n"
+
+        context += "\nAvailable Dimensions:\n"
+        for dimension in selection['dimensions']:
+            context += f"- {dimension['name']}: {dimension.get('description', '')}\n"
+        return context
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Semantic Model Generator Module
+
+This module generates a semantic model YAML file (in the format of
+``semantic_model.yaml``) from a database's INFORMATION_SCHEMA. Tables are
+crawled with a bounded pool of concurrent queries (columns, primary keys and
+imported foreign keys), relationships are taken from declared keys or
+inferred from key-column naming, and re-crawls only touch tables whose
+LAST_ALTERED timestamp changed since the previous run.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import logging
+import yaml
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Callable, Optional
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+IDENTIFIER_PATTERN = re.compile(r'^[A-Za-z_][\w$]*$')
+
+# INFORMATION_SCHEMA data types mapped to the types used in the semantic model
+DATA_TYPES = {
+    'TEXT': 'VARCHAR',
+    'FIXED': 'NUMBER',
+    'REAL': 'FLOAT',
+    'TIMESTAMP_NTZ': 'TIMESTAMP',
+    'TIMESTAMP_LTZ': 'TIMESTAMP',
+    'TIMESTAMP_TZ': 'TIMESTAMP'
+}
+
+# Suffixes that mark a column as a key
+KEY_SUFFIXES = ('KEY', 'ID')
+
+def column_prefix(columns: List[str]) -> str:
+    """Return a prefix shared by every column, e.g. 'O_' for TPCH ORDERS."""
+    prefixes = {name.split('_', 1)[0] + '_' for name in columns if '_' in name}
+    if len(prefixes) == 1 and all('_' in name for name in columns):
+        return prefixes.pop()
+    return ''
+
+def key_name(column: str, prefix: str) -> str:
+    """Return a column name without its table prefix, used to match keys across tables."""
+    return column[len(prefix):] if prefix and column.startswith(prefix) else column
+
+class SemanticModelGenerator:
+    """Class to crawl INFORMATION_SCHEMA and build a semantic model."""
+
+    def __init__(self, run_query: Callable[[str, Optional[List[Any]]], List[Dict[str, Any]]],
+                 database: str, schemas: Optional[List[str]] = None, workers: int = 8):
+        """Initialize the generator.
+
+        ``run_query(sql, params)`` runs one statement and returns its rows as
+        dictionaries with lower-case keys; it is called from up to ``workers``
+        threads at once.
+        """
+        for name in [database] + list(schemas or []):
+            if not IDENTIFIER_PATTERN.match(name):
+                raise ValueError(f"Invalid identifier: {name}")
+
+        self.run_query = run_query
+        self.database = database.upper()
+        self.schemas = [schema.upper() for schema in schemas or []]
+        self.workers = workers
+
+    def crawl(self, previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Crawl the database and return the crawl state (one entry per table).
+
+        Tables whose LAST_ALTERED matches ``previous`` are reused as-is.
+        """
+        previous = previous or {}
+        listed = self._list_tables()
+
+        state, changed = {}, []
+        for row in listed:
+            fqn = f"{self.database}.{row['table_schema']}.{row['table_name']}"
+            last_altered = str(row['last_altered'])
+            if fqn in previous and previous[fqn]['last_altered'] == last_altered:
+                state[fqn] = previous[fqn]
+            else:
+                changed.append((fqn, row))
+
+        removed = set(previous) - {f"{self.database}.{row['table_schema']}.{row['table_name']}" for row in listed}
+        logger.info(f"{len(listed)} tables: {len(changed)} new or changed, "
+                    f"{len(listed) - len(changed)} unchanged, {len(removed)} removed")
+
+        started = time.time()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='crawl') as executor:
+            for (fqn, _), entry in zip(changed, executor.map(lambda item: self._crawl_table(*item), changed)):
+                state[fqn] = entry
+        if changed:
+            logger.info(f"Crawled {len(changed)} tables in {time.time() - started:.1f}s")
+        return state
+
+    def build_model(self, state: Dict[str, Any], name: str, description: str,
+                    keep: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Build the semantic model from a crawl state.
+
+        Metrics and dimensions are not inferred; those of ``keep`` (usually
+        the previously generated file, edited by hand) are carried over.
+        """
+        logical = self._logical_names(state)
+        tables = []
+        for fqn in sorted(state):
+            entry = state[fqn]
+            tables.append({
+                'name': logical[fqn],
+                'description': entry['comment'] or f"{entry['table']} table",
+                'base_table': fqn,
+                'columns': [{
+                    'name': column['name'],
+                    'description': column['comment'] or column['name'].replace('_', ' ').capitalize(),
+                    'data_type': column['data_type'],
+                    'expr': column['column']
+                } for column in entry['columns']]
+            })
+
+        keep = keep or {}
+        return {
+            'name': name,
+            'description': description,
+            'tables': tables,
+            'relationships': self._relationships(state, logical),
+            'metrics': keep.get('metrics', []),
+            'dimensions': keep.get('dimensions', [])
+        }
+
+    def _list_tables(self) -> List[Dict[str, Any]]:
+        """List the tables to crawl with their LAST_ALTERED timestamps."""
+        sql = (f"SELECT TABLE_SCHEMA, TABLE_NAME, COMMENT, LAST_ALTERED "
+               f"FROM {self.database}.INFORMATION_SCHEMA.TABLES "
+               f"WHERE TABLE_SCHEMA <> 'INFORMATION_SCHEMA' AND TABLE_TYPE IN ('BASE TABLE', 'VIEW')")
+        params = None
+        if self.schemas:
+            sql += f" AND TABLE_SCHEMA IN ({', '.join('?' for _ in self.schemas)})"
+            params = list(self.schemas)
+        return self.run_query(sql + " ORDER BY TABLE_SCHEMA, TABLE_NAME", params)
+
+    def _crawl_table(self, fqn: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Fetch the columns, primary key and imported keys of one table."""
+        columns = self.run_query(
+            f"SELECT COLUMN_NAME, DATA_TYPE, COMMENT, ORDINAL_POSITION "
+            f"FROM {self.database}.INFORMATION_SCHEMA.COLUMNS "
+            f"WHERE TABLE_SCHEMA = ? AND TABLE_NAME = ? ORDER BY ORDINAL_POSITION",
+            [row['table_schema'], row['table_name']]
+        )
+        quoted = '.'.join(f'"{part}"' for part in (self.database, row['table_schema'], row['table_name']))
+        primary_key = [key['column_name'] for key in
+                       sorted(self._show_keys(f"SHOW PRIMARY KEYS IN TABLE {quoted}"),
+                              key=lambda key: key['key_sequence'])]
+        foreign_keys = [{
+            'column': key['fk_column_name'],
+            'references': f"{key['pk_database_name']}.{key['pk_schema_name']}.{key['pk_table_name']}",
+            'referenced_column': key['pk_column_name']
+        } for key in self._show_keys(f"SHOW IMPORTED KEYS IN TABLE {quoted}")]
+
+        names = [column['column_name'] for column in columns]
+        prefix = column_prefix(names)
+        return {
+            'last_altered': str(row['last_altered']),
+            'schema': row['table_schema'],
+            'table': row['table_name'],
+            'comment': row.get('comment'),
+            'prefix': prefix,
+            'primary_key': primary_key,
+            'foreign_keys': foreign_keys,
+            'columns': [{
+                'column': column['column_name'],
+                'name': key_name(column['column_name'], prefix).lower(),
+                'data_type': DATA_TYPES.get(column['data_type'], column['data_type']),
+                'comment': column.get('comment'),
+                'ordinal': column['ordinal_position']
+            } for column in columns]
+        }
+
+    def _show_keys(self, sql: str) -> List[Dict[str, Any]]:
+        """Run a SHOW ... KEYS command, treating missing privileges as no keys."""
+        try:
+            return self.run_query(sql, None)
+        except Exception as e:
+            logger.warning(f"{sql} failed: {str(e)}")
+            return []
+
+    def _logical_names(self, state: Dict[str, Any]) -> Dict[str, str]:
+        """Return a logical table name per table, qualified by schema only when ambiguous."""
+        counts = {}
+        for entry in state.values():
+            counts[entry['table']] = counts.get(entry['table'], 0) + 1
+        return {fqn: (entry['table'] if counts[entry['table']] == 1
+                      else f"{entry['schema']}_{entry['table']}").lower()
+                for fqn, entry in state.items()}
+
+    def _relationships(self, state: Dict[str, Any], logical: Dict[str, str]) -> List[Dict[str, Any]]:
+        """Return declared foreign keys plus relationships inferred from key names.
+
+        A table's key is its declared primary key or, failing that, a first
+        column ending in KEY or ID. Another table's column with the same
+        prefix-stripped name is taken to reference it (many-to-one).
+        """
+        relationships, seen = [], set()
+
+        def add(from_fqn, from_column, to_fqn, to_column):
+            if (from_fqn, from_column) in seen or from_fqn == to_fqn:
+                return
+            seen.add((from_fqn, from_column))
+            names = {column['column']: column['name'] for column in state[from_fqn]['columns']}
+            targets = {column['column']: column['name'] for column in state[to_fqn]['columns']}
+            relationships.append({
+                'name': f"{logical[from_fqn]}_to_{logical[to_fqn]}",
+                'from_table': logical[from_fqn],
+                'from_column': names.get(from_column, from_column.lower()),
+                'to_table': logical[to_fqn],
+                'to_column': targets.get(to_column, to_column.lower()),
+                'type': 'many_to_one'
+            })
+
+        # Declared (unenforced) foreign keys first
+        for fqn, entry in state.items():
+            for key in entry['foreign_keys']:
+                if key['references'] in state:
+                    add(fqn, key['column'], key['references'], key['referenced_column'])
+
+        # Single-column keys, by prefix-stripped name
+        keys, hinted = {}, {}
+        for fqn, entry in state.items():
+            key = entry['primary_key']
+            if len(key) == 1:
+                keys.setdefault(key_name(key[0], entry['prefix']), []).append((fqn, key[0]))
+            elif not key and entry['columns'] and entry['columns'][0]['column'].upper().endswith(KEY_SUFFIXES):
+                column = entry['columns'][0]['column']
+                hinted.setdefault(key_name(column, entry['prefix']), []).append((fqn, column))
+
+        # A hinted key shared by several tables (ORDERS.O_ORDERKEY and
+        # LINEITEM.L_ORDERKEY) belongs to the table named after it: exactly
+        # (PART, not PARTSUPP, owns PARTKEY), else by prefix (CUSTOMER owns CUSTKEY)
+        for name, owners in hinted.items():
+            if name in keys:
+                continue
+            stem = re.sub(r'_?(?:KEY|ID)$', '', name.upper())
+            named = [(fqn, column) for fqn, column in owners
+                     if stem and state[fqn]['table'].upper() in (stem, stem + 'S')]
+            if not named:
+                named = [(fqn, column) for fqn, column in owners
+                         if stem and state[fqn]['table'].upper().startswith(stem)]
+            keys[name] = named if len(owners) > 1 and named else owners
+
+        for fqn, entry in sorted(state.items()):
+            for column in entry['columns']:
+                for target_fqn, target_column in keys.get(key_name(column['column'], entry['prefix']), []):
+                    add(fqn, column['column'], target_fqn, target_column)
+
+        return relationships
+
+def main():
+    """Generate a semantic model file from INFORMATION_SCHEMA."""
+    from cortex_analyst import CortexAnalyst
+
+    parser = argparse.ArgumentParser(description="Generate a semantic model from INFORMATION_SCHEMA")
+    parser.add_argument("--database", required=True, help="Database to crawl")
+    parser.add_argument("--schema", action="append", dest="schemas",
+                        help="Schema to crawl (repeatable, defaults to all)")
+    parser.add_argument("--output", default="semantic_model.generated.yaml", help="YAML file to write")
+    parser.add_argument("--name", default=None, help="Semantic model name")
+    parser.add_argument("--workers", type=int, default=int(os.getenv('CORTEX_POOL_SIZE', '8')),
+                        help="Concurrent INFORMATION_SCHEMA queries")
+    parser.add_argument("--full", action="store_true",
+                        help="Re-crawl every table instead of only changed ones")
+    args = parser.parse_args()
+
+    output = Path(args.output)
+    state_path = output.with_suffix(output.suffix + '.state.json')
+    previous = {}
+    if state_path.exists() and not args.full:
+        previous = json.loads(state_path.read_text(encoding='utf-8'))
+    existing = yaml.safe_load(output.read_text(encoding='utf-8')) if output.exists() else None
+
+    analyst = CortexAnalyst()
+    if not analyst.connect():
+        print("❌ Connection failed!")
+        sys.exit(1)
+
+    def run_query(sql: str, params: Optional[List[Any]] = None) -> List[Dict[str, Any]]:
+        with analyst.pool.session(analyst.router.route('preview')) as session:
+            return [{key.lower(): value for key, value in row.as_dict().items()}
+                    for row in session.sql(sql, params=params).collect()]
+
+    try:
+        generator = SemanticModelGenerator(run_query, args.database, args.schemas, workers=args.workers)
+        state = generator.crawl(previous)
+        model = generator.build_model(
+            state,
+            name=args.name or (existing or {}).get('name') or f"{generator.database} Semantic Model",
+            description=(existing or {}).get('description') or
+                        f"Semantic model generated from {generator.database}.INFORMATION_SCHEMA",
+            keep=existing
+        )
+
+        output.write_text(yaml.safe_dump(model, sort_keys=False, allow_unicode=True), encoding='utf-8')
+        state_path.write_text(json.dumps(state, indent=2, default=str), encoding='utf-8')
+        print(f"✅ Wrote {len(model['tables'])} tables and {len(model['relationships'])} "
+              f"relationships to {output}")
+    finally:
+        analyst.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Session Pool Module
+
+This module provides a bounded, fair pool of Snowpark sessions (or connector
+connections) for concurrent use. Sessions are keyed by (warehouse, role), so
+per-user overrides get their own sessions instead of mutating shared state,
+and waiting callers are served strictly in arrival order.
+"""
+
+import os
+import time
+import threading
+import logging
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Optional, Tuple
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class SessionPool:
+    """Class to lend out sessions with bounded concurrency and FIFO queuing."""
+
+    def __init__(self, session_factory: Callable[[Optional[str], Optional[str]], Any],
+                 max_sessions: int = 8, acquire_timeout: float = 60.0):
+        """Initialize the pool.
+
+        ``session_factory(warehouse, role)`` opens a new session; None means
+        the connection default.
+        """
+        if max_sessions < 1:
+            raise ValueError("max_sessions must be at least 1")
+
+        self.session_factory = session_factory
+        self.max_sessions = max_sessions
+        self.acquire_timeout = acquire_timeout
+
+        self._idle = {}
+        self._keys = {}
+        self._size = 0
+        self._in_use = 0
+        self._waiters = deque()
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @classmethod
+    def from_env(cls, session_factory: Callable[[Optional[str], Optional[str]], Any]) -> 'SessionPool':
+        """Create a pool configured from CORTEX_POOL_* environment variables."""
+        return cls(
+            session_factory,
+            max_sessions=int(os.getenv('CORTEX_POOL_SIZE', '8')),
+            acquire_timeout=float(os.getenv('CORTEX_POOL_TIMEOUT', '60'))
+        )
+
+    def acquire(self, warehouse: Optional[str] = None, role: Optional[str] = None,
+                timeout: Optional[float] = None) -> Any:
+        """Borrow a session for (warehouse, role), waiting in line if the pool is full."""
+        key = self._key(warehouse, role)
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        ticket = object()
+        session, victim, create = None, None, False
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Session pool is closed")
+
+            self._waiters.append(ticket)
+            try:
+                while True:
+                    # Only the caller at the head of the line may take capacity
+                    if self._waiters[0] is ticket:
+                        if self._idle.get(key):
+                            session = self._idle[key].pop()
+                            break
+                        if self._size < self.max_sessions:
+                            self._size += 1
+                            create = True
+                            break
+                        victim = self._pop_idle()
+                        if victim is not None:
+                            # Reuse the capacity of an idle session with another key
+                            create = True
+                            break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"Timed out after {timeout:.0f}s waiting for a session")
+                    self._cond.wait(remaining)
+
+                self._in_use += 1
+            finally:
+                self._waiters.remove(ticket)
+                self._cond.notify_all()
+
+        if victim is not None:
+            self._close(victim)
+
+        if create:
+            try:
+                logger.info(f"Opening pooled session (warehouse={warehouse}, role={role})")
+                session = self.session_factory(warehouse, role)
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._in_use -= 1
+                    self._cond.notify_all()
+                raise
+            with self._cond:
+                self._keys[id(session)] = key
+
+        return session
+
+    def release(self, session: Any, discard: bool = False):
+        """Return a borrowed session, or close it if ``discard`` is set."""
+        with self._cond:
+            self._in_use -= 1
+            key = self._keys.get(id(session))
+            if discard or self._closed or key is None:
+                self._keys.pop(id(session), None)
+                self._size -= 1
+                session_to_close = session
+            else:
+                self._idle.setdefault(key, []).append(session)
+                session_to_close = None
+            self._cond.notify_all()
+
+        if session_to_close is not None:
+            self._close(session_to_close)
+
+    @contextmanager
+    def session(self, warehouse: Optional[str] = None, role: Optional[str] = None,
+                timeout: Optional[float] = None):
+        """Borrow a session for the duration of a with-block."""
+        session = self.acquire(warehouse, role, timeout)
+        try:
+            yield session
+        finally:
+            self.release(session)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool size, sessions in use and the queue length."""
+        with self._cond:
+            return {
+                'size': self._size,
+                'in_use': self._in_use,
+                'idle': sum(len(sessions) for sessions in self._idle.values()),
+                'waiting': len(self._waiters),
+                'max_sessions': self.max_sessions
+            }
+
+    def close(self):
+        """Close idle sessions; borrowed sessions are closed when released."""
+        with self._cond:
+            self._closed = True
+            sessions = [session for idle in self._idle.values() for session in idle]
+            self._idle.clear()
+            for session in sessions:
+                self._keys.pop(id(session), None)
+                self._size -= 1
+            self._cond.notify_all()
+
+        for session in sessions:
+            self._close(session)
+
+    def _pop_idle(self) -> Optional[Any]:
+        """Remove and return any idle session; the caller holds the lock."""
+        for key, sessions in self._idle.items():
+            if sessions:
+                session = sessions.pop()
+                self._keys.pop(id(session), None)
+                return session
+        return None
+
+    @staticmethod
+    def _close(session: Any):
+        """Close a session, logging failures."""
+        try:
+            session.close()
+        except Exception as e:
+            logger.warning(f"Failed to close pooled session: {str(e)}")
+
+    @staticmethod
+    def _key(warehouse: Optional[str], role: Optional[str]) -> Tuple[str, str]:
+        """Normalize a (warehouse, role) pair for lookups."""
+        return (warehouse or '').upper(), (role or '').upper()
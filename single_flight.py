@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Single-Flight Module
+
+This module coalesces identical in-flight calls. The first caller for a key
+runs the call; concurrent callers with the same key wait on the same future
+and share its result or exception. Sync and asyncio callers share futures.
+"""
+
+import asyncio
+import threading
+import logging
+from concurrent.futures import Future
+from typing import Dict, Any, Callable, Tuple
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """Class to deduplicate concurrent calls that share a key."""
+
+    def __init__(self):
+        """Initialize an empty set of in-flight calls."""
+        self.calls = 0
+        self.coalesced = 0
+
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Run ``fn`` once per in-flight key and return its result to every caller."""
+        future, leader = self._join(key)
+        if leader:
+            self._run(key, future, fn)
+        return future.result()
+
+    async def do_async(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Async variant of ``do``; ``fn`` may be a plain or a coroutine function.
+
+        Plain functions run in the event loop's default executor.
+        """
+        future, leader = self._join(key)
+        if leader:
+            if asyncio.iscoroutinefunction(fn):
+                try:
+                    future.set_result(await fn())
+                except BaseException as e:
+                    future.set_exception(e)
+                finally:
+                    self._forget(key, future)
+            else:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, self._run, key, future, fn)
+        return await asyncio.wrap_future(future)
+
+    def in_flight(self) -> int:
+        """Return the number of keys currently executing."""
+        with self._lock:
+            return len(self._futures)
+
+    def stats(self) -> Dict[str, int]:
+        """Return call counters."""
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._futures)
+            }
+
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        """Return the future for a key and whether the caller must run it."""
+        with self._lock:
+            self.calls += 1
+            future = self._futures.get(key)
+            if future is not None:
+                self.coalesced += 1
+                logger.info(f"Joining in-flight call {key[:16]}")
+                return future, False
+
+            future = Future()
+            self._futures[key] = future
+            return future, True
+
+    def _run(self, key: str, future: Future, fn: Callable[[], Any]):
+        """Run a call and publish its outcome to every waiter."""
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            self._forget(key, future)
+
+    def _forget(self, key: str, future: Future):
+        """Remove a finished call so later callers start a fresh one."""
+        with self._lock:
+            if self._futures.get(key) is future:
+                del self._futures[key]
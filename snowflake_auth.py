@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Snowflake Authentication Module
+
+This module provides the authentication settings shared by every connect
+path: password, key-pair (JWT), external browser SSO and OAuth. Sessions
+are kept alive with heartbeats, key-pair JWTs for the REST API are cached
+in memory until shortly before they expire, and logins can be started in
+a background thread so the UI renders while they complete.
+"""
+
+import os
+import time
+import base64
+import hashlib
+import threading
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, Callable, Optional
+
+from credential_provider import shared_provider
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+AUTHENTICATORS = ('snowflake', 'snowflake_jwt', 'externalbrowser', 'oauth')
+
+# Parameters each authenticator needs besides account and user
+REQUIRED_PARAMS = {
+    'snowflake': ['password'],
+    'snowflake_jwt': ['private_key'],
+    'externalbrowser': [],
+    'oauth': ['token']
+}
+
+def authenticator() -> str:
+    """Return the configured authenticator (SNOWFLAKE_AUTHENTICATOR)."""
+    name = os.getenv('SNOWFLAKE_AUTHENTICATOR', 'snowflake').lower()
+    if name not in AUTHENTICATORS:
+        raise ValueError(f"Unknown authenticator: {name}")
+    return name
+
+def load_private_key(path: str, passphrase: Optional[str] = None) -> bytes:
+    """Load a PEM private key and return it as unencrypted PKCS#8 DER bytes."""
+    from cryptography.hazmat.primitives import serialization
+
+    with open(os.path.expanduser(path), 'rb') as file:
+        key = serialization.load_pem_private_key(
+            file.read(), password=passphrase.encode('utf-8') if passphrase else None)
+    return key.private_bytes(encoding=serialization.Encoding.DER,
+                             format=serialization.PrivateFormat.PKCS8,
+                             encryption_algorithm=serialization.NoEncryption())
+
+def apply_auth(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Return connection parameters with the configured authentication applied.
+
+    The password is dropped for the other authenticators. Every session
+    sends keep-alive heartbeats so idle pooled sessions do not expire and
+    force a new login.
+    """
+    name = authenticator()
+    params = dict(params)
+    params['client_session_keep_alive'] = True
+    params['client_session_keep_alive_heartbeat_frequency'] = int(
+        os.getenv('SNOWFLAKE_KEEP_ALIVE_SECONDS', '900'))
+    if name == 'snowflake':
+        for key in ('token', 'private_key_path', 'private_key_passphrase'):
+            params.pop(key, None)
+        return params
+
+    params.pop('password', None)
+    # Key settings from the credential provider win over the environment
+    key_path = params.pop('private_key_path', None) or os.getenv('SNOWFLAKE_PRIVATE_KEY_PATH')
+    passphrase = params.pop('private_key_passphrase', None) or os.getenv('SNOWFLAKE_PRIVATE_KEY_PASSPHRASE')
+    params['authenticator'] = name.upper() if name == 'snowflake_jwt' else name
+    if name == 'snowflake_jwt':
+        params['private_key'] = load_private_key(key_path, passphrase) if key_path else None
+    elif name == 'externalbrowser':
+        # Keep the SSO ID token in the OS keychain so restarts skip the browser
+        params['client_store_temporary_credential'] = True
+    elif name == 'oauth':
+        params['token'] = params.get('token') or os.getenv('SNOWFLAKE_OAUTH_TOKEN')
+    return params
+
+def missing_params(params: Dict[str, Any]) -> list:
+    """Return the required connection parameters that are not set."""
+    name = authenticator()
+    return [param for param in ['account', 'user'] + REQUIRED_PARAMS[name] if not params.get(param)]
+
+class TokenCache:
+    """Class to keep key-pair JWTs in process memory until shortly before they expire."""
+
+    def __init__(self, lifetime: int = 3600, renew_before: int = 300):
+        """Initialize the cache; tokens are renewed ``renew_before`` seconds before they expire."""
+        self.lifetime = lifetime
+        self.renew_before = renew_before
+        self._tokens = {}
+        self._lock = threading.Lock()
+
+    def keypair_jwt(self, account: str, user: str, private_key: bytes) -> str:
+        """Return a valid JWT for key-pair authentication, from the cache when possible."""
+        from cryptography.hazmat.primitives import serialization
+
+        key = serialization.load_der_private_key(private_key, password=None)
+        public_key = key.public_key().public_bytes(serialization.Encoding.DER,
+                                                   serialization.PublicFormat.SubjectPublicKeyInfo)
+        fingerprint = 'SHA256:' + base64.b64encode(hashlib.sha256(public_key).digest()).decode('ascii')
+        # Account locator without region or cloud, upper-cased, as Snowflake expects
+        qualified_user = f"{account.split('.')[0].upper()}.{user.upper()}"
+
+        with self._lock:
+            cached = self._tokens.get((qualified_user, fingerprint))
+            if cached and cached['expires_at'] - self.renew_before > time.time():
+                return cached['token']
+
+            import jwt
+            now = int(time.time())
+            token = jwt.encode({'iss': f"{qualified_user}.{fingerprint}", 'sub': qualified_user,
+                                'iat': now, 'exp': now + self.lifetime}, key, algorithm='RS256')
+            self._tokens[(qualified_user, fingerprint)] = {'token': token, 'expires_at': now + self.lifetime}
+            return token
+
+_token_cache = TokenCache()
+
+def rest_auth_header() -> Optional[Callable[[], str]]:
+    """Return a REST Authorization header factory for key-pair auth, if configured.
+
+    The JWT comes from the in-memory cache and is renewed shortly before it expires.
+    """
+    credentials = shared_provider().get()
+    key_path = credentials.get('private_key_path') or os.getenv('SNOWFLAKE_PRIVATE_KEY_PATH')
+    if authenticator() != 'snowflake_jwt' or not key_path:
+        return None
+    private_key = load_private_key(key_path, credentials.get('private_key_passphrase') or
+                                   os.getenv('SNOWFLAKE_PRIVATE_KEY_PASSPHRASE'))
+    account, user = credentials.get('account'), credentials.get('user')
+    return lambda: f"Bearer {_token_cache.keypair_jwt(account, user, private_key)}"
+
+_preauth = ThreadPoolExecutor(max_workers=1, thread_name_prefix='preauth')
+
+def preauthenticate(connect: Callable[[], Any]) -> Future:
+    """Start a login in a background thread and return its future."""
+    started = time.time()
+    future = _preauth.submit(connect)
+    future.add_done_callback(lambda done: logger.info(
+        f"Background authentication finished in {time.time() - started:.1f}s"))
+    return future
@@ -2,12 +2,11 @@
 """
 Snowflake Connection Script for User: rams
 
-This script connects to Snowflake using the provided credentials:
-- Username: rams
-- Password: Sumajavikhyavihaan1981
+This script connects to Snowflake with the credentials of the shared
+credential provider (.env, a credentials file or AWS Secrets Manager, per
+CORTEX_CREDENTIALS_SOURCE). Warehouse and role default to:
 - Warehouse: compute_wh
 - Role: accountadmin
-- Account: ORULGHI-VKC36291
 
 To use this script:
 1. Run the script: python snowflake_connect_rams.py
@@ -17,6 +16,9 @@ To use this script:
 import snowflake.connector
 import logging
 import sys
+from catalog_cache import CatalogCache
+from snowflake_auth import apply_auth
+from credential_provider import shared_provider
 
 # Set up logging
 logging.basicConfig(
@@ -29,14 +31,11 @@ class SnowflakeConnector:
     """Snowflake connection class for user rams."""
     
     def __init__(self, account_identifier=None):
-        """Initialize the connector with credentials."""
-        self.connection_params = {
-            'user': 'rams',
-            'password': 'Sumajavikhyavihaan1981',
+        """Initialize the connector with the shared provider's credentials."""
+        self.connection_params = shared_provider().connection_params({
             'warehouse': 'compute_wh',
-            'role': 'accountadmin',
-            'account': 'ORULGHI-VKC36291'
-        }
+            'role': 'accountadmin'
+        })
         
         # Allow override of account if provided
         if account_identifier:
@@ -44,11 +43,12 @@ class SnowflakeConnector:
         
         self.connection = None
         self.cursor = None
+        self.catalog = CatalogCache.from_env(self.execute_query)
     
     def connect(self):
         """Establish connection to Snowflake."""
         try:
-            if 'account' not in self.connection_params:
+            if not self.connection_params.get('account'):
                 raise ValueError("Account identifier is required. Please provide your Snowflake account identifier.")
             
             logger.info("Connecting to Snowflake...")
@@ -56,7 +56,8 @@ class SnowflakeConnector:
             logger.info(f"Warehouse: {self.connection_params['warehouse']}")
             logger.info(f"Role: {self.connection_params['role']}")
             
-            self.connection = snowflake.connector.connect(**self.connection_params)
+            # Password, key-pair (JWT), SSO or OAuth, per SNOWFLAKE_AUTHENTICATOR
+            self.connection = snowflake.connector.connect(**apply_auth(self.connection_params))
             self.cursor = self.connection.cursor()
             
             logger.info("✅ Successfully connected to Snowflake!")
@@ -143,8 +144,12 @@ class SnowflakeConnector:
             else:
                 print("  Failed to execute query")
     
-    def list_objects(self):
-        """List available databases, warehouses, and other objects."""
+    def list_objects(self, limit=10):
+        """List available databases, warehouses, and other objects.
+        
+        Listings come from the catalog cache; one row beyond ``limit`` is
+        requested to tell whether more objects exist.
+        """
         print("\n" + "="*70)
         print("LISTING AVAILABLE OBJECTS")
         print("="*70)
@@ -152,12 +157,12 @@ class SnowflakeConnector:
         # List databases
         try:
             print("\nDatabases:")
-            result = self.execute_query("SHOW DATABASES")
+            result = self.catalog.databases(limit=limit + 1)
             if result:
-                for i, db in enumerate(result[:10]):  # Show first 10
+                for i, db in enumerate(result[:limit]):
                     print(f"  {i+1}. {db[1]}")  # Database name is typically in column 1
-                if len(result) > 10:
-                    print(f"  ... and {len(result) - 10} more databases")
+                if len(result) > limit:
+                    print("  ... and more databases")
             else:
                 print("  No databases found or insufficient privileges")
         except Exception as e:
@@ -166,12 +171,12 @@ class SnowflakeConnector:
         # List warehouses
         try:
             print("\nWarehouses:")
-            result = self.execute_query("SHOW WAREHOUSES")
+            result = self.catalog.warehouses(limit=limit + 1)
             if result:
-                for i, wh in enumerate(result[:10]):  # Show first 10
+                for i, wh in enumerate(result[:limit]):
                     print(f"  {i+1}. {wh[0]} (State: {wh[1]})")  # Name and state
-                if len(result) > 10:
-                    print(f"  ... and {len(result) - 10} more warehouses")
+                if len(result) > limit:
+                    print("  ... and more warehouses")
             else:
                 print("  No warehouses found or insufficient privileges")
         except Exception as e:
@@ -180,12 +185,12 @@ class SnowflakeConnector:
         # List roles
         try:
             print("\nRoles:")
-            result = self.execute_query("SHOW ROLES")
+            result = self.catalog.roles(limit=limit + 1)
             if result:
-                for i, role in enumerate(result[:10]):  # Show first 10
+                for i, role in enumerate(result[:limit]):
                     print(f"  {i+1}. {role[1]}")  # Role name is typically in column 1
-                if len(result) > 10:
-                    print(f"  ... and {len(result) - 10} more roles")
+                if len(result) > limit:
+                    print("  ... and more roles")
             else:
                 print("  No roles found or insufficient privileges")
         except Exception as e:
@@ -205,12 +210,7 @@ def main():
     print("="*70)
     print("SNOWFLAKE CONNECTION SCRIPT FOR USER: RAMS")
     print("="*70)
-    print("Credentials:")
-    print(f"  Username: rams")
-    print(f"  Password: {'*' * 20}")
-    print(f"  Warehouse: compute_wh")
-    print(f"  Role: accountadmin")
-    print(f"  Account: ORULGHI-VKC36291")
+    print("Credentials: from CORTEX_CREDENTIALS_SOURCE (default: .env / environment)")
     print("="*70)
     
     # Check if account identifier is provided as command line argument to override default
@@ -219,11 +219,14 @@ def main():
         account_identifier = sys.argv[1]
         print(f"Using custom account identifier: {account_identifier}")
     else:
-        print("Using default account identifier: ORULGHI-VKC36291")
+        print("Using the account identifier from the credential provider")
         print("(You can override this by providing an account identifier as a command line argument)")
     
     # Create connector and attempt connection
     connector = SnowflakeConnector(account_identifier)
+    print(f"  Username: {connector.connection_params['user']}")
+    print(f"  Warehouse: {connector.connection_params['warehouse']}")
+    print(f"  Role: {connector.connection_params['role']}")
     
     try:
         if connector.connect():
@@ -252,7 +255,8 @@ def main():
             print("2. Your credentials are valid")
             print("3. Your network can reach Snowflake")
             print("4. The warehouse 'compute_wh' exists and is accessible")
-            print("5. The role 'accountadmin' is assigned to user 'rams'")
+            print(f"5. The role '{connector.connection_params['role']}' is assigned to "
+                  f"user '{connector.connection_params['user']}'")
     
     except KeyboardInterrupt:
         print("\n\n⚠️  Connection interrupted by user")
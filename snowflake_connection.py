@@ -7,7 +7,12 @@ This module provides functionality to connect to Snowflake and execute queries.
 
 import os
 import snowflake.connector
-from dotenv import load_dotenv
+from warehouse_router import WarehouseRouter
+from query_tracker import QueryTracker, result_scan_sql
+from bulk_loader import BulkLoader
+from catalog_cache import CatalogCache
+from snowflake_auth import apply_auth, missing_params
+from credential_provider import shared_provider
 import logging
 
 # Set up logging
@@ -18,52 +23,78 @@ class SnowflakeConnection:
     """Class to handle Snowflake database connections and operations."""
     
     def __init__(self):
-        """Initialize the Snowflake connection with environment variables."""
-        load_dotenv()
-        
-        self.connection_params = {
-            'account': os.getenv('SNOWFLAKE_ACCOUNT'),
-            'user': os.getenv('SNOWFLAKE_USER'),
-            'password': os.getenv('SNOWFLAKE_PASSWORD'),
-            'warehouse': os.getenv('SNOWFLAKE_WAREHOUSE'),
-            'database': os.getenv('SNOWFLAKE_DATABASE'),
-            'schema': os.getenv('SNOWFLAKE_SCHEMA'),
-            'role': os.getenv('SNOWFLAKE_ROLE')
-        }
+        """Initialize the Snowflake connection with the shared credential provider."""
+        self.credentials = shared_provider()
+        self.connection_params = self.credentials.connection_params({
+            # Bind style for execute_query params: qmark (?) or numeric (:1)
+            'paramstyle': os.getenv('SNOWFLAKE_PARAMSTYLE', 'qmark')
+        })
         
         self.connection = None
+        self._connect_params = None
         self.cursor = None
+        self.router = None
+        self.query_tracker = QueryTracker.from_env()
+        self.catalog = CatalogCache.from_env(self.execute_query)
+        self.last_query_id = None
     
     def connect(self):
         """Establish connection to Snowflake."""
         try:
-            # Validate required parameters
-            required_params = ['account', 'user', 'password']
-            missing_params = [param for param in required_params if not self.connection_params.get(param)]
+            # Password, key-pair (JWT), SSO or OAuth, per SNOWFLAKE_AUTHENTICATOR
+            self.connection_params = self.credentials.connection_params(self.connection_params)
+            self._connect_params = apply_auth(self.connection_params)
             
-            if missing_params:
-                raise ValueError(f"Missing required parameters: {', '.join(missing_params)}")
+            # Validate required parameters
+            missing = missing_params(self._connect_params)
+            if missing:
+                raise ValueError(f"Missing required parameters: {', '.join(missing)}")
             
             logger.info("Connecting to Snowflake...")
-            self.connection = snowflake.connector.connect(**self.connection_params)
+            self.connection = snowflake.connector.connect(**self._connect_params)
             self.cursor = self.connection.cursor()
             logger.info("Successfully connected to Snowflake!")
             
+            # Route query classes to warehouses, reusing this connection for the default one
+            self.router = WarehouseRouter.from_env(
+                self._create_connection,
+                self.connection_params['warehouse'],
+                show_warehouses=lambda: self.execute_query("SHOW WAREHOUSES")
+            )
+            self.router.register(self.connection_params['warehouse'], self.connection)
+            
             return True
             
         except Exception as e:
             logger.error(f"Failed to connect to Snowflake: {str(e)}")
             return False
     
-    def execute_query(self, query):
-        """Execute a SQL query and return results."""
+    def _create_connection(self, warehouse):
+        """Open an additional connection bound to a warehouse."""
+        return snowflake.connector.connect(**{**self._connect_params, 'warehouse': warehouse})
+    
+    def execute_query(self, query, params=None, query_class=None):
+        """Execute a SQL query and return results.
+        
+        ``params`` are bound server-side to the query's ``?`` (qmark) or
+        ``:1`` (numeric) placeholders, so one statement text serves every
+        value. If ``query_class`` (preview, aggregate or heavy) is given, the
+        query runs on the connection routed for that class.
+        """
         if not self.cursor:
             logger.error("No active connection. Please connect first.")
             return None
         
         try:
             logger.info(f"Executing query: {query}")
-            self.cursor.execute(query)
+            if query_class:
+                with self.router.session_for_class(query_class).cursor() as cursor:
+                    cursor.execute(query, params)
+                    self._track(query, cursor.sfqid, params)
+                    return cursor.fetchall()
+            
+            self.cursor.execute(query, params)
+            self._track(query, self.cursor.sfqid, params)
             results = self.cursor.fetchall()
             return results
             
@@ -71,6 +102,29 @@ class SnowflakeConnection:
             logger.error(f"Error executing query: {str(e)}")
             return None
     
+    def _track(self, query, query_id, params=None):
+        """Remember the query ID of an executed statement."""
+        self.last_query_id = query_id
+        if query_id:
+            self.query_tracker.record(query, query_id, params=params)
+    
+    def scan_result(self, query_id, select='*', order_by=None, limit=None, offset=None):
+        """Read a follow-up (page, sort, export) from a persisted result with RESULT_SCAN."""
+        return self.execute_query(result_scan_sql(query_id, select, order_by=order_by,
+                                                  limit=limit, offset=offset))
+    
+    def bulk_load(self, data, table, method='auto', on_error='ABORT_STATEMENT'):
+        """Load a DataFrame or local Parquet/CSV files into an existing table.
+        
+        Data is staged as compressed Parquet chunks with parallel PUTs and
+        loaded with one COPY INTO; see ``BulkLoader.load`` for the result.
+        """
+        if not self.connection:
+            logger.error("No active connection. Please connect first.")
+            return None
+        
+        return BulkLoader.from_env(self.connection).load(data, table, method=method, on_error=on_error)
+    
     def get_current_warehouse(self):
         """Get the current warehouse."""
         result = self.execute_query("SELECT CURRENT_WAREHOUSE()")
@@ -86,12 +140,17 @@ class SnowflakeConnection:
         result = self.execute_query("SELECT CURRENT_SCHEMA()")
         return result[0][0] if result else None
     
-    def show_tables(self):
-        """Show all tables in the current schema."""
-        return self.execute_query("SHOW TABLES")
+    def show_tables(self, like=None, starts_with=None, limit=None, refresh=False):
+        """Show tables in the current schema, served from the catalog cache.
+        
+        ``like``, ``starts_with`` and ``limit`` are pushed into SHOW TABLES.
+        """
+        return self.catalog.tables(like=like, starts_with=starts_with, limit=limit, refresh=refresh)
     
     def close(self):
         """Close the Snowflake connection."""
+        if self.router:
+            self.router.close(keep=self.connection)
         if self.cursor:
             self.cursor.close()
         if self.connection:
@@ -11,15 +11,44 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+import os
 import json
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dotenv import load_dotenv
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from cortex_analyst import CortexAnalyst
+from cache_warmer import CacheWarmer
+from result_pager import ResultPager
+from result_exporter import ResultExporter
+from value_stats import ValueStats
+from query_registry import owned_by, current_owner, current_checkpoint
+from snowflake_auth import preauthenticate
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Read .env before the CORTEX_* settings below
+load_dotenv()
+
+# Rows sent to the browser per result page
+PAGE_SIZE = int(os.getenv('CORTEX_PAGE_SIZE', '100'))
+
+# Show a sampled answer while the exact one runs (default for the sidebar toggle)
+APPROXIMATE_FIRST = os.getenv('CORTEX_APPROX_FIRST', 'false').lower() == 'true'
+
+# Roles and warehouses a browser session may switch to (empty: no overrides)
+ALLOWED_ROLES = [role.strip().upper() for role in os.getenv('CORTEX_ALLOWED_ROLES', '').split(',')
+                 if role.strip()]
+ALLOWED_WAREHOUSES = [warehouse.strip().upper()
+                      for warehouse in os.getenv('CORTEX_ALLOWED_WAREHOUSES', '').split(',')
+                      if warehouse.strip()]
+
+# Largest export archive offered as a browser download
+EXPORT_DOWNLOAD_MAX_BYTES = int(float(os.getenv('CORTEX_EXPORT_DOWNLOAD_MAX_MB', '200')) * 1024 * 1024)
+
 # Page configuration
 st.set_page_config(
     page_title="Snowflake Cortex Analyst",
@@ -69,13 +98,54 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 @st.cache_resource
+def get_analyst() -> CortexAnalyst:
+    """Create the Cortex Analyst instance shared by every browser session.
+    
+    Queries run on its bounded session pool, so concurrent users do not
+    share a Snowpark session. The semantic model is usable before it connects.
+    """
+    return CortexAnalyst()
+
+@st.cache_resource
+def start_login():
+    """Connect the shared analyst in a background thread, once per server process."""
+    analyst = get_analyst()
+    
+    def connect() -> bool:
+        if not analyst.connect():
+            return False
+        # Pre-execute popular questions in the background (enabled by launch.py --warm)
+        if os.getenv('CORTEX_WARM_CACHE', 'false').lower() == 'true':
+            CacheWarmer.from_env(analyst).start()
+        return True
+    
+    return preauthenticate(connect)
+
+# Start logging in as soon as the app loads; the page renders meanwhile
+start_login()
+
 def initialize_analyst():
-    """Initialize and cache the Cortex Analyst instance."""
-    analyst = CortexAnalyst()
-    if analyst.connect():
-        return analyst
-    else:
-        return None
+    """Return the connected Cortex Analyst, waiting for the login if needed (None if it failed)."""
+    return get_analyst() if start_login().result() else None
+
+@st.cache_resource
+def get_answer_pool() -> ThreadPoolExecutor:
+    """Create the threads that compute exact answers behind approximate ones."""
+    return ThreadPoolExecutor(max_workers=int(os.getenv('CORTEX_POOL_SIZE', '8')),
+                              thread_name_prefix='exact-answer')
+
+@st.cache_resource
+def get_exporter() -> ResultExporter:
+    """Create the background exporter shared by every browser session."""
+    return ResultExporter.from_env(initialize_analyst())
+
+@st.cache_resource
+def get_value_stats() -> ValueStats:
+    """Load the column value statistics and keep them fresh in the background."""
+    stats = ValueStats.from_env(initialize_analyst())
+    if os.getenv('CORTEX_VALUE_STATS', 'true').lower() == 'true':
+        stats.start()
+    return stats
 
 def create_visualization(data: pd.DataFrame, question: str):
     """Create appropriate visualization based on the data and question."""
@@ -158,26 +228,111 @@ def display_metrics(data: pd.DataFrame):
                         value=f"{value:,.2f}" if isinstance(value, float) else f"{value:,}"
                     )
 
-def main():
-    """Main Streamlit application."""
+@st.cache_data(ttl=600, show_spinner=False)
+def load_table_preview(table_name: str, limit: int = 5) -> pd.DataFrame:
+    """Fetch and cache a table preview so selectbox reruns skip the warehouse."""
+    analyst = initialize_analyst()
+    return analyst.get_table_preview(table_name, limit=limit)
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def load_connection_info() -> dict:
+    """Fetch and cache the current database, schema and warehouse."""
+    analyst = initialize_analyst()
+    return {
+        'database': analyst.session.get_current_database(),
+        'schema': analyst.session.get_current_schema(),
+        'warehouse': analyst.session.get_current_warehouse()
+    }
+
+def use_sample_question(question: str):
+    """Callback that loads a sample question into the question box."""
+    st.session_state.question_input = question
+
+def insert_value():
+    """Callback that appends the picked column value to the question box."""
+    value = st.session_state.pop('value_picker', None)
+    if value:
+        question = st.session_state.get('question_input', '').rstrip()
+        st.session_state.question_input = f"{question} {value}".strip()
+
+def clear_analysis():
+    """Callback that resets the question box and the last analysis result."""
+    st.session_state.question_input = ''
+    st.session_state.pop('last_result', None)
+    reset_result_grid()
+
+def reset_result_grid():
+    """Drop the pager and grid widget state of the previous result."""
+    for key in ('result_pager', 'grid_page', 'grid_sort', 'grid_desc'):
+        st.session_state.pop(key, None)
+
+def query_scope(scope: str):
+    """Own this browser session's queries for a with-block.
     
-    # Header
-    st.markdown('<div class="main-header">❄️ Snowflake Cortex Analyst</div>', 
-                unsafe_allow_html=True)
-    st.markdown('<div class="sub-header">Natural Language Analytics with Semantic Layer</div>', 
-                unsafe_allow_html=True)
+    While a query runs, an empty placeholder is refreshed so Streamlit can
+    deliver a rerun or stop request (edited question, closed tab); the query
+    is then cancelled instead of holding a warehouse slot.
+    """
+    ctx = get_script_run_ctx()
+    heartbeat = st.empty()
+    return owned_by(f"{ctx.session_id if ctx else 'local'}:{scope}", checkpoint=heartbeat.empty)
+
+def run_analysis(analyst: CortexAnalyst, question: str):
+    """Run a question and keep the result, chart and CSV in session state.
     
-    # Initialize analyst
-    with st.spinner("Initializing Cortex Analyst..."):
-        analyst = initialize_analyst()
+    In approximate-first mode the exact query starts first, in the
+    background, and a sampled answer is shown until it finishes.
+    """
+    # Only allowlisted overrides reach the shared service user
+    role = st.session_state.get('role_override')
+    role = role if role in ALLOWED_ROLES else None
+    warehouse = st.session_state.get('warehouse_override')
+    warehouse = warehouse if warehouse in ALLOWED_WAREHOUSES else None
     
-    if not analyst:
-        st.error("❌ Failed to connect to Snowflake. Please check your credentials in the .env file.")
-        st.stop()
+    placeholder = st.empty()
+    with query_scope('question'):
+        if st.session_state.get('approximate_first', APPROXIMATE_FIRST):
+            owner, checkpoint = current_owner.get(), current_checkpoint.get()
+            
+            def ask_exact():
+                # Same owner, so a rerun cancels it; the script thread does the checkpointing
+                with owned_by(owner):
+                    return analyst.ask_question(question, role=role, warehouse=warehouse)
+            
+            exact = get_answer_pool().submit(ask_exact)
+            rate = st.session_state.get('approximate_percent', 'Auto')
+            approximate = analyst.ask_approximate(question, role=role, warehouse=warehouse,
+                                                  percent=None if rate == 'Auto' else rate)
+            if approximate and approximate['success'] and not exact.done():
+                with placeholder.container():
+                    render_approximate(approximate)
+            
+            with st.spinner("🧠 Processing your question..."):
+                while True:
+                    try:
+                        result = exact.result(timeout=0.25)
+                        break
+                    except FutureTimeout:
+                        pass
+                    try:
+                        checkpoint()
+                    except BaseException:
+                        analyst.cancel_queries(owner)
+                        raise
+        else:
+            with st.spinner("🧠 Processing your question..."):
+                result = analyst.ask_question(question, role=role, warehouse=warehouse)
+    placeholder.empty()
     
-    st.success("✅ Connected to Snowflake successfully!")
+    if result['success'] and not result['data'].empty:
+        result['figure'] = create_visualization(result['data'].copy(), question)
+        result['csv'] = result['data'].to_csv(index=False)
     
-    # Sidebar
+    reset_result_grid()
+    st.session_state.last_result = result
+
+def render_sidebar(analyst: CortexAnalyst):
+    """Render the semantic model summary and sample question buttons."""
     with st.sidebar:
         st.header("🔧 Configuration")
         
@@ -197,117 +352,330 @@ def main():
                 for metric in analyst.semantic_model.get('metrics', []):
                     st.write(f"• {metric['name']}")
         
+        # Per-user overrides, applied to this browser session's queries only
+        with st.expander("🔐 Session Overrides", expanded=False):
+            if ALLOWED_ROLES:
+                st.selectbox("Role", [None] + ALLOWED_ROLES, key="role_override",
+                             format_func=lambda role: role or "Connection default")
+            if ALLOWED_WAREHOUSES:
+                st.selectbox("Warehouse", [None] + ALLOWED_WAREHOUSES, key="warehouse_override",
+                             format_func=lambda warehouse: warehouse or "Routed by query type")
+            if not ALLOWED_ROLES and not ALLOWED_WAREHOUSES:
+                st.caption("Set CORTEX_ALLOWED_ROLES or CORTEX_ALLOWED_WAREHOUSES to allow overrides.")
+        
+        # Sampled answer first, replaced by the exact one when it is ready
+        with st.expander("⚡ Approximate First", expanded=False):
+            st.toggle("Show an approximate answer first", key="approximate_first",
+                      value=APPROXIMATE_FIRST)
+            st.select_slider("Sample rate (%)", options=['Auto', 0.1, 1, 10, 50],
+                             key="approximate_percent",
+                             help="Auto picks the rate from the table size (CORTEX_APPROX_RATES)")
+        
         # Sample Questions
         st.header("💡 Sample Questions")
         sample_questions = analyst.get_sample_questions()
         
         for i, question in enumerate(sample_questions[:5]):
-            if st.button(f"📝 {question}", key=f"sample_{i}"):
-                st.session_state.user_question = question
+            st.button(f"📝 {question}", key=f"sample_{i}",
+                      on_click=use_sample_question, args=(question,))
+
+def get_result_pager(analyst: CortexAnalyst, query_id: str, columns: list,
+                     order_by: str) -> ResultPager:
+    """Return this browser session's pager for a persisted result and sort order."""
+    pager = st.session_state.get('result_pager')
+    if pager is None or pager.query_id != query_id:
+        pager = ResultPager(analyst.scan_result, analyst.persist_scan, query_id, columns,
+                            page_size=PAGE_SIZE)
+    pager = pager.sorted_by(order_by)
+    st.session_state.result_pager = pager
+    return pager
+
+def render_result_grid(analyst: CortexAnalyst, result: dict):
+    """Render one page of a result at a time.
     
-    # Main content area
-    col1, col2 = st.columns([2, 1])
+    Truncated results are paged server-side from the persisted result with
+    RESULT_SCAN; smaller ones are paged from memory. Either way only
+    ``PAGE_SIZE`` rows are sent to the browser per rerun.
+    """
+    data = result['data']
+    paged = result.get('truncated') and result.get('query_id')
+    if not paged and len(data) <= PAGE_SIZE:
+        st.dataframe(data, use_container_width=True)
+        return
     
-    with col1:
-        st.header("🤖 Ask Your Question")
+    col_sort, col_desc, col_page = st.columns([2, 1, 1])
+    with col_sort:
+        sort_column = st.selectbox("Sort by", ["(none)"] + list(data.columns), key="grid_sort")
+    with col_desc:
+        descending = st.toggle("Descending", key="grid_desc")
+    sort_column = None if sort_column == "(none)" else sort_column
+    
+    if paged:
+        order_by = f'"{sort_column}" {"DESC" if descending else "ASC"}' if sort_column else None
+        pager = get_result_pager(analyst, result['query_id'], list(data.columns), order_by)
+        total_rows = pager.total_rows()
+    else:
+        total_rows = len(data)
+    page_count = max(1, -(-total_rows // PAGE_SIZE))
+    
+    with col_page:
+        page = st.number_input("Page", min_value=1, max_value=page_count, step=1, key="grid_page")
+    
+    if paged:
+        page_data = pager.page(page - 1)
+    else:
+        if sort_column:
+            data = data.sort_values(sort_column, ascending=not descending)
+        page_data = data.iloc[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+    
+    st.dataframe(page_data, use_container_width=True, hide_index=True)
+    first_row = (page - 1) * PAGE_SIZE + 1
+    st.caption(f"Rows {first_row:,}–{first_row + len(page_data) - 1:,} of {total_rows:,} "
+               f"(page {page} of {page_count})")
+
+def render_approximate(result: dict):
+    """Render a sampled answer with its error bounds until the exact one replaces it."""
+    approximate = result['approximate']
+    if approximate['method']:
+        st.warning(f"🟡 Approximate: {approximate['percent']:g}% {approximate['method'].lower()} "
+                   f"sample of {approximate['table']}, ± columns are 95% bounds. "
+                   f"Exact result loading...")
+    else:
+        st.warning("🟡 Approximate: distinct counts and percentiles estimated with sketches. "
+                   "Exact result loading...")
+    
+    data = result['data']
+    st.dataframe(data, use_container_width=True)
+    # Snowflake returns unquoted aliases upper-cased
+    error_columns = {error.lower() for error in approximate['errors'].values()}
+    figure = create_visualization(data[[column for column in data.columns
+                                        if column.lower() not in error_columns]].copy(),
+                                  result['question'])
+    if figure:
+        st.plotly_chart(figure, use_container_width=True)
+
+def render_result(analyst: CortexAnalyst, result: dict):
+    """Render a stored analysis result."""
+    if not result['success']:
+        st.markdown(f'<div class="error-message">❌ Error: {result["error"]}</div>', 
+                   unsafe_allow_html=True)
+        return
+    
+    st.markdown('<div class="success-message">✅ Analysis completed successfully!</div>',
+               unsafe_allow_html=True)
+
+    # Surface cost guard rewrites so users know the result is partial
+    guard = result.get('guard') or {}
+    if guard.get('action') == 'limit':
+        st.info(f"ℹ️ Result limited by the cost guard ({guard['reason']}).")
+    elif guard.get('action') == 'sample':
+        st.info(f"ℹ️ Result computed on a sample by the cost guard ({guard['reason']}).")
+    elif guard.get('action') == 'route':
+        st.info(f"ℹ️ Query routed to warehouse {guard['warehouse']} ({guard['reason']}).")
+
+    # Cortex Analyst's restatement of the question, when the API generated the SQL
+    if result.get('interpretation'):
+        st.caption(f"🤖 {result['interpretation']}")
+    
+    # Display generated SQL
+    with st.expander("🔍 Generated SQL Query", expanded=False):
+        if result.get('sql'):
+            st.code(result['sql'], language='sql')
+        elif result.get('source') == 'rollup':
+            st.caption(f"Answered from the local rollup `{result.get('rollup')}` without a query.")
+        if result.get('params'):
+            st.caption(f"Bind parameters: {result['params']}")
+    
+    if result['data'].empty:
+        st.warning("⚠️ No data returned from the query.")
+        return
+    
+    # Display metrics
+    st.subheader("📊 Key Metrics")
+    display_metrics(result['data'])
+    
+    # Metrics, chart and CSV cover the rows held in memory; the grid pages the rest
+    if result.get('truncated'):
+        st.info(f"ℹ️ Large result: metrics, chart and download cover the first "
+                f"{len(result['data']):,} rows; the table below pages through all rows.")
+    
+    # Display data table
+    st.subheader("📋 Results")
+    render_result_grid(analyst, result)
+    
+    # Display visualization
+    if result.get('figure'):
+        st.subheader("📈 Visualization")
+        st.plotly_chart(result['figure'], use_container_width=True)
+    
+    # Download option
+    st.download_button(
+        label="📥 Download Results as CSV",
+        data=result['csv'],
+        file_name=f"analysis_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+        mime="text/csv"
+    )
+    
+    # Large results are unloaded by the warehouse instead of going through pandas
+    if result.get('query_id'):
+        render_export(result)
+
+@st.fragment(run_every=2)
+def export_progress(job):
+    """Poll a running export; reruns the app once the job finishes."""
+    if job.done:
+        st.rerun()
+    
+    progress = job.progress()
+    st.progress(progress['fraction'],
+                text=f"⏳ {progress['phase'].title()}: {progress['files_done']}/{progress['files_total']} files, "
+                     f"{progress['bytes_done'] / 1024 / 1024:,.1f}/{progress['bytes_total'] / 1024 / 1024:,.1f} MB")
+
+def render_export(result: dict):
+    """Offer a stage-based export of the full persisted result."""
+    with st.expander("📦 Export Full Result", expanded=False):
+        col_format, col_archive = st.columns(2)
+        with col_format:
+            file_format = st.selectbox("Format", ["parquet", "csv"], key="export_format")
+        with col_archive:
+            archive = st.checkbox("Bundle into one .zip", key="export_archive")
         
-        # Question input
-        user_question = st.text_area(
-            "Enter your question in natural language:",
-            value=st.session_state.get('user_question', ''),
-            height=100,
-            placeholder="e.g., What is the total revenue by year?"
-        )
+        if st.button("Start Export", key="export_start"):
+            st.session_state.export_job = get_exporter().start(result['query_id'], file_format, archive)
         
-        # Clear the session state after using it
-        if 'user_question' in st.session_state:
-            del st.session_state.user_question
+        job = st.session_state.get('export_job')
+        if not job or job.query_id != result['query_id']:
+            return
+        if not job.done:
+            export_progress(job)
+            return
         
-        col_btn1, col_btn2 = st.columns([1, 1])
-        with col_btn1:
-            analyze_btn = st.button("🔍 Analyze", type="primary")
-        with col_btn2:
-            clear_btn = st.button("🗑️ Clear")
+        progress = job.progress()
+        if progress['error']:
+            st.error(f"❌ Export failed: {progress['error']}")
+            return
         
-        if clear_btn:
-            st.rerun()
+        location = progress['archive_path'] or str(get_exporter().export_dir / job.job_id)
+        st.success(f"✅ Exported {progress['rows']:,} rows in {progress['files_total']} files "
+                   f"({progress['elapsed']:.0f}s) to `{location}`")
+        if progress['archive_path'] and os.path.getsize(progress['archive_path']) <= EXPORT_DOWNLOAD_MAX_BYTES:
+            with open(progress['archive_path'], 'rb') as archive_file:
+                st.download_button("📥 Download Archive", data=archive_file,
+                                   file_name=os.path.basename(progress['archive_path']),
+                                   mime="application/zip")
+
+@st.fragment
+def question_panel(analyst: CortexAnalyst):
+    """Question input and results; reruns on its own when its widgets change."""
+    st.header("🤖 Ask Your Question")
+    
+    # Question input
+    user_question = st.text_area(
+        "Enter your question in natural language:",
+        key="question_input",
+        height=100,
+        placeholder="e.g., What is the total revenue by year?"
+    )
+    
+    # Completions and range hints come from the local value index, not the warehouse
+    stats = get_value_stats()
+    suggestions = stats.suggest(user_question, limit=4) if user_question else []
+    if suggestions:
+        for column, suggestion in zip(st.columns(len(suggestions)), suggestions):
+            with column:
+                st.button(f"➕ {suggestion['value']}", key=f"suggest_{suggestion['value']}",
+                          help=suggestion['column'], on_click=use_sample_question,
+                          args=(suggestion['text'],))
+    for hint in stats.hints(user_question or ''):
+        st.caption(f"💡 {hint}")
+    values = stats.values()
+    if values:
+        # Filtered in the browser as the user types
+        st.selectbox("Insert a value:", values, index=None, key="value_picker",
+                     placeholder="Type to search market segments, priorities, nations...",
+                     on_change=insert_value)
+    
+    col_btn1, col_btn2 = st.columns([1, 1])
+    with col_btn1:
+        analyze_btn = st.button("🔍 Analyze", type="primary")
+    with col_btn2:
+        st.button("🗑️ Clear", on_click=clear_analysis)
+    
+    if analyze_btn and user_question:
+        run_analysis(analyst, user_question)
+    
+    if 'last_result' in st.session_state:
+        render_result(analyst, st.session_state.last_result)
+
+@st.fragment
+def data_explorer_panel(analyst: CortexAnalyst):
+    """Table preview and connection info; reruns on its own on selectbox changes."""
+    st.header("📊 Data Explorer")
+    
+    # Table preview
+    if analyst.semantic_model:
+        table_names = [table['name'] for table in analyst.semantic_model.get('tables', [])]
+        selected_table = st.selectbox("Select a table to preview:", table_names,
+                                      key="preview_table")
         
-        if analyze_btn and user_question:
-            with st.spinner("🧠 Processing your question..."):
-                result = analyst.ask_question(user_question)
+        if selected_table:
+            with st.spinner(f"Loading preview for {selected_table}..."):
+                try:
+                    preview_data = load_table_preview(selected_table, limit=5)
+                    if not preview_data.empty:
+                        st.subheader(f"Preview: {selected_table}")
+                        st.dataframe(preview_data, use_container_width=True)
+                    else:
+                        st.warning("No data available for preview.")
+                except Exception as e:
+                    st.error(f"Error loading preview: {str(e)}")
+    
+    # Connection info
+    st.header("🔗 Connection Info")
+    if analyst.session:
+        try:
+            info = load_connection_info()
             
-            if result['success']:
-                st.markdown('<div class="success-message">✅ Analysis completed successfully!</div>', 
-                           unsafe_allow_html=True)
-                
-                # Display generated SQL
-                with st.expander("🔍 Generated SQL Query", expanded=False):
-                    st.code(result['sql'], language='sql')
-                
-                # Display metrics
-                if not result['data'].empty:
-                    st.subheader("📊 Key Metrics")
-                    display_metrics(result['data'])
-                    
-                    # Display data table
-                    st.subheader("📋 Results")
-                    st.dataframe(result['data'], use_container_width=True)
-                    
-                    # Create visualization
-                    fig = create_visualization(result['data'], user_question)
-                    if fig:
-                        st.subheader("📈 Visualization")
-                        st.plotly_chart(fig, use_container_width=True)
-                    
-                    # Download option
-                    csv = result['data'].to_csv(index=False)
-                    st.download_button(
-                        label="📥 Download Results as CSV",
-                        data=csv,
-                        file_name=f"analysis_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                        mime="text/csv"
-                    )
-                else:
-                    st.warning("⚠️ No data returned from the query.")
-            else:
-                st.markdown(f'<div class="error-message">❌ Error: {result["error"]}</div>', 
-                           unsafe_allow_html=True)
+            st.info(f"""
+            **Database:** {info['database']}  
+            **Schema:** {info['schema']}  
+            **Warehouse:** {info['warehouse']}
+            """)
+        except:
+            st.info("Connection details not available")
+
+def main():
+    """Main Streamlit application."""
+    
+    # Header
+    st.markdown('<div class="main-header">❄️ Snowflake Cortex Analyst</div>', 
+                unsafe_allow_html=True)
+    st.markdown('<div class="sub-header">Natural Language Analytics with Semantic Layer</div>', 
+                unsafe_allow_html=True)
+    
+    # The sidebar only needs the semantic model, so it renders while the login completes
+    render_sidebar(get_analyst())
+    
+    # Initialize analyst
+    if not start_login().done():
+        with st.spinner("🔐 Signing in to Snowflake..."):
+            start_login().result()
+    analyst = initialize_analyst()
+    
+    if not analyst:
+        st.error("❌ Failed to connect to Snowflake. Please check your credentials in the .env file.")
+        st.stop()
+    
+    st.success("✅ Connected to Snowflake successfully!")
+    
+    # Main content area; each panel is a fragment so its widgets only rerun itself
+    col1, col2 = st.columns([2, 1])
+    
+    with col1:
+        question_panel(analyst)
     
     with col2:
-        st.header("📊 Data Explorer")
-        
-        # Table preview
-        if analyst.semantic_model:
-            table_names = [table['name'] for table in analyst.semantic_model.get('tables', [])]
-            selected_table = st.selectbox("Select a table to preview:", table_names)
-            
-            if selected_table:
-                with st.spinner(f"Loading preview for {selected_table}..."):
-                    try:
-                        preview_data = analyst.get_table_preview(selected_table, limit=5)
-                        if not preview_data.empty:
-                            st.subheader(f"Preview: {selected_table}")
-                            st.dataframe(preview_data, use_container_width=True)
-                        else:
-                            st.warning("No data available for preview.")
-                    except Exception as e:
-                        st.error(f"Error loading preview: {str(e)}")
-        
-        # Connection info
-        st.header("🔗 Connection Info")
-        if analyst.session:
-            try:
-                current_db = analyst.session.get_current_database()
-                current_schema = analyst.session.get_current_schema()
-                current_warehouse = analyst.session.get_current_warehouse()
-                
-                st.info(f"""
-                **Database:** {current_db}  
-                **Schema:** {current_schema}  
-                **Warehouse:** {current_warehouse}
-                """)
-            except:
-                st.info("Connection details not available")
+        data_explorer_panel(analyst)
     
     # Footer
     st.markdown("---")
@@ -0,0 +1,146 @@
+"""Tests for authentication and statement checks of api_server."""
+
+import json
+import asyncio
+
+import pytest
+
+from api_server import ApiServer, is_loopback
+from query_guard import QueryGuard
+
+LOCAL = ('127.0.0.1', 50000)
+REMOTE = ('10.1.2.3', 50000)
+
+
+class FakeFrame:
+    """Just enough of a pandas batch for the NDJSON encoder."""
+
+    empty = False
+
+    def to_json(self, **kwargs):
+        return '{"ONE": 1}'
+
+
+class FakeAnalyst:
+    """Records the calls the server makes; EXPLAIN fails for statements containing FAIL."""
+
+    session = True
+
+    def __init__(self):
+        self.calls = []
+        self.guard = QueryGuard(max_bytes=float('inf'))
+
+    def ask_question(self, question, role=None, warehouse=None):
+        self.calls.append(('ask', question, role, warehouse))
+        return {'success': True, 'question': question, 'sql': 'SELECT 1', 'data': None}
+
+    def guard_query(self, sql, binds=None, role=None):
+        self.calls.append(('guard', sql, role))
+        return self.guard.check(sql, self.explain)
+
+    def explain(self, sql):
+        if 'FAIL' in sql:
+            raise RuntimeError('SQL compilation error')
+        return json.dumps({'GlobalStats': {'bytesAssigned': 0}})
+
+    def stream_query(self, sql, warehouse=None, query_class=None, role=None, params=None, timeout=None):
+        self.calls.append(('stream', sql, role, warehouse))
+        yield FakeFrame()
+
+    def last_query_id(self, sql, role=None, params=None):
+        return 'query-1'
+
+    def cancel_queries(self, owner):
+        return 0
+
+
+def request(app, method, path, body=None, key=None, client=LOCAL):
+    """Send one request to the ASGI app; return (status, body bytes)."""
+    headers = [(b'authorization', f"Bearer {key}".encode())] if key else []
+    scope = {'type': 'http', 'method': method, 'path': path, 'headers': headers,
+             'query_string': b'', 'client': client}
+    messages = [{'type': 'http.request', 'body': json.dumps(body).encode() if body else b'',
+                 'more_body': False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return sent[0]['status'], b''.join(message.get('body', b'') for message in sent[1:])
+
+
+@pytest.fixture
+def analyst():
+    return FakeAnalyst()
+
+
+@pytest.fixture
+def keyed(analyst):
+    return ApiServer(analyst, api_keys={'reporting': 'secret'}, roles={'reporting': 'REPORTER'},
+                     threads=2, connect=False)
+
+
+def test_without_keys_only_loopback_clients(analyst):
+    app = ApiServer(analyst, threads=2, connect=False)
+    assert request(app, 'GET', '/health')[0] == 200
+    assert request(app, 'GET', '/health', client=REMOTE)[0] == 401
+
+
+def test_missing_or_wrong_key_is_rejected(keyed):
+    assert request(keyed, 'GET', '/health')[0] == 401
+    assert request(keyed, 'GET', '/health', key='guess')[0] == 401
+    assert request(keyed, 'GET', '/health', key='secret', client=REMOTE)[0] == 200
+
+
+def test_every_key_needs_a_role(analyst):
+    with pytest.raises(ValueError):
+        ApiServer(analyst, api_keys={'reporting': 'secret'}, connect=False)
+
+
+def test_role_and_warehouse_come_from_the_server(keyed, analyst):
+    status, _ = request(keyed, 'POST', '/ask', key='secret',
+                        body={'question': 'Revenue by year', 'role': 'ACCOUNTADMIN', 'warehouse': 'BIG_WH'})
+    assert status == 200
+    assert analyst.calls == [('ask', 'Revenue by year', 'REPORTER', None)]
+
+    status, body = request(keyed, 'POST', '/execute', key='secret',
+                           body={'sql': 'SELECT 1 AS one;', 'role': 'ACCOUNTADMIN', 'warehouse': 'BIG_WH'})
+    assert status == 200 and json.loads(body) == {'ONE': 1}
+    assert ('stream', 'SELECT 1 AS one', 'REPORTER', None) in analyst.calls
+
+
+@pytest.mark.parametrize('sql', [
+    'DROP TABLE orders',
+    'SELECT 1; DROP TABLE orders',
+    'CREATE TABLE copy AS SELECT * FROM orders',
+    'WITH gone AS (DELETE FROM orders) SELECT 1',
+    "SELECT SYSTEM$CANCEL_QUERY('01b2')",
+    'CALL cleanup()'
+])
+def test_execute_rejects_other_than_one_read_only_statement(keyed, analyst, sql):
+    status, body = request(keyed, 'POST', '/execute', key='secret', body={'sql': sql})
+    assert status == 400, body
+    assert analyst.calls == []
+
+
+def test_execute_allows_keywords_inside_literals(keyed):
+    status, _ = request(keyed, 'POST', '/execute', key='secret',
+                        body={'sql': "SELECT 'drop; table' AS note, \"UPDATE\" FROM t -- delete"})
+    assert status == 200
+
+
+def test_execute_rejects_statement_whose_explain_fails(keyed, analyst):
+    status, body = request(keyed, 'POST', '/execute', key='secret', body={'sql': 'SELECT FAIL FROM orders'})
+    assert status == 422 and b'EXPLAIN failed' in body
+    assert not any(call[0] == 'stream' for call in analyst.calls)
+
+
+def test_is_loopback():
+    assert is_loopback('127.0.0.1') and is_loopback('::1') and is_loopback('localhost')
+    assert not is_loopback('0.0.0.0') and not is_loopback('10.1.2.3') and not is_loopback(None)
@@ -0,0 +1,88 @@
+"""Tests for the approximate rewrites of approximate_query."""
+
+import pytest
+
+from approximate_query import ApproximateQuery
+
+ORDERS = 'SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.ORDERS'
+CUSTOMER = 'SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.CUSTOMER'
+NATION = 'SNOWFLAKE_SAMPLE_DATA.TPCH_SF1.NATION'
+
+# Intent queries of cortex_analyst.INTENT_SQL as bind_template() emits them
+TOP_CUSTOMERS = f"""
+    SELECT c.C_NAME as customer_name, SUM(o.O_TOTALPRICE) as total_order_value,
+        COUNT(o.O_ORDERKEY) as order_count
+    FROM {ORDERS} o JOIN {CUSTOMER} c ON o.O_CUSTKEY = c.C_CUSTKEY
+    GROUP BY c.C_NAME ORDER BY total_order_value DESC LIMIT ?
+"""
+CUSTOMERS_BY_NATION = f"""
+    SELECT n.N_NAME as nation_name, COUNT(DISTINCT c.C_CUSTKEY) as customer_count,
+        SUM(c.C_ACCTBAL) as total_account_balance
+    FROM {CUSTOMER} c JOIN {NATION} n ON c.C_NATIONKEY = n.N_NATIONKEY
+    GROUP BY n.N_NAME ORDER BY customer_count DESC
+"""
+REVENUE_BY_YEAR = f"""
+    SELECT YEAR(o.O_ORDERDATE) as order_year, SUM(o.O_TOTALPRICE) as total_revenue
+    FROM {ORDERS} o GROUP BY YEAR(o.O_ORDERDATE) ORDER BY order_year
+"""
+
+
+@pytest.fixture
+def approximator():
+    # Every table is large enough for a 0.1% sample
+    return ApproximateQuery(lambda table: 10 ** 10)
+
+
+def test_scales_sum_and_count(approximator):
+    plan = approximator.rewrite(f"SELECT SUM(O_TOTALPRICE) AS revenue, COUNT(O_ORDERKEY) AS orders "
+                                f"FROM {ORDERS} o GROUP BY 1")
+    assert plan['percent'] == 0.1
+    assert f"FROM {ORDERS} o SAMPLE SYSTEM (0.1)" in plan['sql']
+    assert 'SUM(O_TOTALPRICE) * 1000 AS revenue' in plan['sql']
+    assert 'ROUND(COUNT(O_ORDERKEY) * 1000) AS orders' in plan['sql']
+    assert plan['errors'] == {'revenue': 'revenue_error', 'orders': 'orders_error'}
+
+
+def test_scales_sum_with_nested_parentheses(approximator):
+    plan = approximator.rewrite("SELECT SUM(l_extendedprice * (1 - l_discount)) AS rev FROM lineitem")
+    assert 'SUM(l_extendedprice * (1 - l_discount)) * 1000 AS rev' in plan['sql']
+    assert 'SUM((l_extendedprice * (1 - l_discount)) * (l_extendedprice * (1 - l_discount)))' in plan['sql']
+    assert plan['errors'] == {'rev': 'rev_error'}
+
+
+def test_unscaled_aggregate_is_not_sampled(approximator):
+    # SUM inside another function cannot be scaled by the rewrite
+    assert approximator.rewrite("SELECT ROUND(SUM(o_totalprice), 2) AS revenue FROM orders") is None
+
+
+def test_subquery_is_not_sampled(approximator):
+    assert approximator.rewrite(
+        "SELECT COUNT(*) AS segments FROM (SELECT o_orderpriority FROM orders GROUP BY 1)") is None
+    assert approximator.rewrite(
+        "WITH recent AS (SELECT * FROM orders WHERE o_orderdate > '1998-01-01') "
+        "SELECT SUM(o_totalprice) AS revenue FROM recent") is None
+
+
+def test_aggregate_in_subquery_is_not_sampled(approximator):
+    assert approximator.rewrite(
+        "SELECT SUM(o_totalprice) AS revenue FROM orders "
+        "WHERE o_custkey IN (SELECT COUNT(c_custkey) AS n FROM customer)") is None
+
+
+def test_top_n_is_not_sampled(approximator):
+    assert approximator.rewrite(TOP_CUSTOMERS) is None
+    for limit in ('LIMIT 10', 'LIMIT :n', 'FETCH FIRST ? ROWS ONLY'):
+        assert approximator.rewrite(
+            f"SELECT o_custkey, SUM(o_totalprice) AS revenue FROM orders GROUP BY 1 "
+            f"ORDER BY 2 DESC {limit}") is None
+
+
+def test_distinct_count_uses_sketch_on_all_rows(approximator):
+    plan = approximator.rewrite(CUSTOMERS_BY_NATION)
+    assert plan['method'] is None and plan['percent'] == 100.0
+    assert 'APPROX_COUNT_DISTINCT(c.C_CUSTKEY)' in plan['sql']
+    assert 'SAMPLE SYSTEM' not in plan['sql']
+
+
+def test_small_table_is_exact():
+    assert ApproximateQuery(lambda table: 1000).rewrite(REVENUE_BY_YEAR) is None
@@ -0,0 +1,43 @@
+"""Tests for the oversize decisions of query_guard."""
+
+import pytest
+
+from query_guard import QueryGuard, GB
+
+
+def estimate(aggregated):
+    return {'bytes_assigned': 5 * GB, 'partitions_assigned': 100,
+            'tables': {'ORDERS': 5 * GB}, 'aggregated': aggregated}
+
+
+@pytest.mark.parametrize('action', ['auto', 'limit', 'sample'])
+def test_oversize_sum_is_rejected_without_large_warehouse(action):
+    guard = QueryGuard(max_bytes=GB, oversize_action=action)
+    decision = guard.decide("SELECT SUM(O_TOTALPRICE) AS revenue FROM ORDERS", estimate(True))
+    assert decision['action'] == 'reject' and decision['sql'] is None
+
+
+def test_oversize_sum_is_routed_to_large_warehouse():
+    guard = QueryGuard(max_bytes=GB, oversize_action='limit', large_warehouse='BATCH_WH')
+    decision = guard.decide("SELECT COUNT(O_ORDERKEY) AS orders FROM ORDERS", estimate(True))
+    assert decision['action'] == 'route' and decision['warehouse'] == 'BATCH_WH'
+
+
+def test_oversize_average_is_sampled():
+    guard = QueryGuard(max_bytes=GB)
+    decision = guard.decide("SELECT AVG(O_TOTALPRICE) AS aov FROM ORDERS", estimate(True))
+    assert decision['action'] == 'sample'
+    assert 'FROM ORDERS SAMPLE SYSTEM (10)' in decision['sql']
+
+
+def test_oversize_plain_scan_is_limited():
+    guard = QueryGuard(max_bytes=GB, row_limit=500)
+    decision = guard.decide("SELECT * FROM ORDERS -- all orders", estimate(False))
+    assert decision['action'] == 'limit'
+    assert decision['sql'].endswith('\n) LIMIT 500')
+
+
+def test_failed_explain_rejects():
+    def explain(sql):
+        raise RuntimeError('SQL compilation error')
+    assert QueryGuard().check("SELECT 1", explain)['action'] == 'reject'
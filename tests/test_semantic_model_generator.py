@@ -0,0 +1,52 @@
+"""Tests for relationship inference in semantic_model_generator."""
+
+from semantic_model_generator import SemanticModelGenerator
+
+# TPCH tables without declared keys: each table's key is its first column
+TPCH = {
+    'REGION': ['R_REGIONKEY', 'R_NAME', 'R_COMMENT'],
+    'NATION': ['N_NATIONKEY', 'N_NAME', 'N_REGIONKEY', 'N_COMMENT'],
+    'PART': ['P_PARTKEY', 'P_NAME', 'P_RETAILPRICE'],
+    'SUPPLIER': ['S_SUPPKEY', 'S_NAME', 'S_NATIONKEY'],
+    'PARTSUPP': ['PS_PARTKEY', 'PS_SUPPKEY', 'PS_AVAILQTY'],
+    'CUSTOMER': ['C_CUSTKEY', 'C_NAME', 'C_NATIONKEY'],
+    'ORDERS': ['O_ORDERKEY', 'O_CUSTKEY', 'O_TOTALPRICE'],
+    'LINEITEM': ['L_ORDERKEY', 'L_PARTKEY', 'L_SUPPKEY', 'L_LINENUMBER']
+}
+
+
+def run_query(sql, params=None):
+    """Answer the generator's INFORMATION_SCHEMA queries from TPCH."""
+    if 'INFORMATION_SCHEMA.TABLES' in sql:
+        return [{'table_schema': 'TPCH_SF1', 'table_name': table, 'comment': None,
+                 'last_altered': '2024-01-01'} for table in sorted(TPCH)]
+    if 'INFORMATION_SCHEMA.COLUMNS' in sql:
+        return [{'column_name': column, 'data_type': 'FIXED', 'comment': None,
+                 'ordinal_position': position}
+                for position, column in enumerate(TPCH[params[1]], start=1)]
+    return []
+
+
+def relationships():
+    generator = SemanticModelGenerator(run_query, 'SNOWFLAKE_SAMPLE_DATA', ['TPCH_SF1'], workers=2)
+    model = generator.build_model(generator.crawl(), name='TPCH', description='TPCH')
+    return {(rel['from_table'], rel['from_column'], rel['to_table'], rel['to_column'])
+            for rel in model['relationships']}
+
+
+def test_tpch_key_owners():
+    assert relationships() == {
+        ('nation', 'regionkey', 'region', 'regionkey'),
+        ('supplier', 'nationkey', 'nation', 'nationkey'),
+        ('customer', 'nationkey', 'nation', 'nationkey'),
+        ('partsupp', 'partkey', 'part', 'partkey'),
+        ('partsupp', 'suppkey', 'supplier', 'suppkey'),
+        ('orders', 'custkey', 'customer', 'custkey'),
+        ('lineitem', 'orderkey', 'orders', 'orderkey'),
+        ('lineitem', 'partkey', 'part', 'partkey'),
+        ('lineitem', 'suppkey', 'supplier', 'suppkey')
+    }
+
+
+def test_partsupp_does_not_own_partkey():
+    assert not any(to_table == 'partsupp' for _, _, to_table, _ in relationships())
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Value Statistics Module
+
+This module collects the value sets of low-cardinality semantic-model columns
+(market segments, order priorities, nation names, ...) and the min/max range
+of every profiled column in a background job. The statistics are kept in a
+compact local index: a prefix trie whose nodes hold their best completions,
+for as-you-type question suggestions, and sorted value arrays for range
+hints. Both are answered in memory without a warehouse round trip.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import bisect
+import datetime
+import decimal
+import threading
+import logging
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Semantic-model vocabulary ranks above data values of the same prefix
+VOCABULARY_WEIGHT = 1e12
+
+def plain_value(value: Any) -> Any:
+    """Return a JSON-friendly form of a value read from Snowflake."""
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return value
+
+class _TrieNode:
+    """Trie node with its children and the best completions below it."""
+
+    __slots__ = ('children', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.top = []
+
+class PrefixTrie:
+    """Character trie returning the highest-weighted completions of a prefix.
+
+    Every node keeps its ``top_k`` best entries, so a lookup costs one walk
+    down the prefix and no search of the subtree.
+    """
+
+    def __init__(self, top_k: int = 8):
+        """Initialize an empty trie."""
+        self.root = _TrieNode()
+        self.top_k = top_k
+        self.size = 0
+
+    def insert(self, key: str, item: Any, weight: float):
+        """Add an item under a (lower-cased) key."""
+        entry = (-weight, self.size, item)
+        self.size += 1
+
+        node = self.root
+        self._offer(node, entry)
+        for char in key.lower():
+            node = node.children.setdefault(char, _TrieNode())
+            self._offer(node, entry)
+
+    def complete(self, prefix: str, limit: Optional[int] = None) -> List[Any]:
+        """Return the best items whose key starts with ``prefix``."""
+        node = self.root
+        for char in prefix.lower():
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return [item for _, _, item in node.top[:limit or self.top_k]]
+
+    def _offer(self, node: _TrieNode, entry: Tuple[float, int, Any]):
+        """Keep an entry among a node's best ones."""
+        if len(node.top) < self.top_k or entry < node.top[-1]:
+            bisect.insort(node.top, entry)
+            del node.top[self.top_k:]
+
+class ValueStats:
+    """Class to collect column value statistics and answer suggestions from them."""
+
+    def __init__(self, analyst, max_distinct: int = 200, interval: float = 86400,
+                 path: Optional[str] = '.value_stats.json', top_k: int = 8):
+        """Initialize the statistics.
+
+        Columns with at most ``max_distinct`` values have their value sets
+        collected; statistics older than ``interval`` seconds are recollected.
+        ``path`` keeps the last collection on disk so a restart suggests at once.
+        """
+        self.analyst = analyst
+        self.max_distinct = max_distinct
+        self.interval = interval
+        self.path = Path(path) if path else None
+        self.top_k = top_k
+
+        self.stats = {'collected_at': 0, 'columns': {}}
+        self._trie = PrefixTrie(top_k)
+        self._ranges = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.load()
+
+    @classmethod
+    def from_env(cls, analyst) -> 'ValueStats':
+        """Create statistics configured from CORTEX_VALUE_STATS_* environment variables."""
+        return cls(
+            analyst,
+            max_distinct=int(os.getenv('CORTEX_VALUE_STATS_MAX_DISTINCT', '200')),
+            interval=float(os.getenv('CORTEX_VALUE_STATS_INTERVAL', '86400')),
+            path=os.getenv('CORTEX_VALUE_STATS_PATH', '.value_stats.json') or None
+        )
+
+    def load(self) -> bool:
+        """Load previously collected statistics from disk."""
+        if not self.path or not self.path.exists():
+            return False
+        try:
+            self._install(json.loads(self.path.read_text(encoding='utf-8')))
+            logger.info(f"Loaded value statistics for {len(self.stats['columns'])} columns from {self.path}")
+            return True
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable value statistics {self.path}: {str(e)}")
+            return False
+
+    def collect(self) -> Dict[str, Any]:
+        """Profile every semantic-model column and install the new statistics.
+
+        One query per table returns approximate distinct counts and ranges;
+        low-cardinality columns then get one GROUP BY each for their values.
+        """
+        started = time.time()
+        columns = {}
+        for table in (self.analyst.semantic_model or {}).get('tables', []):
+            profiled = [column for column in table.get('columns', [])
+                        if not column['name'].endswith('_key')]
+            if not profiled:
+                continue
+            try:
+                columns.update(self._profile_table(table, profiled))
+            except Exception as e:
+                logger.warning(f"Failed to profile {table['name']}: {str(e)}")
+
+        stats = {'collected_at': time.time(), 'columns': columns}
+        self._install(stats)
+        if self.path:
+            self.path.write_text(json.dumps(stats), encoding='utf-8')
+        logger.info(f"Collected value statistics for {len(columns)} columns in {time.time() - started:.1f}s")
+        return stats
+
+    def suggest(self, text: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return completions of the last (partial) word or words of a question.
+
+        Each suggestion has the completed ``text``, the inserted ``value`` and
+        the ``column`` it comes from (None for semantic-model vocabulary).
+        """
+        limit = limit or self.top_k
+        words = text.split(' ')
+        trie = self._trie
+
+        suggestions, seen = [], set()
+        # Longest tail first, so 'united st' completes to 'united states'
+        for size in range(min(3, len(words)), 0, -1):
+            tail = ' '.join(words[-size:]).lower()
+            if not tail.strip():
+                continue
+            for value, column in trie.complete(tail, limit):
+                if value.lower() == tail or value in seen:
+                    continue
+                seen.add(value)
+                suggestions.append({'text': ' '.join(words[:-size] + [value]),
+                                    'value': value, 'column': column})
+            if len(suggestions) >= limit:
+                break
+        return suggestions[:limit]
+
+    def values(self, column: Optional[str] = None) -> List[str]:
+        """Return the collected values of one column, or of every text column."""
+        columns = self.stats['columns']
+        names = [column] if column else sorted(name for name, stats in columns.items()
+                                               if stats['data_type'] == 'VARCHAR')
+        return list(dict.fromkeys(str(value) for name in names
+                                  for value, _ in columns.get(name, {}).get('values', [])))
+
+    def value_range(self, column: str) -> Optional[Tuple[Any, Any]]:
+        """Return the (min, max) of a column."""
+        stats = self.stats['columns'].get(column)
+        return (stats['min'], stats['max']) if stats else None
+
+    def nearest(self, column: str, value: Any) -> Optional[Any]:
+        """Return the collected value of a column closest to ``value``."""
+        values = self._ranges.get(column)
+        if not values:
+            return None
+        position = bisect.bisect_left(values, value)
+        candidates = values[max(position - 1, 0):position + 1]
+        try:
+            return min(candidates, key=lambda candidate: abs(candidate - value))
+        except TypeError:
+            return candidates[-1]
+
+    def hints(self, text: str) -> List[str]:
+        """Return notes on years in a question that fall outside the data."""
+        notes = []
+        for year in {int(match) for match in re.findall(r'\b(1[89]\d\d|2\d\d\d)\b', text)}:
+            for column, stats in self.stats['columns'].items():
+                if stats['data_type'] != 'DATE' or not stats['min']:
+                    continue
+                first, last = int(str(stats['min'])[:4]), int(str(stats['max'])[:4])
+                if not first <= year <= last:
+                    notes.append(f"{column} only covers {first}–{last}; "
+                                 f"the nearest year with data is {min(max(year, first), last)}.")
+        return notes
+
+    def start(self):
+        """Collect in a daemon thread now (if the statistics are stale) and once per interval."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='value-stats', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop the background thread."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        """Collect whenever the statistics are older than the interval, until stopped."""
+        while not self._stop.is_set():
+            age = time.time() - self.stats['collected_at']
+            if age >= self.interval:
+                try:
+                    self.collect()
+                except Exception as e:
+                    logger.warning(f"Value statistics collection failed: {str(e)}")
+                age = 0
+            self._stop.wait(max(self.interval - age, 60))
+
+    def _query(self, sql: str) -> List[Dict[str, Any]]:
+        """Run a profiling query on a pooled session of the batch warehouse."""
+        with self.analyst.pool.session(self.analyst.router.route('heavy')) as session:
+            return [{key.lower(): value for key, value in row.as_dict().items()}
+                    for row in session.sql(sql).collect()]
+
+    def _profile_table(self, table: Dict[str, Any], columns: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Return the statistics of a table's columns."""
+        selects = []
+        for number, column in enumerate(columns):
+            selects += [f"APPROX_COUNT_DISTINCT({column['expr']}) AS d{number}",
+                        f"MIN({column['expr']}) AS min{number}",
+                        f"MAX({column['expr']}) AS max{number}"]
+        profile = self._query(f"SELECT {', '.join(selects)} FROM {table['base_table']}")[0]
+
+        stats = {}
+        for number, column in enumerate(columns):
+            name = f"{table['name']}.{column['name']}"
+            distinct = int(profile[f'd{number}'] or 0)
+            values = []
+            if 0 < distinct <= self.max_distinct:
+                rows = self._query(
+                    f"SELECT {column['expr']} AS value, COUNT(*) AS n FROM {table['base_table']} "
+                    f"WHERE {column['expr']} IS NOT NULL GROUP BY 1 ORDER BY 2 DESC LIMIT {self.max_distinct}")
+                values = [[plain_value(row['value']), int(row['n'])] for row in rows]
+            stats[name] = {
+                'table': table['name'],
+                'column': column['name'],
+                'data_type': column.get('data_type', 'VARCHAR'),
+                'distinct': distinct,
+                'min': plain_value(profile[f'min{number}']),
+                'max': plain_value(profile[f'max{number}']),
+                'values': values
+            }
+        return stats
+
+    def _install(self, stats: Dict[str, Any]):
+        """Build the trie and sorted arrays for a collection and swap them in."""
+        trie = PrefixTrie(self.top_k)
+        ranges = {}
+
+        model = self.analyst.semantic_model or {}
+        vocabulary = [column['name'] for table in model.get('tables', []) for column in table.get('columns', [])]
+        vocabulary += [element['name'] for kind in ('metrics', 'dimensions') for element in model.get(kind, [])]
+        for term in dict.fromkeys(vocabulary):
+            phrase = term.replace('_', ' ')
+            trie.insert(phrase, (phrase, None), VOCABULARY_WEIGHT)
+
+        for name, column in stats['columns'].items():
+            if column['data_type'] == 'VARCHAR':
+                for value, count in column['values']:
+                    text = str(value).strip()
+                    trie.insert(text, (text, name), count)
+                    # Multi-word values also complete from their later words
+                    for position in [match.start() + 1 for match in re.finditer(r'\s\S', text)]:
+                        trie.insert(text[position:], (text, name), count)
+            elif column['values']:
+                ranges[name] = sorted(value for value, _ in column['values'])
+
+        with self._lock:
+            self.stats, self._trie, self._ranges = stats, trie, ranges
+
+def main():
+    """Collect value statistics once and print them."""
+    from cortex_analyst import CortexAnalyst
+
+    analyst = CortexAnalyst()
+    if not analyst.connect():
+        print("❌ Connection failed!")
+        sys.exit(1)
+
+    try:
+        stats = ValueStats.from_env(analyst)
+        for name, column in stats.collect()['columns'].items():
+            values = f", {len(column['values'])} values" if column['values'] else ''
+            print(f"📊 {name}: ~{column['distinct']} distinct, {column['min']} – {column['max']}{values}")
+    finally:
+        analyst.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Warehouse Router Module
+
+This module routes queries to Snowflake warehouses by query class (preview,
+aggregate, heavy). It keeps one session or connection per warehouse and uses
+SHOW WAREHOUSES to avoid sending interactive queries to suspended warehouses.
+"""
+
+import os
+import time
+import threading
+import logging
+from typing import Dict, List, Any, Callable, Optional
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class WarehouseRouter:
+    """Class to map query classes to warehouses and hold a session per warehouse."""
+
+    QUERY_CLASSES = ('preview', 'aggregate', 'heavy')
+
+    # Only batch work may wait for a suspended warehouse to resume
+    INTERACTIVE_CLASSES = ('preview', 'aggregate')
+
+    def __init__(self, session_factory: Callable[[str], Any], default_warehouse: Optional[str],
+                 routes: Optional[Dict[str, str]] = None,
+                 show_warehouses: Optional[Callable[[], List[Any]]] = None,
+                 state_ttl: int = 60):
+        """Initialize the router.
+
+        ``session_factory(warehouse)`` opens a new session or connection bound
+        to a warehouse; ``show_warehouses()`` returns the rows of SHOW WAREHOUSES.
+        """
+        self.session_factory = session_factory
+        self.default_warehouse = default_warehouse
+        self.routes = {query_class: (routes or {}).get(query_class) or default_warehouse
+                       for query_class in self.QUERY_CLASSES}
+        self.show_warehouses = show_warehouses
+        self.state_ttl = state_ttl
+
+        self.sessions = {}
+        self.states = {}
+        self._states_loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, session_factory: Callable[[str], Any], default_warehouse: Optional[str],
+                 show_warehouses: Optional[Callable[[], List[Any]]] = None) -> 'WarehouseRouter':
+        """Create a router configured from CORTEX_WAREHOUSE_<CLASS> environment variables."""
+        routes = {query_class: os.getenv(f'CORTEX_WAREHOUSE_{query_class.upper()}')
+                  for query_class in cls.QUERY_CLASSES}
+        return cls(session_factory, default_warehouse, routes=routes,
+                   show_warehouses=show_warehouses,
+                   state_ttl=int(os.getenv('CORTEX_WAREHOUSE_STATE_TTL', '60')))
+
+    def register(self, warehouse: Optional[str], session: Any):
+        """Register an already open session for a warehouse."""
+        with self._lock:
+            self.sessions[self._key(warehouse)] = session
+
+    def route(self, query_class: str = 'aggregate') -> Optional[str]:
+        """Return the warehouse that should run a query of the given class."""
+        if query_class not in self.QUERY_CLASSES:
+            raise ValueError(f"Unknown query class: {query_class}")
+
+        warehouse = self.routes[query_class]
+        if query_class not in self.INTERACTIVE_CLASSES or not warehouse:
+            return warehouse
+
+        self.refresh_state()
+        if self.is_available(warehouse):
+            return warehouse
+
+        # Prefer any configured warehouse that is already running
+        for candidate in dict.fromkeys(list(self.routes.values()) + [self.default_warehouse]):
+            if candidate and self.states.get(self._key(candidate)) == 'STARTED':
+                logger.info(f"Warehouse {warehouse} is suspended, routing {query_class} query to {candidate}")
+                return candidate
+
+        # Nothing is running; let the target auto-resume
+        return warehouse
+
+    def session_for(self, warehouse: Optional[str]) -> Any:
+        """Return the session for a warehouse, opening it on first use."""
+        key = self._key(warehouse)
+        with self._lock:
+            session = self.sessions.get(key)
+            if session is None:
+                logger.info(f"Opening session for warehouse {warehouse}")
+                session = self.session_factory(warehouse)
+                self.sessions[key] = session
+
+            # Sending a query resumes the warehouse
+            if warehouse:
+                self.states[key] = 'STARTED'
+        return session
+
+    def session_for_class(self, query_class: str = 'aggregate') -> Any:
+        """Return the session that should run a query of the given class."""
+        return self.session_for(self.route(query_class))
+
+    def refresh_state(self, force: bool = False):
+        """Reload warehouse states from SHOW WAREHOUSES when they are stale."""
+        if not self.show_warehouses:
+            return
+        if not force and time.time() - self._states_loaded_at < self.state_ttl:
+            return
+
+        try:
+            rows = self.show_warehouses() or []
+            with self._lock:
+                # Name and state are the first two SHOW WAREHOUSES columns
+                self.states = {self._key(row[0]): str(row[1]).upper() for row in rows}
+                self._states_loaded_at = time.time()
+        except Exception as e:
+            logger.warning(f"Failed to refresh warehouse states: {str(e)}")
+            self._states_loaded_at = time.time()
+
+    def is_available(self, warehouse: str) -> bool:
+        """Return True unless the warehouse is known to be suspended."""
+        state = self.states.get(self._key(warehouse))
+        return state not in ('SUSPENDED', 'SUSPENDING')
+
+    def close(self, keep: Any = None):
+        """Close every routed session except ``keep``."""
+        with self._lock:
+            sessions = list(self.sessions.values())
+            self.sessions.clear()
+
+        for session in sessions:
+            if session is keep:
+                continue
+            try:
+                session.close()
+            except Exception as e:
+                logger.warning(f"Failed to close routed session: {str(e)}")
+
+    @staticmethod
+    def _key(warehouse: Optional[str]) -> str:
+        """Normalize a warehouse name for lookups (unquoted names are case-insensitive)."""
+        return (warehouse or '').upper()